@@ -7,6 +7,7 @@
 import os
 import platform
 import sys
+import time
 from loguru import logger
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import src_rc
@@ -41,3 +42,20 @@ def get_user_config_path():
     else:
         user_config_path = os.path.expanduser("~/.config/NepTrainKit")
     return user_config_path
+
+
+def timeit(func):
+    """
+    统计函数耗时
+    使用用法：
+        @timeit
+        def demo():
+            pass
+    """
+    def wrapper(*args, **kwargs):
+        start_time = time.time()  # 记录开始时间
+        result = func(*args, **kwargs)  # 调用原始函数
+        end_time = time.time()  # 记录结束时间
+        logger.debug(f"Function '{func.__name__}' executed in {end_time - start_time:.4f} seconds")
+        return result
+    return wrapper
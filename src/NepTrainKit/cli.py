@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+不打开界面执行数据集制作流水线
+nepkit-pipeline card_config.json train.xyz -o make_dataset.xyz -j 8
+"""
+import argparse
+import sys
+import time
+
+from loguru import logger
+
+from NepTrainKit.core.processing import CardPipeline, read_structures, PROCESS_CHUNK_SIZE
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="nepkit-pipeline",
+                                     description="Run the cards of an exported card_config.json without the GUI.")
+    parser.add_argument("config", help="card configuration exported from Make Dataset")
+    parser.add_argument("inputs", nargs="+", help="structure files (.xyz .vasp .cif)")
+    parser.add_argument("-o", "--output", default="make_dataset.xyz", help="output extxyz file")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of processes, default all CPUs")
+    parser.add_argument("--chunk-size", type=int, default=PROCESS_CHUNK_SIZE,
+                        help="input structures sent to a process at a time")
+    parser.add_argument("--sort-atoms", action="store_true",
+                        help="sort the generated atoms by element like the GUI sort_atoms setting")
+    parser.add_argument("--all-cards", action="store_true",
+                        help="write the results of every checked card like the GUI export, "
+                             "instead of only the last card")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # 不读取界面的设置 只导入计算相关的模块 没有Qt界面也可以运行
+    try:
+        pipeline = CardPipeline.from_file(args.config, sort_atoms=args.sort_atoms, n_jobs=args.jobs,
+                                          chunk_size=args.chunk_size)
+    except (OSError, ValueError, NotImplementedError) as e:
+        logger.error(f"Invalid card configuration {args.config}: {e}")
+        return 1
+    if not pipeline.cards:
+        logger.error("No card selected in the card configuration.")
+        return 1
+
+    structures = read_structures(args.inputs)
+    logger.info(f"Loaded {len(structures)} structures, running {len(pipeline.cards)} cards.")
+
+    last_report = {}
+
+    def progress(index, percent):
+        # 每张卡片每10%输出一次
+        step = percent // 10
+        if last_report.get(index) != step:
+            last_report[index] = step
+            logger.info(f"[{index + 1}/{len(pipeline.cards)}] {pipeline.cards[index]['class']}: {percent}%")
+
+    start = time.perf_counter()
+    count = pipeline.run_to_file(structures, args.output, keep_all=args.all_cards, progress=progress)
+    logger.info(f"Wrote {count} structures to {args.output} in {time.perf_counter() - start:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
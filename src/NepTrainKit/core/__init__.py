@@ -3,8 +3,21 @@
 # @Time    : 2024/10/17 15:42
 # @Author  : 兵
 # @email    : 1747193328@qq.com
-from .config import Config
-from .message import MessageManager
 from .structure import Structure,process_organic_clusters,get_clusters
 
-from .card_manager import CardManager,load_cards_from_directory
\ No newline at end of file
+# 配置、消息和卡片依赖Qt界面 第一次访问时才导入 命令行和进程池只导入计算相关的模块
+_lazy_imports = {
+    "Config": ".config",
+    "MessageManager": ".message",
+    "CardManager": ".card_manager",
+    "load_cards_from_directory": ".card_manager",
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -6,13 +6,15 @@
 import contextlib
 import os
 import traceback
+from itertools import chain
+
 import numpy as np
 from PySide6.QtCore import QThread, Signal, QObject
 from loguru import logger
 from multiprocessing import Process, JoinableQueue, Event
 
-from NepTrainKit import utils
-from NepTrainKit.core import Structure, MessageManager
+from NepTrainKit import timeit
+from NepTrainKit.core import Structure
 
 try:
     from NepTrainKit.nep_cpu import CpuNep
@@ -25,6 +27,50 @@ except ImportError:
 
         CpuNep=None
 
+def _flatten_nested(values, count):
+    """把C++返回的二维列表直接拼接成一维数组 不为每个结构单独创建数组"""
+    return np.fromiter(chain.from_iterable(values), dtype=np.float64, count=count)
+
+
+def postprocess_calculate_result(potentials, forces, virials, group_size):
+    """
+    处理nep_cpu.calculate*的原始输出
+    C++按结构返回 每个结构的力是[fx..., fy..., fz...] 维里是9个分量依次排列的原子维里
+    这里全部拼接成一维数组 用下标和reduceat一次性完成所有结构的求和、转置和平均
+    :param potentials: 每个结构的原子能量列表
+    :param forces: 每个结构的原子力列表
+    :param virials: 每个结构的原子维里列表
+    :param group_size: 每个结构的原子数
+    :return: 结构能量(S,) 原子力(N,3) 结构平均维里(S,9)
+    """
+    # core.io 会导入本模块 这里延迟导入避免循环引用
+    from NepTrainKit.core.io.utils import get_segment_offsets, segment_reduce
+
+    counts = np.asarray(group_size, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return (np.zeros(counts.shape[0], dtype=np.float32),
+                np.zeros((0, 3), dtype=np.float32),
+                np.zeros((counts.shape[0], 9), dtype=np.float32))
+    atom_offsets = np.repeat(get_segment_offsets(counts), counts)
+    atom_counts = np.repeat(counts, counts)
+    # 原子在所属结构内的序号
+    local_index = np.arange(total, dtype=np.int64) - atom_offsets
+
+    potentials = _flatten_nested(potentials, total)
+    potentials_array = segment_reduce(potentials, counts, "sum").astype(np.float32)
+
+    forces = _flatten_nested(forces, total * 3)
+    force_index = (3 * atom_offsets + local_index)[:, np.newaxis] + atom_counts[:, np.newaxis] * np.arange(3)
+    forces_array = forces[force_index].astype(np.float32)
+
+    virials = _flatten_nested(virials, total * 9)
+    virial_index = (9 * atom_offsets + local_index)[:, np.newaxis] + atom_counts[:, np.newaxis] * np.arange(9)
+    virials_array = segment_reduce(virials[virial_index], counts, "mean").astype(np.float32)
+
+    return potentials_array, forces_array, virials_array
+
+
 class NepCalculator():
 
     def __init__(self, model_file="nep.txt"):
@@ -34,6 +80,8 @@ class NepCalculator():
         self.initialized = False
 
         if CpuNep is None:
+            # 消息框依赖界面 只在需要时导入
+            from NepTrainKit.core import MessageManager
             MessageManager.send_message_box("Failed to import nep_cpu.\n To use the display functionality normally, please prepare the *_train.out and descriptor.out files.","Error")
             return
 
@@ -65,78 +113,30 @@ class NepCalculator():
             group_size.append(len(_type))
         return  _types, _boxs, _positions,group_size
 
-    @utils.timeit
+    @timeit
     def calculate(self,structures:list[Structure]):
         if not self.initialized:
             return np.array([]),np.array([]),np.array([])
         _types, _boxs, _positions,group_size = self.compose_structures(structures)
         potentials, forces, virials = self.nep3.calculate(_types, _boxs, _positions)
-        split_indices = np.cumsum(group_size)[:-1]
-        #
-        potentials=np.hstack(potentials)
-        split_potential_arrays = np.split(potentials, split_indices)
-        potentials_array = np.array(list(map(np.sum, split_potential_arrays)), dtype=np.float32)
-        # print(potentials_array)
-        # 处理每个force数组：reshape (3, -1) 和 transpose(1, 0)
-        reshaped_forces = [np.array(force).reshape(3, -1).T for force in forces]
-
-        forces_array = np.vstack(reshaped_forces,dtype=np.float32)
-        # print(forces_array)
-
-        reshaped_virials = np.vstack([np.array(virial).reshape(9, -1).mean(axis=1) for virial in virials],dtype=np.float32)
-
-        # virials_array = reshaped_virials[:,[0,4,8,1,5,6]]
+        return postprocess_calculate_result(potentials, forces, virials, group_size)
 
-        return potentials_array,forces_array,reshaped_virials
 
-
-    @utils.timeit
+    @timeit
     def calculate_dftd3(self,structures:list[Structure],functional,cutoff,cutoff_cn):
         if not self.initialized:
             return np.array([]),np.array([]),np.array([])
         _types, _boxs, _positions,group_size = self.compose_structures(structures)
         potentials, forces, virials = self.nep3.calculate_dftd3(functional,cutoff,cutoff_cn,_types, _boxs, _positions)
-        split_indices = np.cumsum(group_size)[:-1]
-        #
-        potentials=np.hstack(potentials)
-        split_potential_arrays = np.split(potentials, split_indices)
-        potentials_array = np.array(list(map(np.sum, split_potential_arrays)), dtype=np.float32)
-        # print(potentials_array)
-        # 处理每个force数组：reshape (3, -1) 和 transpose(1, 0)
-        reshaped_forces = [np.array(force).reshape(3, -1).T for force in forces]
-
-        forces_array = np.vstack(reshaped_forces,dtype=np.float32)
-        # print(forces_array)
-
-        reshaped_virials = np.vstack([np.array(virial).reshape(9, -1).mean(axis=1) for virial in virials],dtype=np.float32)
-
-        # virials_array = reshaped_virials[:,[0,4,8,1,5,6]]
-
-        return potentials_array,forces_array,reshaped_virials
+        return postprocess_calculate_result(potentials, forces, virials, group_size)
 
-    @utils.timeit
+    @timeit
     def calculate_with_dftd3(self,structures:list[Structure],functional,cutoff,cutoff_cn):
         if not self.initialized:
             return np.array([]),np.array([]),np.array([])
         _types, _boxs, _positions,group_size = self.compose_structures(structures)
         potentials, forces, virials = self.nep3.calculate_with_dftd3( functional,cutoff,cutoff_cn,_types, _boxs, _positions)
-        split_indices = np.cumsum(group_size)[:-1]
-        #
-        potentials=np.hstack(potentials)
-        split_potential_arrays = np.split(potentials, split_indices)
-        potentials_array = np.array(list(map(np.sum, split_potential_arrays)), dtype=np.float32)
-        # print(potentials_array)
-        # 处理每个force数组：reshape (3, -1) 和 transpose(1, 0)
-        reshaped_forces = [np.array(force).reshape(3, -1).T for force in forces]
-
-        forces_array = np.vstack(reshaped_forces,dtype=np.float32)
-        # print(forces_array)
-
-        reshaped_virials = np.vstack([np.array(virial).reshape(9, -1).mean(axis=1) for virial in virials],dtype=np.float32)
-
-        # virials_array = reshaped_virials[:,[0,4,8,1,5,6]]
-
-        return potentials_array,forces_array,reshaped_virials
+        return postprocess_calculate_result(potentials, forces, virials, group_size)
 
 
     def get_descriptor(self,structure:Structure):
@@ -156,7 +156,7 @@ class NepCalculator():
         descriptors_per_atom = np.array(descriptor,dtype=np.float32).reshape(-1, len(structure)).T
 
         return descriptors_per_atom
-    @utils.timeit
+    @timeit
     def get_structures_descriptor(self,structures:list[Structure]):
         """
         获取结构描述符：原子平均
@@ -170,7 +170,21 @@ class NepCalculator():
 
         return np.array(descriptor,dtype=np.float32)
 
-    @utils.timeit
+    def get_structures_atomic_descriptor(self,structures:list[Structure]):
+        """
+        获取每个原子的描述符 按结构顺序拼接成 (原子数, D)
+        调用方按批调用 每批的结果由描述符缓存写入memmap
+        """
+        if not self.initialized:
+            return np.array([])
+        if not isinstance(structures, (list, np.ndarray)):
+            structures = [structures]
+        blocks = [self.get_descriptor(structure) for structure in structures]
+        if not blocks:
+            return np.array([], dtype=np.float32)
+        return np.concatenate(blocks, axis=0)
+
+    @timeit
     def get_structures_polarizability(self,structures:list[Structure]):
         if not self.initialized:
             return np.array([])
@@ -198,6 +212,8 @@ def run_nep_calculator(nep_txt, structures, calculator_type, func_kwargs={},queu
             result = nep3.get_structures_polarizability(structures)
         elif calculator_type == 'descriptor':
             result = nep3.get_structures_descriptor(structures)
+        elif calculator_type == 'atomic_descriptor':
+            result = nep3.get_structures_atomic_descriptor(structures)
         elif calculator_type == 'dipole':
             result = nep3.get_structures_dipole(structures)
         elif  calculator_type == 'calculate_with_dftd3':
@@ -139,13 +139,24 @@ class CanvasLayoutBase(CanvasBase):
 
         else:
             MessageManager.send_info_message("No undoable deletion!")
+    def get_dataset_values(self, dataset):
+        """
+        描述符按新颖度着色时 返回每个点归一化到0-1的值 否则返回None
+        """
+        values = getattr(self.nep_result_data, "descriptor_novelty", None)
+        if values is None or dataset is not self.nep_result_data.descriptor:
+            return None
+        values = np.asarray(values, dtype=np.float64)
+        lower, upper = np.nanmin(values), np.nanmax(values)
+        values = values[dataset.structure_index]
+        return np.clip((values - lower) / max(upper - lower, 1e-12), 0, 1)
+
     def select_index(self,structure_index,reverse):
-        if isinstance(structure_index,(int,np.int64,np.int32,np.uint32,np.uint64)):
+        if isinstance(structure_index,(int,np.integer)):
             structure_index=[structure_index]
-        elif isinstance(structure_index,np.ndarray):
-            structure_index=structure_index.tolist()
+        structure_index=np.asarray(structure_index,dtype=np.int64).reshape(-1)
 
-        if not structure_index:
+        if structure_index.size==0:
             return
         if reverse:
             self.nep_result_data.uncheck(structure_index)
@@ -161,11 +172,10 @@ class CanvasLayoutBase(CanvasBase):
         if self.nep_result_data is None:
             return
 
-        active_indices = set(self.nep_result_data.structure.now_indices.tolist())
-        selected = set(self.nep_result_data.select_index)
-
-        self.select_index(list(selected), True)
-        self.select_index(list(active_indices - selected), False)
+        selected = self.nep_result_data.select_index.indices
+        self.nep_result_data.inverse_select()
+        self.update_scatter_color(selected, Brushes.Default)
+        self.update_scatter_color(self.nep_result_data.select_index.indices, Brushes.Selected)
 class VispyCanvasLayoutBase(CanvasLayoutBase,QObject,metaclass=CombinedMeta):
     def __init__(self,*args,**kwargs):
         QObject.__init__(self)
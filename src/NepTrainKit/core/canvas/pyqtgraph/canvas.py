@@ -11,10 +11,10 @@ import numpy as np
 
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
-from pyqtgraph import GraphicsLayoutWidget, ScatterPlotItem, PlotItem, ViewBox, TextItem
+from pyqtgraph import GraphicsLayoutWidget, ScatterPlotItem, PlotItem, ViewBox, TextItem, colormap, mkBrush
 
 from NepTrainKit import utils
-from NepTrainKit.core.types import Brushes, Pens
+from NepTrainKit.core.types import Brushes, Pens, FREE_AXES_TITLES
 from ..base.canvas import CanvasLayoutBase
 from ...io import NepTrainResultData
 
@@ -70,7 +70,7 @@ class MyPlotItem(PlotItem):
         if t == self.title:
             return
         self.setTitle(t)
-        if t != "descriptor":
+        if t not in FREE_AXES_TITLES:
             self.add_diagonal()
 
     @property
@@ -151,7 +151,7 @@ class PyqtgraphCanvas(CanvasLayoutBase, GraphicsLayoutWidget, metaclass=Combined
             plot = self.axes_list[index]
             plot.title = _dataset.title
             plot.scatter(_dataset.x, _dataset.y, data=_dataset.structure_index,
-                         brush=Brushes.get(_dataset.title.upper()), pen=Pens.get(_dataset.title.upper()),
+                         brush=self.get_dataset_brush(_dataset), pen=Pens.get(_dataset.title.upper()),
                          symbol='o', size=7,
 
                          )
@@ -166,13 +166,41 @@ class PyqtgraphCanvas(CanvasLayoutBase, GraphicsLayoutWidget, metaclass=Combined
             else:
                 plot.set_current_point([], [])
 
-            if _dataset.title not in ["descriptor"]:
+            if _dataset.title not in FREE_AXES_TITLES:
                 #
                 pos = self.convert_pos(plot, (0, 1))
                 text = f"rmse: {_dataset.get_formart_rmse()}"
                 plot.text.setText(text)
                 plot.text.setPos(*pos)
 
+    def update_dataset_plot(self, dataset):
+        """
+        数据集内容变化后(比如后台降维完成) 只重画对应的子图 保留当前的选择
+        """
+        if self.nep_result_data is None:
+            return
+        for index, _dataset in enumerate(self.nep_result_data.dataset):
+            if _dataset is not dataset:
+                continue
+            plot = self.axes_list[index]
+            plot.scatter(_dataset.x, _dataset.y, data=_dataset.structure_index,
+                         brush=self.get_dataset_brush(_dataset), pen=Pens.get(_dataset.title.upper()),
+                         symbol='o', size=7,
+                         )
+            self.auto_range(plot)
+        if self.nep_result_data.select_index:
+            self.update_scatter_color(self.nep_result_data.select_index.indices, Brushes.Selected)
+        self.plot_current_point(self.structure_index)
+
+    def get_dataset_brush(self, dataset):
+        """默认颜色 按新颖度着色时每个点用viridis颜色表"""
+        values = self.get_dataset_values(dataset)
+        if values is None:
+            return Brushes.get(dataset.title.upper())
+        lut = colormap.get("viridis").getLookupTable(nPts=256, alpha=True)
+        brushes = [mkBrush(*color) for color in lut]
+        return [brushes[i] for i in np.round(values * 255).astype(np.int64)]
+
     def plot_current_point(self, structure_index):
         """
         鼠标点击后 在所有子图上绘制五角星标记当前点
@@ -225,8 +253,7 @@ class PyqtgraphCanvas(CanvasLayoutBase, GraphicsLayoutWidget, metaclass=Combined
 
             if not plot._scatter:
                 continue
-            structure_index_set = set(structure_index)
-            index_list = [i for i, val in enumerate(plot._scatter.data["data"]) if val in structure_index_set]
+            index_list = np.flatnonzero(np.isin(plot._scatter.data["data"].astype(np.int64), structure_index))
 
             plot._scatter.data["brush"][index_list] = color
             plot._scatter.data['sourceRect'][index_list] = (0, 0, 0, 0)
@@ -280,7 +307,7 @@ class PyqtgraphCanvas(CanvasLayoutBase, GraphicsLayoutWidget, metaclass=Combined
                         y_range[0] = y_min
                     if y_max > y_range[1]:
                         y_range[1] = y_max
-            if plot.title != "descriptor":
+            if plot.title not in FREE_AXES_TITLES:
 
                 real_range = (min(x_range[0], y_range[0]), max(x_range[1], y_range[1]))
                 view.setRange(xRange=real_range, yRange=real_range)
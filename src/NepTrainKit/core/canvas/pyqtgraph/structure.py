@@ -208,26 +208,26 @@ class StructurePlotWidget(gl.GLViewWidget):
     def show_bond(self,structure):
         if not self.show_bond_flag:
             return
-        bond_pairs = structure.get_bond_pairs()
+        bond_i, bond_j, bond_shifts = structure.get_bonds()
+        numbers = structure.numbers
+        offsets = bond_shifts @ structure.cell
         bond_items = []
-        for pair in bond_pairs:
+        for atom0, atom1, shift, offset in zip(bond_i.tolist(), bond_j.tolist(), bond_shifts, offsets):
 
-            elem0_info = table_info[str(structure.numbers[pair[0]])]
-            elem1_info = table_info[str(structure.numbers[pair[1]])]
-            pos1 = structure.positions[pair[0]]
-            pos2 = structure.positions[pair[1]]
-            # bond_length = np.linalg.norm(pos1 - pos2)
-            # if (elem0_info["radii"] + elem1_info["radii"]) * radius_coefficient_config > bond_length * 100:
-            #     color1 = (1.0, 0.0, 0.0, 0.7)
-            #     color2 = (1.0, 0.0, 0.0, 0.7)
-            #     bond_radius = 0.3
-            # else:
+            elem0_info = table_info[str(numbers[atom0])]
+            elem1_info = table_info[str(numbers[atom1])]
+            pos1 = structure.positions[atom0]
+            pos2 = structure.positions[atom1] + offset
             color1 = QColor(elem0_info["color"]).getRgbF()
             color2 = QColor(elem1_info["color"]).getRgbF()
             bond_radius = 0.1
-            radius1 = table_info[str(structure.numbers[pair[0]])]["radii"] / 150*self.scale_factor
-            radius2 = table_info[str(structure.numbers[pair[1]])]["radii"] / 150*self.scale_factor
+            radius1 = elem0_info["radii"] / 150*self.scale_factor
+            radius2 = elem1_info["radii"] / 150*self.scale_factor
             bond1, bond2 = self.add_bond(pos1, pos2, color1, color2, radius1, radius2, bond_radius=bond_radius)
+            if shift.any():
+                # 跨越边界的键 在两个原子上各画一半
+                bond2, _ = self.add_bond(structure.positions[atom1], structure.positions[atom0] - offset,
+                                         color2, color1, radius2, radius1, bond_radius=bond_radius)
             bond_items.append(bond1)
             bond_items.append(bond2)
 
@@ -13,12 +13,12 @@ import numpy as np
 from PySide6.QtGui import QBrush, QColor, QPen
 from vispy import scene
 
-from vispy.color import ColorArray
+from vispy.color import ColorArray, get_colormap
 from vispy.visuals.filters import MarkerPickingFilter
 from NepTrainKit import utils
 from NepTrainKit.core.canvas.base.canvas import VispyCanvasLayoutBase
 from NepTrainKit.core.io import NepTrainResultData
-from NepTrainKit.core.types import Brushes, Pens
+from NepTrainKit.core.types import Brushes, Pens, FREE_AXES_TITLES
 
 
 
@@ -132,7 +132,7 @@ class ViewBoxWidget(scene.Widget):
                 y_range[1] = y_max
         # self._view.camera.set_range( )
         #
-        if "descriptor"!=self.title:
+        if self.title not in FREE_AXES_TITLES:
 
             real_range=(min(x_range[0],y_range[0]),max(x_range[1],y_range[1]))
 
@@ -229,7 +229,7 @@ class ViewBoxWidget(scene.Widget):
         if t==self.title:
             return
         self.title_label._text_visual.text = t
-        if t != "descriptor":
+        if t not in FREE_AXES_TITLES:
             self.add_diagonal(color="red", width=3, antialias=True, method='gl')
 class CombinedMeta(type(VispyCanvasLayoutBase), type(scene.SceneCanvas) ):
     pass
@@ -447,7 +447,7 @@ class VispyCanvas(VispyCanvasLayoutBase, scene.SceneCanvas, metaclass=CombinedMe
             plot.title= _dataset.title
 
             plot.scatter(_dataset.x,_dataset.y,data=_dataset.structure_index,
-                                      brush=Brushes.get(_dataset.title.upper()) ,pen=Pens.get(_dataset.title.upper()),
+                                      brush=self.get_dataset_brush(_dataset) ,pen=Pens.get(_dataset.title.upper()),
                                       symbol='o',size=7,
 
                                       )
@@ -462,13 +462,39 @@ class VispyCanvas(VispyCanvasLayoutBase, scene.SceneCanvas, metaclass=CombinedMe
             else:
                 plot.set_current_point([], [])
 
-            if _dataset.title not in ["descriptor"]:
+            if _dataset.title not in FREE_AXES_TITLES:
             #
                 pos=self.convert_pos(plot,(0.1 ,0.8))
                 text=f"rmse: {_dataset.get_formart_rmse()}"
                 plot.text.text=text
                 plot.text.pos=pos
 
+
+    def update_dataset_plot(self, dataset):
+        """
+        数据集内容变化后(比如后台降维完成) 只重画对应的子图 保留当前的选择
+        """
+        if self.nep_result_data is None:
+            return
+        for index, _dataset in enumerate(self.nep_result_data.dataset):
+            if _dataset is not dataset:
+                continue
+            plot = self.axes_list[index]
+            plot.scatter(_dataset.x, _dataset.y, data=_dataset.structure_index,
+                         brush=self.get_dataset_brush(_dataset), pen=Pens.get(_dataset.title.upper()),
+                         symbol='o', size=7,
+                         )
+        if self.nep_result_data.select_index:
+            self.update_scatter_color(self.nep_result_data.select_index.indices, Brushes.Selected)
+        self.plot_current_point(self.structure_index)
+
+    def get_dataset_brush(self, dataset):
+        """默认颜色 按新颖度着色时每个点用viridis颜色表"""
+        values = self.get_dataset_values(dataset)
+        if values is None:
+            return Brushes.get(dataset.title.upper())
+        return get_colormap("viridis").map(values)
+
     def convert_pos(self,plot,pos):
         x_range = plot.xaxis.axis.domain  # x轴范围 [xmin, xmax]
         y_range = plot.yaxis.axis.domain # y轴范围 [ymin, ymax]
@@ -146,96 +146,64 @@ class StructurePlotWidget(scene.SceneCanvas):
         self.bond_items = []
         if not self.show_bond_flag:
             return
-        bond_pairs = structure.get_bond_pairs()
+        bond_i, bond_j, bond_shifts = structure.get_bonds()
+        if bond_i.shape[0] == 0:
+            return
+        numbers = structure.number_array
+        positions = np.asarray(structure.positions, dtype=np.float64)
+        colors = np.array([Color(table_info.get(str(n), {'color': '#808080'})['color']).rgba
+                           for n in range(numbers.max() + 1)])
+        radii = np.array([table_info.get(str(n), {'radii': 70})['radii'] for n in range(numbers.max() + 1)])
+        radii = radii / 150 * self.scale_factor
+
+        # Bond geometry, the image of atom j may lie outside the cell
+        pos1 = positions[bond_i]
+        pos2 = positions[bond_j] + bond_shifts @ structure.cell
+        radius1 = radii[numbers[bond_i]]
+        radius2 = radii[numbers[bond_j]]
+        bond_vector = pos2 - pos1
+        full_length = np.linalg.norm(bond_vector, axis=1)
+        bond_dir = bond_vector / full_length[:, np.newaxis]
+        bond1_length = (full_length - radius1 - radius2) / 2 + radius1
+        bond2_length = (full_length - radius1 - radius2) / 2 + radius2
+
+        # Each half starts at its own atom, so bonds across the boundary are drawn at both ends
+        starts = np.concatenate((pos1, positions[bond_j]))
+        directions = np.concatenate((bond_dir, -bond_dir))
+        lengths = np.concatenate((bond1_length, bond2_length))
+        half_colors = np.concatenate((colors[numbers[bond_i]], colors[numbers[bond_j]]))
+        vertices, faces, vertex_colors = self.build_cylinders(starts, directions, lengths, half_colors, 0.12)
+        mesh_data = MeshData(vertices=vertices, faces=faces, vertex_colors=vertex_colors)
+        mesh = Mesh(
+            meshdata=mesh_data,
+            shading='smooth',
+            parent=self.view.scene
+        )
+
+        self.bond_items.append(mesh)
 
-        # Use precomputed cylinder template
+    def build_cylinders(self, starts, directions, lengths, colors, radius):
+        """Merge cylinders starting at starts along unit directions into one vertex/face array."""
         cos_theta = self.cylinder_template['cos_theta']
         sin_theta = self.cylinder_template['sin_theta']
-        cylinder_vertices = []
-        cylinder_faces = []
-        cylinder_colors = []
-        vertex_offset = 0
-
-        for pair in bond_pairs:
-            elem0 = str(structure.numbers[pair[0]])
-            elem1 = str(structure.numbers[pair[1]])
-            pos1 = structure.positions[pair[0]]
-            pos2 = structure.positions[pair[1]]
-            color1 = Color(table_info.get(elem0, {'color': '#808080'})['color']).rgba
-            color2 = Color(table_info.get(elem1, {'color': '#808080'})['color']).rgba
-            radius1 = table_info.get(elem0, {'color': '#808080'})['radii'] / 150 * self.scale_factor
-            radius2 = table_info.get(elem1, {'radii': 70})['radii'] / 150 * self.scale_factor
-            bond_radius = 0.12
-
-            # Bond geometry
-            bond_vector = pos2 - pos1
-            full_length = np.linalg.norm(bond_vector)
-            bond_dir = bond_vector / full_length
-            start_point = pos1
-            mid_point = pos1 + bond_dir * (radius1 + (full_length - radius1 - radius2) / 2)
-            bond1_length = (full_length - radius1 - radius2) / 2 + radius1
-            bond2_length = (full_length - radius1 - radius2) / 2 + radius2
-
-            # Orthogonal vectors
-            if abs(bond_dir[2]) < 0.999:
-                v1 = np.cross(bond_dir, [0, 0, 1])
-            else:
-                v1 = np.cross(bond_dir, [0, 1, 0])
-            v1 = v1 / np.linalg.norm(v1)
-            v2 = np.cross(bond_dir, v1)
-            v2 = v2 / np.linalg.norm(v2)
-
-            # Cylinder 1
-            vertices = []
-            colors = []
-            for z in [0, bond1_length]:
-                for i in range(self.n_segments):
-                    x = cos_theta[i] * bond_radius
-                    y = sin_theta[i] * bond_radius
-                    pos = start_point + bond_dir * z + v1 * x + v2 * y
-                    vertices.append(pos)
-                    colors.append(color1)
-            vertices.append(start_point)  # Bottom center
-            colors.append(color1)
-            vertices.append(start_point + bond_dir * bond1_length)  # Top center
-            colors.append(color1)
-            cylinder_vertices.append(vertices)
-            cylinder_faces.append(self.cylinder_faces + vertex_offset)
-            cylinder_colors.append(colors)
-            vertex_offset += len(vertices)
-
-            # Cylinder 2
-            vertices = []
-            colors = []
-            for z in [0, bond2_length]:
-                for i in range(self.n_segments):
-                    x = cos_theta[i] * bond_radius
-                    y = sin_theta[i] * bond_radius
-                    pos = mid_point + bond_dir * z + v1 * x + v2 * y
-                    vertices.append(pos)
-                    colors.append(color2)
-            vertices.append(mid_point)  # Bottom center
-            colors.append(color2)
-            vertices.append(mid_point + bond_dir * bond2_length)  # Top center
-            colors.append(color2)
-            cylinder_vertices.append(vertices)
-            cylinder_faces.append(self.cylinder_faces + vertex_offset)
-            cylinder_colors.append(colors)
-            vertex_offset += len(vertices)
-
-        # Merge all cylinders
-        if cylinder_vertices:
-            vertices = np.vstack(cylinder_vertices)
-            faces = np.vstack(cylinder_faces)
-            colors = np.vstack(cylinder_colors)
-            mesh_data = MeshData(vertices=vertices, faces=faces, vertex_colors=colors)
-            mesh = Mesh(
-                meshdata=mesh_data,
-                shading='smooth',
-                parent=self.view.scene
-            )
-
-            self.bond_items.append(mesh)
+        # Orthogonal vectors
+        v1 = np.where(np.abs(directions[:, 2:3]) < 0.999,
+                      np.cross(directions, [0, 0, 1]),
+                      np.cross(directions, [0, 1, 0]))
+        v1 /= np.linalg.norm(v1, axis=1, keepdims=True)
+        v2 = np.cross(directions, v1)
+        v2 /= np.linalg.norm(v2, axis=1, keepdims=True)
+
+        ring = (cos_theta[np.newaxis, :, np.newaxis] * v1[:, np.newaxis, :] +
+                sin_theta[np.newaxis, :, np.newaxis] * v2[:, np.newaxis, :]) * radius
+        ends = starts + directions * lengths[:, np.newaxis]
+        # Per cylinder: bottom ring, top ring, bottom center, top center
+        vertices = np.concatenate((starts[:, np.newaxis] + ring, ends[:, np.newaxis] + ring,
+                                   starts[:, np.newaxis], ends[:, np.newaxis]), axis=1)
+        n_vertices = vertices.shape[1]
+        faces = self.cylinder_faces[np.newaxis] + (np.arange(starts.shape[0]) * n_vertices)[:, np.newaxis, np.newaxis]
+        vertex_colors = np.repeat(colors, n_vertices, axis=0)
+        return vertices.reshape(-1, 3), faces.reshape(-1, 3), vertex_colors
 
     def show_elem(self, structure):
         """Draw atoms as glossy spheres with merged geometry."""
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+整个数据集的几何检查和几何统计
+每个结构用截断半径内的近邻搜索 找出 距离/共价半径之和 最小的原子对(最差的键)
+比值小于系数的结构就是非物理结构 与Structure.adjust_reasonable的判断一致
+GeometryStatistics 每个结构的最小距离、密度、每原子体积和配位数 可以作为子图和筛选条件
+结构按块分发到进程池 按块汇报进度 结果按输入顺序返回
+"""
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from ase.data import atomic_masses as ase_atomic_masses
+
+from .neighbor import get_neighbor_pairs, get_pair_min_distances, VOLUME_EPS
+from .structure import covalent_radii_table, table_info, MINI_DISTANCE_CUTOFF
+
+# 每块的结构数
+SCAN_CHUNK_SIZE = 256
+# 结构数少于该值时在当前进程中计算 避免启动进程池的开销
+SCAN_PARALLEL_THRESHOLD = 2000
+
+
+def get_worst_bond(lattice, positions, radii, coefficient):
+    """
+    结构中 距离/共价半径之和 最小的原子对
+    只搜索到 最大共价半径之和×系数 更远的原子对不会是非物理的
+
+    参数:
+    lattice: 晶格 3x3
+    positions: 笛卡尔坐标 Nx3
+    radii: 每个原子的共价半径(Å)
+    coefficient: 系数
+
+    返回:
+    (比值, i, j, 距离) 截断半径内没有原子对时为 (inf, -1, -1, inf)
+    """
+    radii = np.asarray(radii, dtype=np.float64)
+    if radii.shape[0] == 0:
+        return np.inf, -1, -1, np.inf
+    i, j, distances, _ = get_neighbor_pairs(lattice, positions, 2 * radii.max() * coefficient)
+    if i.shape[0] == 0:
+        return np.inf, -1, -1, np.inf
+    ratios = distances / (radii[i] + radii[j])
+    worst = int(np.argmin(ratios))
+    a, b = sorted((int(i[worst]), int(j[worst])))
+    return float(ratios[worst]), a, b, float(distances[worst])
+
+
+def _scan_chunk(items, coefficient):
+    """进程池中执行 items为[(晶格, 坐标, 共价半径)]"""
+    ratios = np.empty(len(items), dtype=np.float64)
+    pairs = np.empty((len(items), 2), dtype=np.int64)
+    distances = np.empty(len(items), dtype=np.float64)
+    for row, (lattice, positions, radii) in enumerate(items):
+        ratios[row], pairs[row, 0], pairs[row, 1], distances[row] = get_worst_bond(lattice, positions, radii,
+                                                                                   coefficient)
+    return ratios, pairs, distances
+
+
+def iter_chunk_results(structures, make_item, worker, args=(), n_jobs=None, chunk_size=SCAN_CHUNK_SIZE,
+                       parallel_threshold=SCAN_PARALLEL_THRESHOLD):
+    """
+    把结构按块交给进程池计算 按输入顺序逐块返回
+
+    参数:
+    structures: 结构列表
+    make_item: 在当前进程中把结构转成可以pickle的轻量数据
+    worker: 模块级函数 worker(items, *args) 返回这一块的结果
+    n_jobs: 进程数 None为CPU数
+    chunk_size: 每块的结构数
+    parallel_threshold: 结构数少于该值时不使用进程池
+
+    返回:
+    生成器 每块产生 (结构下标slice, worker的结果)
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_structures = len(structures)
+    chunk_size = max(int(chunk_size), 1)
+
+    def make_chunk(start):
+        stop = min(start + chunk_size, n_structures)
+        return slice(start, stop), [make_item(structure) for structure in structures[start:stop]]
+
+    starts = range(0, n_structures, chunk_size)
+    if n_jobs == 1 or n_structures < parallel_threshold:
+        for start in starts:
+            rows, items = make_chunk(start)
+            yield rows, worker(items, *args)
+        return
+
+    # 界面进程中有Qt的线程 fork出的子进程可能继承被占用的锁 统一用spawn启动
+    # worker必须是可以导入的模块级函数 随机数在每块中重新设置种子
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+        # 最多同时提交2倍进程数的块 避免把整个数据集一次性序列化到队列中
+        pending = deque()
+        try:
+            for start in starts:
+                rows, items = make_chunk(start)
+                pending.append((rows, executor.submit(worker, items, *args)))
+                if len(pending) >= 2 * n_jobs:
+                    rows, future = pending.popleft()
+                    yield rows, future.result()
+            while pending:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        finally:
+            # 提前关闭生成器(中止或出错)时 还没开始的块不再计算
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_worst_bonds(structures, coefficient=0.7, n_jobs=None, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    逐块计算每个结构最差的键
+
+    参数:
+    structures: 结构列表
+    coefficient: 系数 决定近邻搜索的截断半径
+    n_jobs: 进程数 None为CPU数
+    chunk_size: 每块的结构数
+
+    返回:
+    生成器 按顺序每块产生 (结构下标slice, 比值(n,), 原子对(n, 2), 距离(n,))
+    """
+    make_item = lambda structure: (structure.cell, structure.positions, structure.covalent_radii)
+    for rows, result in iter_chunk_results(structures, make_item, _scan_chunk, (coefficient,), n_jobs, chunk_size):
+        yield (rows, *result)
+
+
+def find_non_physical_structures(structures, coefficient=0.7, n_jobs=None, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    找出存在 距离 < 共价半径之和×系数 的原子对的结构
+
+    返回:
+    (非物理结构的下标, 这些结构最差的原子对(n, 2), 对应的距离(n,))
+    """
+    ratios = np.empty(len(structures), dtype=np.float64)
+    pairs = np.empty((len(structures), 2), dtype=np.int64)
+    distances = np.empty(len(structures), dtype=np.float64)
+    for rows, chunk_ratios, chunk_pairs, chunk_distances in iter_worst_bonds(structures, coefficient, n_jobs,
+                                                                             chunk_size):
+        ratios[rows], pairs[rows], distances[rows] = chunk_ratios, chunk_pairs, chunk_distances
+    indices = np.flatnonzero(ratios < coefficient)
+    return indices, pairs[indices], distances[indices]
+
+
+# 配位数直方图的最后一格 配位数更大的原子也计入这一格
+COORDINATION_MAX = 16
+# 成键判据 距离 < 共价半径之和×系数 与结构显示中的键一致
+BOND_COEFFICIENT = 1.15
+# 1 amu/Å^3 = 1.66053906660 g/cm^3
+AMU_PER_A3_TO_G_PER_CM3 = 1.66053906660
+GEOMETRY_FIELDS = ("min_distance", "density", "volume_per_atom", "coordination")
+# 与covalent_radii_table一样按原子序数索引
+atomic_masses_table = np.zeros_like(covalent_radii_table)
+atomic_masses_table[:min(len(ase_atomic_masses), len(atomic_masses_table))] = ase_atomic_masses[:len(atomic_masses_table)]
+
+
+def get_structure_geometry(lattice, positions, numbers, cutoff):
+    """
+    单个结构的几何统计
+
+    参数:
+    lattice: 晶格 3x3
+    positions: 笛卡尔坐标 Nx3
+    numbers: 原子序数 (N,)
+    cutoff: 统计最小距离的截断半径
+
+    返回:
+    (最小原子间距, 密度g/cm^3, 每原子体积Å^3, 平均配位数, 配位数直方图(COORDINATION_MAX+1,),
+     元素对的原子序数(P, 2), 元素对的最小距离(P,))
+    截断半径内没有原子对时最小距离为nan 没有晶格时密度和体积为nan
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    n_atoms = numbers.shape[0]
+    volume = abs(np.linalg.det(np.asarray(lattice, dtype=np.float64)))
+    if volume < VOLUME_EPS or n_atoms == 0:
+        density = volume_per_atom = np.nan
+    else:
+        density = atomic_masses_table[numbers].sum() / volume * AMU_PER_A3_TO_G_PER_CM3
+        volume_per_atom = volume / n_atoms
+
+    radii = covalent_radii_table[numbers]
+    cutoff = max(cutoff, 2 * radii.max() * BOND_COEFFICIENT) if n_atoms else cutoff
+    i, j, distances, _ = get_neighbor_pairs(lattice, positions, cutoff)
+
+    # 配位数 自己的周期像也算一个近邻
+    bonded = distances < (radii[i] + radii[j]) * BOND_COEFFICIENT
+    coordination = np.bincount(i[bonded], minlength=n_atoms) + np.bincount(j[bonded], minlength=n_atoms)
+    histogram = np.bincount(np.minimum(coordination, COORDINATION_MAX), minlength=COORDINATION_MAX + 1)
+    mean_coordination = coordination.mean() if n_atoms else np.nan
+
+    symbols, species = np.unique(numbers, return_inverse=True)
+    minimum = get_pair_min_distances(species, i, j, distances, symbols.shape[0])
+    rows, cols = np.triu_indices(symbols.shape[0])
+    found = np.isfinite(minimum[rows, cols])
+    pair_numbers = np.column_stack((symbols[rows[found]], symbols[cols[found]]))
+    pair_min = minimum[rows[found], cols[found]]
+    min_distance = pair_min.min() if pair_min.shape[0] else np.nan
+    return min_distance, density, volume_per_atom, mean_coordination, histogram, pair_numbers, pair_min
+
+
+def _geometry_chunk(items, cutoff):
+    """进程池中执行 items为[(晶格, 坐标, 原子序数)]"""
+    return [get_structure_geometry(lattice, positions, numbers, cutoff) for lattice, positions, numbers in items]
+
+
+class GeometryStatistics:
+    """
+    整个数据集每个结构的几何统计
+    min_distance 最小原子间距(Å) density 密度(g/cm^3) volume_per_atom 每原子体积(Å^3)
+    coordination 平均配位数 coordination_histogram 配位数直方图
+    pair_min 每种元素对的最小距离 (结构数, 元素对数) 截断半径内没有该元素对时为nan
+    """
+    def __init__(self, min_distance, density, volume_per_atom, coordination, coordination_histogram,
+                 pair_numbers, pair_min, cutoff=MINI_DISTANCE_CUTOFF):
+        self.min_distance = np.asarray(min_distance, dtype=np.float32)
+        self.density = np.asarray(density, dtype=np.float32)
+        self.volume_per_atom = np.asarray(volume_per_atom, dtype=np.float32)
+        self.coordination = np.asarray(coordination, dtype=np.float32)
+        self.coordination_histogram = np.asarray(coordination_histogram, dtype=np.int32)
+        self.pair_numbers = np.asarray(pair_numbers, dtype=np.int64).reshape(-1, 2)
+        self.pair_min = np.asarray(pair_min, dtype=np.float32).reshape(self.min_distance.shape[0], -1)
+        self.cutoff = float(cutoff)
+
+    def __len__(self):
+        return self.min_distance.shape[0]
+
+    @classmethod
+    def compute(cls, structures, cutoff=MINI_DISTANCE_CUTOFF, n_jobs=None, chunk_size=SCAN_CHUNK_SIZE,
+                progress=None):
+        """
+        并行计算所有结构的几何统计
+        :param progress: 每完成一块调用progress(已完成的结构数)
+        """
+        n_structures = len(structures)
+        scalars = np.full((n_structures, 4), np.nan)
+        histogram = np.zeros((n_structures, COORDINATION_MAX + 1), dtype=np.int32)
+        pair_codes = []
+        pair_values = []
+        pair_rows = []
+        make_item = lambda structure: (structure.cell, structure.positions, structure.number_array)
+        for rows, results in iter_chunk_results(structures, make_item, _geometry_chunk, (cutoff,), n_jobs,
+                                                chunk_size):
+            for row, result in zip(range(rows.start, rows.stop), results):
+                scalars[row] = result[:4]
+                histogram[row] = result[4]
+                pair_codes.append(result[5][:, 0] * len(covalent_radii_table) + result[5][:, 1])
+                pair_values.append(result[6])
+                pair_rows.append(np.full(result[6].shape[0], row))
+            if progress is not None:
+                progress(rows.stop)
+
+        # 所有结构中出现过的元素对作为列
+        pair_codes = np.concatenate(pair_codes) if pair_codes else np.zeros(0, dtype=np.int64)
+        codes, columns = np.unique(pair_codes, return_inverse=True)
+        pair_min = np.full((n_structures, codes.shape[0]), np.nan, dtype=np.float32)
+        if codes.shape[0]:
+            pair_min[np.concatenate(pair_rows), columns] = np.concatenate(pair_values)
+        pair_numbers = np.column_stack(np.divmod(codes, len(covalent_radii_table)))
+        return cls(scalars[:, 0], scalars[:, 1], scalars[:, 2], scalars[:, 3], histogram,
+                   pair_numbers, pair_min, cutoff)
+
+    @property
+    def pair_names(self):
+        return [f"{table_info[str(a)]['symbol']}-{table_info[str(b)]['symbol']}" for a, b in self.pair_numbers.tolist()]
+
+    @property
+    def fields(self):
+        """可以用来筛选的量 几何统计量和每种元素对的最小距离"""
+        return list(GEOMETRY_FIELDS) + self.pair_names
+
+    def get_values(self, field):
+        """按名字取出每个结构的值 元素对写成 A-B"""
+        if field in GEOMETRY_FIELDS:
+            return getattr(self, field)
+        names = self.pair_names
+        if field not in names:
+            a, _, b = field.partition("-")
+            field = f"{b}-{a}"
+        if field not in names:
+            raise KeyError(f"Unknown geometry field: {field}")
+        return self.pair_min[:, names.index(field)]
+
+    def select(self, field, minimum=None, maximum=None):
+        """
+        值在[minimum, maximum]内的结构 nan(没有该元素对或没有晶格)的结构不选中
+        :return: 结构下标
+        """
+        values = self.get_values(field)
+        mask = np.isfinite(values)
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+        return np.flatnonzero(mask)
+
+    def save(self, path, **metadata):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, min_distance=self.min_distance, density=self.density,
+                     volume_per_atom=self.volume_per_atom, coordination=self.coordination,
+                     coordination_histogram=self.coordination_histogram, pair_numbers=self.pair_numbers,
+                     pair_min=self.pair_min, cutoff=self.cutoff, metadata=json.dumps(metadata))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取save保存的统计
+        :return: (统计, metadata)
+        """
+        with np.load(path) as data:
+            statistics = cls(data["min_distance"], data["density"], data["volume_per_atom"], data["coordination"],
+                             data["coordination_histogram"], data["pair_numbers"], data["pair_min"],
+                             float(data["cutoff"]))
+            metadata = json.loads(str(data["metadata"]))
+        return statistics, metadata
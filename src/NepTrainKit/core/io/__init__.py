@@ -3,8 +3,20 @@
 # @Time    : 2024/10/18 15:24
 # @Author  : 兵
 # @email    : 1747193328@qq.com
-from .nep import NepTrainResultData
-from .deepmd import DeepmdResultData
+# 结果数据依赖Qt 第一次访问时才导入 描述符缓存等模块可以在界面之外使用
+_lazy_imports = {
+    "NepTrainResultData": ".nep",
+    "DeepmdResultData": ".deepmd",
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
 
 
 
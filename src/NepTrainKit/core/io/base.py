@@ -6,6 +6,7 @@
 import os
 import re
 import traceback
+from collections.abc import MutableSet
 from functools import cached_property
 from pathlib import Path
 
@@ -15,47 +16,29 @@ from loguru import logger
 from numpy import bool_
 
 from NepTrainKit import utils
-from NepTrainKit.core import Structure, MessageManager
+from NepTrainKit.core import Structure, MessageManager, Config
 from NepTrainKit.core.calculator import NEPProcess
-from NepTrainKit.core.io.utils import read_nep_out_file, parse_array_by_atomnum
-from NepTrainKit.core.types import Brushes
+from NepTrainKit.core.geometry import GeometryStatistics
+from NepTrainKit.core.io.descriptor_store import get_descriptor_store
+from NepTrainKit.core.io.pca import IncrementalPCA
+from NepTrainKit.core.io.projection import ProjectionRegistry
+from NepTrainKit.core.io.utils import (get_file_hash, read_descriptor_file, read_descriptor_binary,
+                                       write_descriptor_binary)
+from NepTrainKit.core.types import Brushes, FREE_AXES_TITLES
 
 import numpy as np
+
+# get_max_error_index支持的结构误差聚合方式
+MAX_ERROR_MODES = ("max", "mean", "sum", "rmse")
+
 def pca(X, n_components=None):
     """
     执行主成分分析 (PCA)，只返回降维后的数据
+    分块累加协方差 特征维度很大时使用随机SVD 详见IncrementalPCA
     """
-    n_samples, n_features = X.shape
-
-    # 1. 计算均值并中心化数据
-    mean = np.mean(X, axis=0)
-    X_centered = X - mean
-    #樊老师说不用处理 就不减去均值了
-    # 但是我还不确定哪种好 还是保持现状把
-    # X_centered = X
-
-
-    # 3. 计算协方差矩阵
-    cov_matrix = np.dot(X_centered.T, X_centered) / (n_samples - 1)
-
-    # 4. 计算特征值和特征向量
-    eigenvalues, eigenvectors = np.linalg.eigh(cov_matrix)
-
-    # 5. 特征值和特征向量按降序排列
-    idx = np.argsort(eigenvalues)[::-1]
-    eigenvalues = eigenvalues[idx]
-    eigenvectors = eigenvectors[:, idx]
-
-    # 6. 确定要保留的主成分数量
-    if n_components is None:
-        n_components = n_features
-    elif n_components > n_features:
-        n_components = n_features
-
-    # 7. 将数据投影到前n_components个主成分上 (降维)
-    X_pca = np.dot(X_centered, eigenvectors[:, :n_components])
-
-    return X_pca.astype(np.float32)
+    if n_components is None or n_components > X.shape[1]:
+        n_components = X.shape[1]
+    return IncrementalPCA(n_components).fit_transform(X)
 
 
 
@@ -117,6 +100,188 @@ class DataBase:
         return self.now_data[item]
 
 
+class SelectionMask(MutableSet):
+    """
+    用布尔掩码保存选中的结构下标
+    批量的选中、取消、反选和计数都是数组操作
+    同时实现了set的接口(in len 迭代 add discard clear ==) 兼容原来用set的代码
+    """
+    def __init__(self, size=0):
+        self._mask = np.zeros(size, dtype=bool)
+        self._count = 0
+
+    @staticmethod
+    def _as_indices(indices):
+        if isinstance(indices, (int, np.integer)):
+            return np.array([indices], dtype=np.int64)
+        if isinstance(indices, (set, frozenset, SelectionMask)):
+            indices = list(indices)
+        return np.asarray(indices, dtype=np.int64).reshape(-1)
+
+    def _ensure_size(self, size):
+        if size > self._mask.shape[0]:
+            mask = np.zeros(size, dtype=bool)
+            mask[:self._mask.shape[0]] = self._mask
+            self._mask = mask
+
+    def resize(self, size):
+        """设置结构总数 会清空当前选择"""
+        self._mask = np.zeros(size, dtype=bool)
+        self._count = 0
+
+    @property
+    def mask(self):
+        """长度为结构总数的布尔数组 不要直接修改"""
+        return self._mask
+
+    @property
+    def indices(self):
+        """选中结构的下标 从小到大排列"""
+        return np.flatnonzero(self._mask)
+
+    def update(self, indices):
+        """批量选中"""
+        idx = self._as_indices(indices)
+        idx = idx[idx >= 0]
+        if idx.size == 0:
+            return
+        self._ensure_size(int(idx.max()) + 1)
+        self._mask[idx] = True
+        self._count = int(np.count_nonzero(self._mask))
+
+    def difference_update(self, indices):
+        """批量取消选中"""
+        idx = self._as_indices(indices)
+        idx = idx[(idx >= 0) & (idx < self._mask.shape[0])]
+        if idx.size == 0:
+            return
+        self._mask[idx] = False
+        self._count = int(np.count_nonzero(self._mask))
+
+    def invert(self, active_mask):
+        """
+        在active_mask范围内反选
+        :param active_mask: 可以被选中的结构掩码
+        """
+        active_mask = np.asarray(active_mask, dtype=bool)
+        self._ensure_size(active_mask.shape[0])
+        n = active_mask.shape[0]
+        self._mask[:n] = ~self._mask[:n] & active_mask
+        self._mask[n:] = False
+        self._count = int(np.count_nonzero(self._mask))
+
+    def add(self, value):
+        self.update(value)
+
+    def discard(self, value):
+        self.difference_update(value)
+
+    def clear(self):
+        self._mask[:] = False
+        self._count = 0
+
+    def __contains__(self, value):
+        # 只接受整数 1.7或"3"不能当成下标
+        if not isinstance(value, (int, np.integer)):
+            return False
+        return 0 <= value < self._mask.shape[0] and bool(self._mask[value])
+
+    def __iter__(self):
+        return iter(self.indices.tolist())
+
+    def __len__(self):
+        return self._count
+
+    @classmethod
+    def _from_iterable(cls, it):
+        # & | - 等运算返回普通的set
+        return set(it)
+
+    def __repr__(self):
+        return f"SelectionMask({self.indices.tolist()})"
+
+
+class ErrorStatistics:
+    """
+    按结构缓存误差的中间量 删除和撤销时只更新变化的结构
+    每个结构保存 元素个数 误差平方和 绝对误差和 参考值之和 参考值平方和
+    由这些量可以得到RMSE MAE R² 以及任意结构分组的误差
+    """
+    def __init__(self, reference, prediction, structure_index, n_structures=None):
+        """
+        :param reference: 参考值(dft) 形状(N, cols)
+        :param prediction: 预测值(nep) 形状(N, cols)
+        :param structure_index: 每一行对应结构的原始下标
+        :param n_structures: 结构总数 默认取最大下标+1
+        """
+        structure_index = np.asarray(structure_index, dtype=np.int64)
+        if n_structures is None:
+            n_structures = int(structure_index.max()) + 1 if structure_index.size else 0
+        reference = np.asarray(reference, dtype=np.float64).reshape(structure_index.shape[0], -1)
+        diff = np.asarray(prediction, dtype=np.float64).reshape(structure_index.shape[0], -1) - reference
+
+        def per_structure(values):
+            return np.bincount(structure_index, weights=values.sum(axis=1), minlength=n_structures)
+
+        self.count = np.bincount(structure_index, minlength=n_structures).astype(np.float64) * reference.shape[1]
+        self.sq_sum = per_structure(np.square(diff))
+        self.abs_sum = per_structure(np.abs(diff))
+        self.ref_sum = per_structure(reference)
+        self.ref_sq_sum = per_structure(np.square(reference))
+        self._fields = (self.count, self.sq_sum, self.abs_sum, self.ref_sum, self.ref_sq_sum)
+
+        self._active_mask = np.ones(n_structures, dtype=bool)
+        self._totals = np.array([field.sum() for field in self._fields])
+        # 和DataBase一样 每次删除记录一次结构下标
+        self._history = []
+
+    def _update(self, structures, sign):
+        self._totals += sign * np.array([field[structures].sum() for field in self._fields])
+        self._active_mask[structures] = sign > 0
+
+    def remove(self, structures):
+        """删除结构 只减去当前还存在的结构"""
+        structures = np.unique(np.asarray(structures, dtype=np.int64).reshape(-1))
+        structures = structures[(structures >= 0) & (structures < self._active_mask.shape[0])]
+        self._history.append(structures)
+        self._update(structures[self._active_mask[structures]], -1)
+
+    def revoke(self):
+        """撤销上一次删除 与DataBase.revoke一致 记录里的结构全部恢复"""
+        if self._history:
+            structures = self._history.pop()
+            self._update(structures[~self._active_mask[structures]], 1)
+
+    @staticmethod
+    def _summary(count, sq_sum, abs_sum, ref_sum, ref_sq_sum):
+        if count <= 0:
+            return {"count": 0, "rmse": 0.0, "mae": 0.0, "r2": float("nan")}
+        ss_tot = ref_sq_sum - ref_sum * ref_sum / count
+        r2 = 1 - sq_sum / ss_tot if ss_tot > 0 else float("nan")
+        return {
+            "count": int(round(count)),
+            "rmse": float(np.sqrt(max(sq_sum, 0) / count)),
+            "mae": float(max(abs_sum, 0) / count),
+            "r2": float(r2),
+        }
+
+    def summary(self):
+        """当前保留结构的 count rmse mae r2"""
+        return self._summary(*self._totals)
+
+    def group_summary(self, labels):
+        """
+        按结构标签分组统计 比如Config_type
+        :param labels: 每个结构(原始下标)的标签 长度为结构总数
+        :return: {label: summary}
+        """
+        labels = np.asarray(labels)
+        active = np.flatnonzero(self._active_mask)
+        names, inverse = np.unique(labels[active], return_inverse=True)
+        sums = [np.bincount(inverse, weights=field[active], minlength=names.shape[0]) for field in self._fields]
+        return {name: self._summary(*values) for name, *values in zip(names.tolist(), *sums)}
+
+
 class NepData:
     """
     structure_data 结构性质数据点
@@ -135,7 +300,7 @@ class NepData:
         else:
             group = np.arange(len(group_list),dtype=np.uint32 )
             self.group_array=DataBase(group.repeat(group_list))
-
+        self._error_statistics = None
         for key,value in kwargs.items():
             setattr(self,key,value)
     @property
@@ -191,55 +356,141 @@ class NepData:
 
         self.data.remove(remove_indices)
         self.group_array.remove(remove_indices)
+        if len(remove_indices) and self._error_statistics is not None:
+            self._error_statistics.remove(self.group_array.all_data[remove_indices])
 
     def revoke(self):
         """将上一次删除的数据恢复"""
+        if self.data._history and self._error_statistics is not None:
+            self._error_statistics.revoke()
         self.data.revoke()
         self.group_array.revoke()
 
+    @property
+    def reference_cols(self):
+        """参考值(dft)所在的列"""
+        return slice(self.cols, None)
+
+    @property
+    def prediction_cols(self):
+        """预测值(nep)所在的列"""
+        return slice(None, self.cols)
+
+    @property
+    def error_statistics(self) -> ErrorStatistics:
+        """
+        按结构缓存的误差统计 第一次访问时从全部数据计算
+        然后按照当前的删除记录同步
+        """
+        if self._error_statistics is None:
+            all_data = self.all_data
+            structure_index = self.group_array.all_data
+            statistics = ErrorStatistics(all_data[:, self.reference_cols],
+                                         all_data[:, self.prediction_cols],
+                                         structure_index)
+            for indices in self.data._history:
+                statistics.remove(structure_index[indices])
+            self._error_statistics = statistics
+        return self._error_statistics
+
+    def reset_error_statistics(self):
+        """数据被原地修改后(比如平移能量)调用 下次使用时重新计算"""
+        self._error_statistics = None
+
+    def get_error_summary(self):
+        """当前数据的 count rmse mae r2"""
+        if not self.cols:
+            return ErrorStatistics._summary(0, 0, 0, 0, 0)
+        return self.error_statistics.summary()
+
+    def get_group_error_summary(self, labels):
+        """
+        按结构的标签分组统计误差
+        :param labels: 每个结构(原始下标)对应的标签 例如Config_type
+        """
+        if not self.cols:
+            return {}
+        return self.error_statistics.group_summary(labels)
+
     def get_rmse(self):
         if not self.cols:
             return 0
-        return np.sqrt(((self.now_data[:, 0:self.cols] - self.now_data[:, self.cols: ]) ** 2).mean( ))
+        return self.get_error_summary()["rmse"]
 
-    def get_formart_rmse(self):
-        rmse=self.get_rmse()
+    def get_error_unit(self):
+        """
+        误差显示的单位和换算系数
+        :return: (单位, 系数) 没有对应单位的数据返回("", 1)
+        """
         if self.title =="energy":
-            unit="meV/atom"
-            rmse*=1000
+            return "meV/atom", 1000
         elif self.title =="force":
-            unit="meV/A"
-            rmse*=1000
+            return "meV/A", 1000
         elif self.title =="virial":
-            unit="meV/atom"
-            rmse*=1000
+            return "meV/atom", 1000
         elif self.title =="stress":
-            unit="MPa"
-            rmse*=1000
+            return "MPa", 1000
         elif "Polar" in self.title:
-            unit="(m.a.u./atom)"
-            rmse*=1000
+            return "(m.a.u./atom)", 1000
         elif "dipole" == self.title:
-            unit="(m.a.u./atom)"
-            rmse*=1000
+            return "(m.a.u./atom)", 1000
         elif "spin" ==self.title:
-            unit = "meV/μB"
-            rmse*=1000
-        else:
+            return "meV/μB", 1000
+        return "", 1
+
+    def get_formart_rmse(self):
+        unit, scale = self.get_error_unit()
+        if not unit:
             return ""
-        return f"{rmse:.2f} {unit}"
+        return f"{self.get_rmse() * scale:.2f} {unit}"
 
-    def get_max_error_index(self,nmax):
+    def get_structure_error(self, mode="max"):
+        """
+        按结构聚合误差
+        每一行的误差是nep与参考值绝对差之和 再按结构做max/mean/sum 或者计算结构的RMSE
+        :param mode: 聚合方式 见MAX_ERROR_MODES
+        :return: 结构的原始下标, 每个结构的误差
+        """
+        if mode not in MAX_ERROR_MODES:
+            raise ValueError(f"Unsupported error mode: {mode}, expected one of {MAX_ERROR_MODES}")
+        structure_index = self.group_array.now_data
+        if not self.cols or structure_index.shape[0] == 0:
+            return np.array([], dtype=structure_index.dtype), np.array([], dtype=np.float64)
+        diff = self.now_data[:, 0:self.cols] - self.now_data[:, self.cols:]
+        # group_array按结构顺序排列 同一结构的行是连续的
+        starts = np.flatnonzero(np.r_[True, structure_index[1:] != structure_index[:-1]])
+        if mode == "rmse":
+            row_error = np.mean(np.square(diff, dtype=np.float64), axis=1)
+        else:
+            row_error = np.sum(np.abs(diff), axis=1, dtype=np.float64)
+        if mode == "max":
+            error = np.maximum.reduceat(row_error, starts)
+        else:
+            error = np.add.reduceat(row_error, starts)
+            if mode != "sum":
+                error /= np.diff(np.r_[starts, row_error.shape[0]])
+            if mode == "rmse":
+                error = np.sqrt(error)
+        return structure_index[starts], error
+
+    def get_max_error_index(self,nmax,mode="max"):
         """
         返回nmax个最大误差的下标
-        这个下标是结构的原始下标
+        这个下标是结构的原始下标 按误差从大到小排列
+        :param nmax: 返回的结构数
+        :param mode: 结构误差的聚合方式 max mean sum rmse
         """
-        error = np.sum(np.abs(self.now_data[:, 0:self.cols] - self.now_data[:, self.cols: ]), axis=1)
-        rmse_max_ids = np.argsort(-error)
-        structure_index =self.group_array.now_data[rmse_max_ids]
-        index,indices=np.unique(structure_index,return_index=True)
-
-        return   structure_index[np.sort(indices)][:nmax].tolist()
+        structure_index, error = self.get_structure_error(mode)
+        nmax = min(int(nmax), error.shape[0])
+        if nmax <= 0:
+            return []
+        if nmax < error.shape[0]:
+            top = np.argpartition(-error, nmax - 1)[:nmax]
+        else:
+            top = np.arange(error.shape[0])
+        # 只对选出的nmax个排序 相同误差时保持结构顺序
+        top = top[np.lexsort((top, -error[top]))]
+        return structure_index[top].tolist()
 
 
 
@@ -274,6 +525,12 @@ class DPPlotData(NepData):
         self.x_cols=slice(None,self.cols)
         self.y_cols=slice(self.cols,None)
     @property
+    def reference_cols(self):
+        return self.x_cols
+    @property
+    def prediction_cols(self):
+        return self.y_cols
+    @property
     def normal_color(self):
         return Brushes.TransparentBrush
     @property
@@ -329,7 +586,13 @@ class ResultData(QObject):
         self.data_xyz_path=data_xyz_path
         self.nep_txt_path=nep_txt_path
 
-        self.select_index=set()
+        self.select_index=SelectionMask()
+        # 每个结构到参考训练集的描述符距离 描述符图按它着色 None表示不着色
+        self.descriptor_novelty=None
+        # 几何统计 加载时读取缓存或计算
+        self._geometry_statistics=None
+        # 几何统计的子图 配置geometry_panes打开时才加载
+        self.geometry_datasets=[]
 
         self.nep_calc_thread = NEPProcess()
 
@@ -337,6 +600,7 @@ class ResultData(QObject):
     def load_structures(self):
         structures = Structure.read_multiple(self.data_xyz_path)
         self._atoms_dataset=StructureData(structures)
+        self.select_index.resize(len(structures))
         self.atoms_num_list = np.array([len(struct) for struct in self.structure.now_data])
 
 
@@ -353,6 +617,14 @@ class ResultData(QObject):
             self.load_structures()
             self._load_descriptors()
             self._load_dataset()
+            # 几何统计总是在加载线程中算好 筛选时不再等待 geometry_panes只决定是否显示子图
+            self.get_geometry_statistics()
+            if Config.getboolean("widget", "geometry_panes", False):
+                self._load_geometry_datasets()
+            for dataset in self.dataset:
+                #加载时就把每个结构的误差缓存起来 删除撤销时只做增量更新
+                if dataset.title not in FREE_AXES_TITLES and dataset.cols:
+                    dataset.error_statistics
             self.load_flag=True
         except:
             logger.error(traceback.format_exc())
@@ -371,6 +643,30 @@ class ResultData(QObject):
     def descriptor(self):
         return self._descriptor_dataset
 
+    @property
+    def structure_descriptor(self):
+        """降维前的结构描述符 行与结构的原始下标对应"""
+        return getattr(self, "_structure_descriptor", np.array([]))
+
+    def get_error_statistics(self, by_config_type=False):
+        """
+        统计每个数据集当前的误差
+        :param by_config_type: 为True时再按Config_type分组
+        :return: {title: {"count","rmse","mae","r2"}}
+            by_config_type时 {title: {config_type: {...}}}
+        """
+        result = {}
+        if by_config_type:
+            labels = np.array([structure.tag for structure in self.structure.all_data], dtype=object)
+        for dataset in self.dataset:
+            if dataset.title in FREE_AXES_TITLES or not dataset.cols:
+                continue
+            if by_config_type:
+                result[dataset.title] = dataset.get_group_error_summary(labels)
+            else:
+                result[dataset.title] = dataset.get_error_summary()
+        return result
+
     @property
     def num(self):
         return self._atoms_dataset.num
@@ -386,15 +682,11 @@ class ResultData(QObject):
         传入一个索引列表，将索引对应的结构标记为选中状态
         这个下标是结构在train.xyz中的索引
         """
-
-
-        # 统一转换为 NumPy 数组
-        idx = np.asarray(indices, dtype=int) if not isinstance(indices, int) else np.array([indices])
-        # 去重并过滤有效索引（在数据范围内且为活跃数据）
-        idx = np.unique(idx)
-        idx = idx[(idx >= 0) & (idx < len(self.structure.all_data)) & (self.structure.data._active_mask[idx])]
-        # 批量添加到选中集合
-        self.select_index.update(idx)
+        active_mask = self.structure.data._active_mask
+        idx = SelectionMask._as_indices(indices)
+        # 过滤有效索引（在数据范围内且为活跃数据）
+        idx = idx[(idx >= 0) & (idx < active_mask.shape[0])]
+        self.select_index.update(idx[active_mask[idx]])
 
         self.updateInfoSignal.emit()
 
@@ -403,29 +695,19 @@ class ResultData(QObject):
         check_list 传入一个索引列表，将索引对应的结构标记为未选中状态
         这个下标是结构在train.xyz中的索引
         """
-        if isinstance(_list,int):
-            _list=[_list]
-        for i in _list:
-            if i in self.select_index:
-                self.select_index.remove(i)
+        self.select_index.difference_update(_list)
 
         self.updateInfoSignal.emit()
 
     def inverse_select(self):
         """Invert the current selection state of all active structures"""
-        active_indices = set(self.structure.data.now_indices.tolist())
-        selected_indices = set(self.select_index)
-        unselect = list(selected_indices)
-        select = list(active_indices - selected_indices)
-        if unselect:
-            self.uncheck(unselect)
-        if select:
-            self.select(select)
+        self.select_index.invert(self.structure.data._active_mask)
+        self.updateInfoSignal.emit()
     def export_selected_xyz(self,save_file_path):
         """
         导出当前选中的结构
         """
-        index=list(self.select_index)
+        index=self.select_index.indices
         try:
             with open(save_file_path,"w",encoding="utf8") as f:
                 index=self.structure.convert_index(index)
@@ -497,49 +779,156 @@ class ResultData(QObject):
         """
         删除所有selected的结构
         """
-        self.remove(list(self.select_index))
+        self.remove(self.select_index.indices)
         self.select_index.clear()
         self.updateInfoSignal.emit()
 
 
-    def _load_descriptors(self):
+    @property
+    def projection_registry(self) -> ProjectionRegistry:
+        """
+        降维模型注册表 保存在nep.txt旁边
+        同一个势函数下的训练集和测试集共用 描述符投影在同一个坐标系中
+        """
+        if getattr(self, "_projection_registry", None) is None:
+            self._projection_registry = ProjectionRegistry(self.nep_txt_path,
+                                                           fallback_dir=Path(self.data_xyz_path).parent)
+        return self._projection_registry
 
+    @utils.timeit
+    def _project_descriptors(self, desc_array):
+        """
+        把结构描述符投影到二维
+        注册表中已有当前势函数的PCA时直接投影 不再重新拟合
+        """
+        return self.projection_registry.project(desc_array, 2)
 
-        if os.path.exists(self.descriptor_path):
-            desc_array = read_nep_out_file(self.descriptor_path,dtype=np.float32)
+    def _calculate_descriptor(self, structures):
+        self.nep_calc_thread.run_nep3_calculator_process(self.nep_txt_path.as_posix(),
+            structures,
+            "descriptor" ,wait=True)
+        return self.nep_calc_thread.func_result
 
-        else:
-            desc_array = np.array([])
+    @property
+    def descriptor_cache_path(self):
+        """NepTrainKit自己保存的二进制结构描述符 与descriptor.out同名"""
+        return Path(self.descriptor_path).with_suffix(".bin")
+
+    def _read_descriptor_cache(self, model_hash):
+        """读取二进制缓存 势函数或数据文件与写缓存时不一致时返回None"""
+        cache_path = self.descriptor_cache_path
+        if not cache_path.exists():
+            return None
+        if (os.path.exists(self.descriptor_path)
+                and os.path.getmtime(self.descriptor_path) > cache_path.stat().st_mtime):
+            # descriptor.out是之后重新生成的
+            return None
+        try:
+            desc_array, metadata = read_descriptor_binary(cache_path, mmap=False)
+        except (OSError, ValueError):
+            logger.warning(f"Failed to read {cache_path}")
+            return None
+        # 数据文件被修改或重新生成后 即使结构数相同也不能沿用
+        if (desc_array is None or metadata.get("model_hash") != model_hash
+                or metadata.get("data_key") != self._get_data_file_key()
+                or desc_array.shape[0] != self.atoms_num_list.shape[0]):
+            return None
+        return desc_array
+
+    def _write_descriptor_cache(self, desc_array, model_hash):
+        try:
+            write_descriptor_binary(self.descriptor_cache_path, desc_array.astype(np.float32),
+                                    model_hash=model_hash, kind="structure",
+                                    data_key=self._get_data_file_key())
+        except OSError:
+            logger.warning(f"Failed to write {self.descriptor_cache_path}")
 
-        if desc_array.size == 0:
-            self.nep_calc_thread.run_nep3_calculator_process(self.nep_txt_path.as_posix(),
-                self.structure.now_data,
-                "descriptor" ,wait=True)
-            desc_array=self.nep_calc_thread.func_result
-            # desc_array = run_nep3_calculator_process(
-            #     )
+    @property
+    def geometry_cache_path(self):
+        """几何统计的缓存 与descriptor.out放在一起"""
+        descriptor_path = Path(self.descriptor_path)
+        return descriptor_path.with_name(descriptor_path.stem.replace("descriptor", "geometry", 1) + ".npz")
+
+    def _get_data_file_key(self):
+        """数据文件没有变化时缓存有效 几何统计和描述符的缓存共用"""
+        stat = os.stat(self.data_xyz_path)
+        structures = self.structure.all_data
+        return {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+                "num": len(structures), "atoms": int(sum(len(structure) for structure in structures))}
 
-            if desc_array.size != 0:
-                np.savetxt(self.descriptor_path, desc_array, fmt='%.6g')
-        else:
-            if desc_array.shape[0] == np.sum(self.atoms_num_list):
-                # 原子描述符 需要计算结构描述符
+    @property
+    def geometry_statistics(self):
+        """已经读取或计算过的几何统计 还没有时为None"""
+        return self._geometry_statistics
 
+    @utils.timeit
+    def get_geometry_statistics(self) -> GeometryStatistics:
+        """
+        所有结构(包括已删除的)的几何统计 行与结构的原始下标对应
+        优先读取缓存 否则用进程池计算后保存
+        """
+        if self._geometry_statistics is not None:
+            return self._geometry_statistics
+        key = self._get_data_file_key()
+        cache_path = self.geometry_cache_path
+        if cache_path.exists():
+            try:
+                statistics, metadata = GeometryStatistics.load(cache_path)
+                if metadata == key:
+                    self._geometry_statistics = statistics
+                    return statistics
+            except (OSError, ValueError, KeyError):
+                logger.warning(f"Failed to read {cache_path}")
+        statistics = GeometryStatistics.compute(self.structure.all_data)
+        try:
+            statistics.save(cache_path, **key)
+        except OSError:
+            logger.warning(f"Failed to write {cache_path}")
+        self._geometry_statistics = statistics
+        return statistics
 
-                desc_array = parse_array_by_atomnum(desc_array, self.atoms_num_list, map_func=np.mean, axis=0)
-            elif desc_array.shape[0] == self.atoms_num_list.shape[0]:
-                # 结构描述符
-                pass
+    def _load_geometry_datasets(self):
+        """
+        几何统计的子图
+        geometry: 纵轴最小原子间距 横轴每原子体积
+        coordination: 纵轴平均配位数 横轴密度
+        截断半径内没有原子对时最小距离画在截断半径处
+        """
+        statistics = self.get_geometry_statistics()
+        min_distance = np.nan_to_num(statistics.min_distance, nan=statistics.cutoff)
+        geometry_array = np.column_stack((min_distance, np.nan_to_num(statistics.volume_per_atom)))
+        coordination_array = np.column_stack((statistics.coordination, np.nan_to_num(statistics.density)))
+        self.geometry_datasets = [NepPlotData(geometry_array, title="geometry"),
+                                  NepPlotData(coordination_array, title="coordination")]
 
-            else:
+    def _load_descriptors(self):
+        model_hash = get_file_hash(self.nep_txt_path)
+        desc_array = self._read_descriptor_cache(model_hash)
+
+        if desc_array is None and os.path.exists(self.descriptor_path):
+            # 原子描述符按块读取并求结构平均
+            desc_array = read_descriptor_file(self.descriptor_path, self.atoms_num_list)
+            if desc_array is None:
                 self.descriptor_path.unlink(True)
-                return self._load_descriptors()
+            elif desc_array.size != 0:
+                self._write_descriptor_cache(desc_array, model_hash)
+
+        if desc_array is None or desc_array.size == 0:
+            # 同一个势函数算过的结构直接从描述符缓存读取
+            desc_array = get_descriptor_store().get(self.nep_txt_path, "structure",
+                                                    self.structure.now_data, self._calculate_descriptor)
+
+            if desc_array.size != 0:
+                self._write_descriptor_cache(desc_array, model_hash)
 
+        # 保留原始的结构描述符 供其他降维方法使用
+        self._structure_descriptor = desc_array
         if desc_array.size != 0:
             if desc_array.shape[1] > 2:
                 try:
-                    desc_array = pca(desc_array, 2)
+                    desc_array = self._project_descriptors(desc_array)
                 except:
+                    logger.error(traceback.format_exc())
                     MessageManager.send_error_message("PCA dimensionality reduction fails")
                     desc_array = np.array([])
 
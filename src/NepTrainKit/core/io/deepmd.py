@@ -9,7 +9,7 @@ from loguru import logger
 import glob
 from .base import NepPlotData, StructureData, ResultData,DPPlotData
 from NepTrainKit.core.structure import Structure, load_npy_structure,save_npy_structure
-from .utils import parse_array_by_atomnum,read_nep_out_file
+from .utils import segment_reduce,read_nep_out_file
 from .. import Config, MessageManager
 from ... import module_path
 def is_deepmd_path(folder)-> bool:
@@ -70,6 +70,7 @@ class DeepmdResultData(ResultData):
 
         structures = load_npy_structure(self.data_xyz_path)
         self._atoms_dataset = StructureData(structures)
+        self.select_index.resize(len(structures))
         self.atoms_num_list = np.array([len(s) for s in structures])
 
 
@@ -79,9 +80,9 @@ class DeepmdResultData(ResultData):
     @property
     def dataset(self):
         if self.spin_out_path is None:
-            return [self.energy, self.force,  self.virial, self.descriptor]
+            return [self.energy, self.force,  self.virial, self.descriptor] + self.geometry_datasets
         else:
-            return [self.energy, self.force,self.spin, self.virial, self.descriptor]
+            return [self.energy, self.force,self.spin, self.virial, self.descriptor] + self.geometry_datasets
     @property
     def energy(self):
         return self._energy_dataset
@@ -121,7 +122,7 @@ class DeepmdResultData(ResultData):
         default_forces = Config.get("widget", "forces_data", "Row")
         if force_array.size != 0 and default_forces == "Norm":
 
-            force_array = parse_array_by_atomnum(force_array, self.atoms_num_list, map_func=np.linalg.norm, axis=0)
+            force_array = segment_reduce(force_array, self.atoms_num_list, "norm")
 
             self._force_dataset = DPPlotData(force_array, title="force")
         else:
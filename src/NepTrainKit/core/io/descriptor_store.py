@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按内容寻址的描述符缓存
+键为 势函数文件的sha1 + 描述符类型 + 结构的sha1(元素、晶格、坐标)
+同一个势函数下已经算过的结构直接读取 只计算缺少的结构
+数据按段保存为float32的npy 用memmap读取 每段附带结构哈希和行偏移
+总大小超过上限时按最近使用时间(文件mtime)删除最旧的段
+新颖度的KD树索引也保存在这里 和描述符共用同一个上限
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from NepTrainKit import get_user_config_path
+from NepTrainKit.core.io.utils import get_file_hash
+
+# 描述符类型 structure每个结构一行(原子平均) atomic每个原子一行
+DESCRIPTOR_KINDS = ("structure", "atomic")
+# 默认缓存上限(字节)
+DESCRIPTOR_STORE_SIZE = 2 << 30
+# 缺少的结构每批计算的行数 atomic时即原子数
+DESCRIPTOR_BATCH_ROWS = 1 << 20
+_HASH_DTYPE = "S20"
+
+
+def get_structure_hash(structure):
+    """结构的sha1 只包含影响描述符的元素、晶格和坐标"""
+    sha1 = hashlib.sha1()
+    sha1.update(" ".join(structure.get_chemical_symbols()).encode())
+    sha1.update(np.ascontiguousarray(structure.cell, dtype=np.float64).tobytes())
+    sha1.update(np.ascontiguousarray(structure.positions, dtype=np.float64).tobytes())
+    return sha1.digest()
+
+
+class DescriptorStore:
+    """
+    描述符缓存
+    目录结构 {directory}/{model_hash}/{kind}/{segment}.npy
+    每段还有 {segment}.keys.npy(结构哈希) 和 {segment}.offsets.npy(每个结构的起始行)
+    新颖度索引保存在 {directory}/novelty/{key}.kdtree
+    """
+    def __init__(self, directory, max_bytes=None):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes if max_bytes is not None else DESCRIPTOR_STORE_SIZE)
+        self._model_hashes = {}
+
+    @property
+    def index_dir(self):
+        """新颖度索引的目录"""
+        return self.directory.joinpath("novelty")
+
+    def get_model_hash(self, nep_txt_path):
+        """势函数文件的sha1 按路径和修改时间缓存 避免重复读取大文件"""
+        path = os.path.abspath(nep_txt_path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._model_hashes:
+            self._model_hashes[key] = get_file_hash(path)
+        return self._model_hashes[key]
+
+    def _kind_dir(self, model_hash, kind):
+        if kind not in DESCRIPTOR_KINDS:
+            raise ValueError(f"Unknown descriptor kind: {kind}, expected one of {DESCRIPTOR_KINDS}")
+        return self.directory.joinpath(model_hash, kind)
+
+    def _iter_segments(self, model_hash, kind):
+        directory = self._kind_dir(model_hash, kind)
+        if not directory.exists():
+            return
+        for keys_path in directory.glob("*.keys.npy"):
+            name = keys_path.name[:-len(".keys.npy")]
+            data_path = directory.joinpath(f"{name}.npy")
+            offsets_path = directory.joinpath(f"{name}.offsets.npy")
+            if data_path.exists() and offsets_path.exists():
+                yield data_path, keys_path, offsets_path
+
+    def _build_index(self, model_hash, kind, hashes):
+        """
+        查找每个结构所在的段
+        :return: 段的列表 [(数据路径, 偏移)], 每个结构的段号(-1为缺少), 段内的结构序号
+        """
+        # 同一个结构可能出现多次
+        wanted = {}
+        for i, key in enumerate(hashes):
+            wanted.setdefault(key, []).append(i)
+        segment_ids = np.full(len(hashes), -1, dtype=np.int64)
+        rows = np.zeros(len(hashes), dtype=np.int64)
+        segments = []
+        for data_path, keys_path, offsets_path in self._iter_segments(model_hash, kind):
+            try:
+                keys = np.load(keys_path)
+            except (OSError, ValueError):
+                continue
+            found = False
+            for position, key in enumerate(keys.tolist()):
+                indices = wanted.pop(key, None)
+                if indices is None:
+                    continue
+                if not found:
+                    segments.append((data_path, np.load(offsets_path)))
+                    found = True
+                segment_ids[indices] = len(segments) - 1
+                rows[indices] = position
+            if not wanted:
+                break
+        return segments, segment_ids, rows
+
+    def _write_segment(self, model_hash, kind, hashes, offsets, data):
+        directory = self._kind_dir(model_hash, kind)
+        name = uuid.uuid4().hex
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            # 先写数据再写键 键文件存在时段一定是完整的
+            for suffix, array in ((".npy", data), (".offsets.npy", offsets),
+                                  (".keys.npy", np.array(hashes, dtype=_HASH_DTYPE))):
+                path = directory.joinpath(name + suffix)
+                tmp_path = path.with_name(path.name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                tmp_path.replace(path)
+        except OSError:
+            logger.warning(f"Failed to write the descriptor cache in {directory}")
+
+    def get(self, nep_txt_path, kind, structures, compute, path=None, batch_rows=None):
+        """
+        读取描述符 缺少的结构调用compute计算后写入缓存
+        :param nep_txt_path: 势函数文件
+        :param kind: structure 或 atomic
+        :param structures: 结构列表
+        :param compute: compute(structures) -> 这些结构的描述符 (行数, D) 失败时返回空数组
+        :param path: 不为None时结果写到该位置的npy(memmap) 适合原子描述符
+        :param batch_rows: 缺少的结构每批计算的行数
+        :return: float32 (行数, D) 计算失败时返回空数组
+        """
+        if not os.path.exists(nep_txt_path):
+            return np.asarray(compute(structures), dtype=np.float32)
+        model_hash = self.get_model_hash(nep_txt_path)
+        hashes = [get_structure_hash(structure) for structure in structures]
+        if kind == "atomic":
+            counts = np.array([len(structure) for structure in structures], dtype=np.int64)
+        else:
+            counts = np.ones(len(structures), dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        segments, segment_ids, rows = self._build_index(model_hash, kind, hashes)
+
+        result = None
+
+        def allocate(n_columns):
+            if path is None:
+                return np.empty((int(offsets[-1]), n_columns), dtype=np.float32)
+            return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                             shape=(int(offsets[-1]), n_columns))
+
+        for segment_id, (data_path, segment_offsets) in enumerate(segments):
+            data = np.load(data_path, mmap_mode="r")
+            indices = np.flatnonzero(segment_ids == segment_id)
+            if result is None:
+                result = allocate(data.shape[1])
+            elif data.shape[1] != result.shape[1]:
+                segment_ids[indices] = -1
+                continue
+            if kind == "structure":
+                result[indices] = data[rows[indices]]
+            else:
+                for index in indices:
+                    row = rows[index]
+                    result[offsets[index]:offsets[index + 1]] = data[segment_offsets[row]:segment_offsets[row + 1]]
+            del data
+            os.utime(data_path)
+
+        missing = np.flatnonzero(segment_ids == -1)
+        batch_rows = int(batch_rows or DESCRIPTOR_BATCH_ROWS)
+        start = 0
+        while start < missing.shape[0]:
+            # 按行数分批 每批至少一个结构
+            batch_end = np.searchsorted(np.cumsum(counts[missing[start:]]), batch_rows, side="right")
+            batch = missing[start:start + max(int(batch_end), 1)]
+            start += batch.shape[0]
+            data = np.asarray(compute([structures[i] for i in batch]), dtype=np.float32)
+            if data.size == 0:
+                return np.array([], dtype=np.float32)
+            data = data.reshape(counts[batch].sum(), -1)
+            if result is None:
+                result = allocate(data.shape[1])
+            batch_offsets = np.concatenate(([0], np.cumsum(counts[batch])))
+            if kind == "structure":
+                result[batch] = data
+            else:
+                for position, index in enumerate(batch):
+                    result[offsets[index]:offsets[index + 1]] = data[batch_offsets[position]:batch_offsets[position + 1]]
+            self._write_segment(model_hash, kind, [hashes[i] for i in batch], batch_offsets, data)
+
+        if missing.shape[0]:
+            self.evict()
+        if result is None:
+            return np.array([], dtype=np.float32)
+        if isinstance(result, np.memmap):
+            result.flush()
+        return result
+
+    def _iter_entries(self):
+        """缓存中的每一项 (最近使用时间, 大小, 文件列表) 描述符的段和新颖度索引一起按时间淘汰"""
+        for keys_path in self.directory.rglob("*.keys.npy"):
+            name = keys_path.name[:-len(".keys.npy")]
+            files = [keys_path.with_name(name + suffix) for suffix in (".npy", ".offsets.npy", ".keys.npy")]
+            size = sum(file.stat().st_size for file in files if file.exists())
+            data_path = files[0]
+            last_used = data_path.stat().st_mtime if data_path.exists() else 0
+            yield last_used, size, files
+        for index_path in self.index_dir.glob("*.kdtree"):
+            stat = index_path.stat()
+            yield stat.st_mtime, stat.st_size, [index_path]
+
+    def size(self):
+        """缓存占用的字节数"""
+        if not self.directory.exists():
+            return 0
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def evict(self, max_bytes=None):
+        """删除最久未使用的段 直到总大小不超过max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else int(max_bytes)
+        if not self.directory.exists():
+            return
+        segments = sorted(self._iter_entries(), key=lambda item: item[0])
+        total = sum(size for _, size, _ in segments)
+        for _, size, files in segments:
+            if total <= max_bytes:
+                break
+            try:
+                # 先删键文件 段就不会再被读取
+                for file in reversed(files):
+                    file.unlink(missing_ok=True)
+                total -= size
+            except OSError:
+                # windows下正在被memmap的文件不能删除
+                logger.debug(f"Failed to remove the descriptor cache {files[0]}")
+
+    def clear(self):
+        self.evict(0)
+
+
+def get_descriptor_store_dir():
+    """默认的描述符缓存目录 在用户配置目录下"""
+    return os.path.join(get_user_config_path(), "cache", "descriptor")
+
+
+_store = None
+
+
+def get_descriptor_store():
+    """
+    程序共用的描述符缓存
+    不读取配置 可以在任何线程和界面之外使用 上限由界面用set_descriptor_store_size设置
+    """
+    global _store
+    if _store is None:
+        _store = DescriptorStore(get_descriptor_store_dir())
+    return _store
+
+
+def set_descriptor_store_size(size):
+    """
+    设置共用缓存的上限 界面启动和修改配置descriptor_cache_size时调用
+    :param size: 上限(GB)
+    """
+    get_descriptor_store().max_bytes = int(size * (1 << 30))
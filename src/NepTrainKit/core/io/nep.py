@@ -19,7 +19,7 @@ from NepTrainKit.core.calculator import NEPProcess
 
 from NepTrainKit.core.io.base import NepPlotData, StructureData, ResultData
 
-from NepTrainKit.core.io.utils import read_nep_out_file, check_fullbatch, read_nep_in, parse_array_by_atomnum
+from NepTrainKit.core.io.utils import read_nep_out_file, check_fullbatch, read_nep_in, segment_reduce
 
 
 
@@ -44,7 +44,7 @@ class NepTrainResultData(ResultData):
     @property
     def dataset(self):
         # return [self.energy, self.stress,self.virial, self.descriptor]
-        return [self.energy,self.force,self.stress,self.virial, self.descriptor]
+        return [self.energy,self.force,self.stress,self.virial, self.descriptor] + self.geometry_datasets
 
     @property
     def energy(self):
@@ -107,7 +107,7 @@ class NepTrainResultData(ResultData):
         default_forces = Config.get("widget", "forces_data", "Row")
         if force_array.size != 0 and default_forces == "Norm":
 
-            force_array = parse_array_by_atomnum(force_array, self.atoms_num_list, map_func=np.linalg.norm, axis=0)
+            force_array = segment_reduce(force_array, self.atoms_num_list, "norm")
 
             self._force_dataset = NepPlotData(force_array, title="force")
         else:
@@ -262,7 +262,7 @@ class NepPolarizabilityResultData(ResultData):
     @property
     def dataset(self):
 
-        return [self.polarizability_diagonal,self.polarizability_no_diagonal, self.descriptor]
+        return [self.polarizability_diagonal,self.polarizability_no_diagonal, self.descriptor] + self.geometry_datasets
 
 
 
@@ -370,7 +370,7 @@ class NepDipoleResultData(ResultData):
         self.dipole_out_path = dipole_out_path
     @property
     def dataset(self):
-        return [self.dipole , self.descriptor]
+        return [self.dipole , self.descriptor] + self.geometry_datasets
 
     @property
     def dipole(self):
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+候选结构相对训练集的新颖度
+新颖度定义为描述符空间中到最近的训练集结构的欧氏距离 用于主动学习时挑选结构
+训练集描述符上的KD树只建一次 按描述符内容的sha1保存到缓存目录
+查询按块进行 每块用多线程(cKDTree的workers)并行
+"""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from scipy.spatial import cKDTree
+
+from NepTrainKit.core.io.pca import iter_chunks
+
+# 每次查询的候选结构数
+NOVELTY_BATCH_SIZE = 1 << 16
+
+
+class NoveltyIndex:
+    """
+    训练集描述符的最近邻索引
+    """
+    def __init__(self, reference, leafsize=32):
+        """
+        :param reference: 训练集的结构描述符 (M, D)
+        """
+        reference = np.asarray(reference, dtype=np.float64)
+        if reference.ndim != 2 or reference.shape[0] == 0:
+            raise ValueError("The reference descriptors must be a non-empty 2D array")
+        self.tree = cKDTree(reference, leafsize=leafsize)
+
+    @property
+    def n_reference(self):
+        return self.tree.n
+
+    @property
+    def n_features(self):
+        return self.tree.m
+
+    def query(self, points, batch_size=None, workers=-1, return_index=False):
+        """
+        每个候选点到最近训练集点的距离
+        :param points: 候选结构的描述符 (N, D) 可以是memmap
+        :param batch_size: 每块的行数 默认NOVELTY_BATCH_SIZE
+        :param workers: 并行线程数 -1使用所有CPU
+        :param return_index: 同时返回最近的训练集结构的下标
+        :return: float32 (N,) 或 (距离, 下标)
+        """
+        points = points if hasattr(points, "shape") else np.asarray(points)
+        if points.ndim != 2 or points.shape[1] != self.n_features:
+            raise ValueError(f"Expected descriptors with {self.n_features} features, got shape {points.shape}")
+        distances = np.empty(points.shape[0], dtype=np.float32)
+        indices = np.empty(points.shape[0], dtype=np.int64)
+        for rows in iter_chunks(points.shape[0], batch_size or NOVELTY_BATCH_SIZE):
+            distances[rows], indices[rows] = self.tree.query(np.asarray(points[rows], dtype=np.float64),
+                                                             k=1, workers=workers)
+        if return_index:
+            return distances, indices
+        return distances
+
+    def save(self, path, **metadata):
+        """保存KD树 读取比重新建树快很多"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"tree": self.tree, "metadata": metadata}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取save保存的索引
+        :return: (索引, metadata)
+        """
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        index = cls.__new__(cls)
+        index.tree = data["tree"]
+        return index, data.get("metadata", {})
+
+
+def get_reference_key(reference):
+    reference = np.ascontiguousarray(reference, dtype=np.float32)
+    sha1 = hashlib.sha1(f"{reference.shape}".encode())
+    sha1.update(memoryview(reference).cast("B"))
+    return sha1.hexdigest()
+
+
+def get_novelty_index(reference, cache_dir=None):
+    """
+    读取或建立训练集描述符的索引
+    :param reference: 训练集的结构描述符 (M, D)
+    :param cache_dir: 缓存目录 None时不保存
+        程序中使用描述符缓存的index_dir 由DescriptorStore.evict统一淘汰
+    """
+    if cache_dir is None:
+        return NoveltyIndex(reference)
+    key = get_reference_key(reference)
+    path = Path(cache_dir).joinpath(f"{key}.kdtree")
+    if path.exists():
+        try:
+            index, metadata = NoveltyIndex.load(path)
+            if metadata.get("key") == key:
+                # 淘汰按修改时间 读取也算一次使用
+                os.utime(path)
+                return index
+        except Exception:
+            logger.warning(f"Failed to read the novelty index {path}, it will be rebuilt")
+    index = NoveltyIndex(reference)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index.save(path, key=key)
+    except OSError:
+        logger.warning(f"Failed to save the novelty index to {path}")
+    return index
+
+
+def novelty_scores(reference, points, cache_dir=None, workers=-1):
+    """
+    候选结构到训练集的最近描述符距离
+    :param reference: 训练集的结构描述符 (M, D)
+    :param points: 候选结构的描述符 (N, D)
+    :return: float32 (N,) 值越大越新颖
+    """
+    return get_novelty_index(reference, cache_dir).query(points, workers=workers)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+描述符降维用的PCA
+支持分块(memmap)拟合 随机SVD求前k个主成分 以及把拟合结果保存到磁盘
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+# 分块拟合和投影时每块的行数
+PCA_CHUNK_SIZE = 1 << 16
+# 特征维度超过这个值时auto使用随机SVD 否则直接对协方差矩阵做特征分解
+RANDOMIZED_MIN_FEATURES = 512
+
+
+def iter_chunks(n_rows, chunk_size=None):
+    """按行分块的切片"""
+    chunk_size = int(chunk_size or PCA_CHUNK_SIZE)
+    for start in range(0, n_rows, chunk_size):
+        yield slice(start, min(start + chunk_size, n_rows))
+
+
+def _centered_dot(X, mean, right, chunk_size=None):
+    """分块计算 (X - mean) @ right 不生成中心化后的整个X"""
+    result = np.empty((X.shape[0], right.shape[1]), dtype=np.float64)
+    shift = mean @ right
+    for rows in iter_chunks(X.shape[0], chunk_size):
+        result[rows] = np.asarray(X[rows], dtype=np.float64) @ right - shift
+    return result
+
+
+def _centered_tdot(X, mean, left, chunk_size=None):
+    """分块计算 (X - mean).T @ left"""
+    result = np.zeros((X.shape[1], left.shape[1]), dtype=np.float64)
+    for rows in iter_chunks(X.shape[0], chunk_size):
+        result += np.asarray(X[rows], dtype=np.float64).T @ left[rows]
+    return result - np.outer(mean, left.sum(axis=0))
+
+
+def randomized_svd(X, n_components, mean=None, n_oversamples=10, n_iter=4, random_state=0, chunk_size=None):
+    """
+    随机SVD(Halko等) 只求前n_components个奇异值
+    所有和X有关的矩阵乘法都是分块做的 X可以是memmap
+    :param X: 数据 (N, D)
+    :param n_components: 保留的主成分数
+    :param mean: 中心化用的均值 None时不做中心化
+    :param n_oversamples: 过采样数
+    :param n_iter: 幂迭代次数 越大越准
+    :return: U (N,k), S (k,), Vt (k,D)
+    """
+    n_rows, n_features = X.shape
+    if mean is None:
+        mean = np.zeros(n_features, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    n_random = min(n_components + n_oversamples, n_rows, n_features)
+    rng = np.random.default_rng(random_state)
+    Q = _centered_dot(X, mean, rng.standard_normal((n_features, n_random)), chunk_size)
+    Q, _ = np.linalg.qr(Q)
+    for _ in range(n_iter):
+        Z, _ = np.linalg.qr(_centered_tdot(X, mean, Q, chunk_size))
+        Q, _ = np.linalg.qr(_centered_dot(X, mean, Z, chunk_size))
+    B = _centered_tdot(X, mean, Q, chunk_size).T
+    U_hat, S, Vt = np.linalg.svd(B, full_matrices=False)
+    U = Q @ U_hat
+    return U[:, :n_components], S[:n_components], Vt[:n_components]
+
+
+def _flip_sign(components):
+    """每个主成分中绝对值最大的分量取正 保证结果可复现"""
+    max_index = np.argmax(np.abs(components), axis=1)
+    signs = np.sign(components[np.arange(components.shape[0]), max_index])
+    signs[signs == 0] = 1
+    return components * signs[:, np.newaxis]
+
+
+class IncrementalPCA:
+    """
+    PCA 保存均值和主成分 可以分块拟合 也可以保存后在别的数据上直接投影
+    solver:
+        full 累加均值和散度矩阵后对协方差做特征分解 可以多次partial_fit
+        randomized 随机SVD 适合特征维度很大的情况
+        auto 特征维度超过RANDOMIZED_MIN_FEATURES时用randomized
+    """
+    def __init__(self, n_components=2, solver="auto", chunk_size=None, random_state=0):
+        if solver not in ("auto", "full", "randomized"):
+            raise ValueError(f"Unsupported PCA solver: {solver}")
+        self.n_components = n_components
+        self.solver = solver
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.mean_ = None
+        self.components_ = None
+        self.explained_variance_ = None
+        self.n_samples_seen_ = 0
+        self._sum = None
+        self._scatter = None
+
+    @property
+    def is_fitted(self):
+        return self.components_ is not None
+
+    @property
+    def n_features(self):
+        if self.mean_ is not None:
+            return self.mean_.shape[0]
+        if self._sum is not None:
+            return self._sum.shape[0]
+        return 0
+
+    def _get_solver(self, n_features):
+        if self.solver == "auto":
+            return "randomized" if n_features > RANDOMIZED_MIN_FEATURES else "full"
+        return self.solver
+
+    def _accumulate(self, X):
+        for rows in iter_chunks(X.shape[0], self.chunk_size):
+            chunk = np.asarray(X[rows], dtype=np.float64)
+            if self._sum is None:
+                self._sum = np.zeros(chunk.shape[1], dtype=np.float64)
+                self._scatter = np.zeros((chunk.shape[1], chunk.shape[1]), dtype=np.float64)
+            self._sum += chunk.sum(axis=0)
+            self._scatter += chunk.T @ chunk
+            self.n_samples_seen_ += chunk.shape[0]
+
+    def _solve_covariance(self):
+        n = self.n_samples_seen_
+        self.mean_ = self._sum / n
+        cov = (self._scatter - n * np.outer(self.mean_, self.mean_)) / max(n - 1, 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        # eigh按升序返回 只取最后n_components个
+        k = min(self.n_components, eigenvalues.shape[0])
+        order = np.argsort(eigenvalues)[::-1][:k]
+        self.explained_variance_ = eigenvalues[order]
+        self.components_ = _flip_sign(eigenvectors[:, order].T)
+
+    def partial_fit(self, X):
+        """
+        增量拟合 只使用full求解 每次调用都会更新主成分
+        :param X: 新的数据块 (N, D)
+        """
+        X = X if hasattr(X, "shape") else np.asarray(X)
+        if self.n_features and X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if X.shape[0] == 0:
+            return self
+        self._accumulate(X)
+        self._solve_covariance()
+        return self
+
+    def fit(self, X):
+        """
+        从头拟合
+        :param X: 数据 (N, D) 可以是memmap
+        """
+        X = X if hasattr(X, "shape") else np.asarray(X)
+        self.mean_ = None
+        self.components_ = None
+        self.n_samples_seen_ = 0
+        self._sum = None
+        self._scatter = None
+        if X.shape[0] == 0:
+            raise ValueError("Cannot fit PCA on an empty array")
+        if self._get_solver(X.shape[1]) == "full":
+            return self.partial_fit(X)
+
+        mean = np.zeros(X.shape[1], dtype=np.float64)
+        for rows in iter_chunks(X.shape[0], self.chunk_size):
+            mean += np.asarray(X[rows], dtype=np.float64).sum(axis=0)
+        mean /= X.shape[0]
+        _, S, Vt = randomized_svd(X, self.n_components, mean=mean,
+                                  random_state=self.random_state, chunk_size=self.chunk_size)
+        self.mean_ = mean
+        self.n_samples_seen_ = X.shape[0]
+        self.explained_variance_ = S ** 2 / max(X.shape[0] - 1, 1)
+        self.components_ = _flip_sign(Vt)
+        return self
+
+    def transform(self, X):
+        """
+        投影到主成分上
+        :param X: 数据 (N, D) 可以是memmap 分块投影
+        :return: float32 (N, k)
+        """
+        if not self.is_fitted:
+            raise RuntimeError("PCA has not been fitted")
+        X = X if hasattr(X, "shape") else np.asarray(X)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        result = np.empty((X.shape[0], self.components_.shape[0]), dtype=np.float32)
+        components = self.components_.T
+        shift = self.mean_ @ components
+        for rows in iter_chunks(X.shape[0], self.chunk_size):
+            result[rows] = np.asarray(X[rows], dtype=np.float64) @ components - shift
+        return result
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def save(self, path, **metadata):
+        """
+        保存均值、主成分和累加量 metadata会以json的形式一起保存
+        """
+        if not self.is_fitted:
+            raise RuntimeError("PCA has not been fitted")
+        arrays = {
+            "mean": self.mean_,
+            "components": self.components_,
+            "explained_variance": self.explained_variance_,
+            "n_samples_seen": np.array(self.n_samples_seen_),
+        }
+        if self._scatter is not None:
+            arrays["sum"] = self._sum
+            arrays["scatter"] = self._scatter
+        info = {"n_components": self.n_components, "solver": self.solver, "metadata": metadata}
+        arrays["info"] = np.array(json.dumps(info))
+        path = Path(path)
+        # 先写临时文件再替换 避免中断时留下损坏的文件
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取save保存的模型
+        :return: (模型, metadata)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            info = json.loads(str(data["info"]))
+            model = cls(n_components=info["n_components"], solver=info["solver"])
+            model.mean_ = data["mean"]
+            model.components_ = data["components"]
+            model.explained_variance_ = data["explained_variance"]
+            model.n_samples_seen_ = int(data["n_samples_seen"])
+            if "scatter" in data:
+                model._sum = data["sum"]
+                model._scatter = data["scatter"]
+        return model, info.get("metadata", {})
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+描述符降维模型的注册表
+模型保存在nep.txt旁边 同一个势函数打开的数据集(train/test)共用同一个投影
+"""
+import os
+from pathlib import Path
+
+from loguru import logger
+
+from NepTrainKit import module_path
+from NepTrainKit.core.io.pca import IncrementalPCA
+from NepTrainKit.core.io.utils import get_file_hash
+
+
+class ProjectionRegistry:
+    """
+    按势函数保存降维模型
+    文件名为 {nep.txt的stem}_{name}_projection.npz 元数据里记录nep.txt的sha1
+    势函数改变后旧模型自动失效并重新拟合
+    """
+    def __init__(self, nep_txt_path, fallback_dir=None):
+        """
+        :param nep_txt_path: 势函数文件
+        :param fallback_dir: 势函数所在目录不能写入时(比如内置的nep89)使用的目录
+        """
+        self.nep_txt_path = Path(nep_txt_path)
+        directory = self.nep_txt_path.parent
+        if fallback_dir is not None and (self._is_builtin(directory) or not os.access(directory, os.W_OK)):
+            directory = Path(fallback_dir)
+        self.directory = directory
+        self.model_hash = get_file_hash(self.nep_txt_path)
+
+    @staticmethod
+    def _is_builtin(directory):
+        try:
+            Path(directory).resolve().relative_to(Path(module_path).resolve())
+        except ValueError:
+            return False
+        return True
+
+    def get_path(self, name="pca"):
+        return self.directory.joinpath(f"{self.nep_txt_path.stem}_{name}_projection.npz")
+
+    def load(self, name, n_features):
+        """
+        读取已保存的模型
+        :return: 模型 不存在、势函数不一致或维度不一致时返回None
+        """
+        path = self.get_path(name)
+        if not path.exists():
+            return None
+        try:
+            model, metadata = IncrementalPCA.load(path)
+        except Exception:
+            logger.warning(f"Failed to read {path}, the projection will be refitted")
+            return None
+        if metadata.get("model_hash") != self.model_hash or model.n_features != n_features:
+            return None
+        return model
+
+    def save(self, name, model):
+        path = self.get_path(name)
+        try:
+            model.save(path, model_hash=self.model_hash)
+        except OSError:
+            logger.warning(f"Failed to save the projection to {path}")
+
+    def project(self, desc_array, n_components=2, name="pca"):
+        """
+        把描述符投影到低维 已有模型时只做投影 否则拟合后保存
+        :param desc_array: 结构描述符 (N, D)
+        :return: float32 (N, n_components)
+        """
+        model = self.load(name, desc_array.shape[1])
+        if model is None or model.components_.shape[0] != n_components:
+            model = IncrementalPCA(n_components).fit(desc_array)
+            self.save(name, model)
+        return model.transform(desc_array)
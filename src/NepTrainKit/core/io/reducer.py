@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+描述符降维后端
+PCA 内置
+UMAP 需要安装umap-learn
+t-SNE 需要安装scikit-learn
+landmark 先在部分采样点上降维 其余点用最近的采样点插值 适合非常大的数据集
+降维在子进程中进行 结果按描述符内容和参数缓存到磁盘
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import traceback
+from multiprocessing import Process, Queue
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal, QTimer
+from loguru import logger
+from scipy.spatial import cKDTree
+
+from NepTrainKit import get_user_config_path
+from NepTrainKit.core.io.pca import IncrementalPCA, iter_chunks
+
+
+class DescriptorReducer:
+    """
+    降维后端的基类
+    子类设置name和default_params 实现fit_transform
+    """
+    name = ""
+    # 运行需要的第三方模块
+    requires = ()
+    default_params = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.default_params)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {sorted(unknown)}")
+        self.params = {**self.default_params, **params}
+
+    @classmethod
+    def is_available(cls):
+        return all(importlib.util.find_spec(module) is not None for module in cls.requires)
+
+    def fit_transform(self, X):
+        raise NotImplementedError()
+
+
+class PCAReducer(DescriptorReducer):
+    name = "pca"
+    default_params = {"n_components": 2}
+
+    def fit_transform(self, X):
+        self.model = IncrementalPCA(self.params["n_components"]).fit(X)
+        return self.model.transform(X)
+
+    def transform(self, X):
+        return self.model.transform(X)
+
+
+class UMAPReducer(DescriptorReducer):
+    name = "umap"
+    requires = ("umap",)
+    default_params = {"n_components": 2, "n_neighbors": 15, "min_dist": 0.1, "random_state": 42}
+
+    def fit_transform(self, X):
+        from umap import UMAP
+        return UMAP(**self.params).fit_transform(X).astype(np.float32)
+
+
+class TSNEReducer(DescriptorReducer):
+    name = "tsne"
+    requires = ("sklearn",)
+    default_params = {"n_components": 2, "perplexity": 30.0, "random_state": 42}
+
+    def fit_transform(self, X):
+        from sklearn.manifold import TSNE
+        perplexity = min(self.params["perplexity"], max(X.shape[0] - 1, 1) / 3)
+        return TSNE(**{**self.params, "perplexity": perplexity}).fit_transform(X).astype(np.float32)
+
+
+class LandmarkReducer(DescriptorReducer):
+    """
+    随机选取n_landmarks个点用base降维
+    其余点取描述符空间中最近的n_neighbors个采样点 按距离倒数加权平均它们的坐标
+    """
+    name = "landmark"
+    default_params = {"base": "umap", "n_landmarks": 5000, "n_neighbors": 8, "random_state": 0}
+
+    def fit_transform(self, X):
+        n_rows = X.shape[0]
+        n_landmarks = min(int(self.params["n_landmarks"]), n_rows)
+        base_name = self.params["base"]
+        if base_name not in REDUCERS or not REDUCERS[base_name].is_available() or base_name == self.name:
+            logger.warning(f"Reducer {base_name} is not available, PCA is used for the landmarks")
+            base_name = "pca"
+        base = REDUCERS[base_name]()
+
+        if n_landmarks == n_rows:
+            return base.fit_transform(X)
+        rng = np.random.default_rng(self.params["random_state"])
+        landmarks = np.sort(rng.choice(n_rows, n_landmarks, replace=False))
+        landmark_embedding = base.fit_transform(np.asarray(X[landmarks]))
+        result = np.empty((n_rows, landmark_embedding.shape[1]), dtype=np.float32)
+        if hasattr(base, "transform"):
+            # 线性降维不需要插值
+            result[:] = base.transform(X)
+            return result
+
+        tree = cKDTree(np.asarray(X[landmarks], dtype=np.float64))
+        k = min(int(self.params["n_neighbors"]), n_landmarks)
+        for rows in iter_chunks(n_rows):
+            distance, index = tree.query(np.asarray(X[rows], dtype=np.float64), k=k, workers=-1)
+            distance = distance.reshape(distance.shape[0], -1)
+            index = index.reshape(index.shape[0], -1)
+            weight = 1.0 / np.maximum(distance, 1e-12)
+            weight /= weight.sum(axis=1, keepdims=True)
+            result[rows] = np.einsum("nk,nkc->nc", weight, landmark_embedding[index])
+        result[landmarks] = landmark_embedding
+        return result
+
+
+REDUCERS = {reducer.name: reducer for reducer in (PCAReducer, UMAPReducer, TSNEReducer, LandmarkReducer)}
+
+
+def get_available_reducers():
+    """当前环境可以使用的降维方法"""
+    return [name for name, reducer in REDUCERS.items() if reducer.is_available()]
+
+
+def get_reducer(name, **params) -> DescriptorReducer:
+    if name not in REDUCERS:
+        raise ValueError(f"Unknown reducer: {name}, expected one of {list(REDUCERS)}")
+    reducer = REDUCERS[name]
+    if not reducer.is_available():
+        raise ImportError(f"Reducer {name} requires {', '.join(reducer.requires)}")
+    return reducer(**params)
+
+
+class EmbeddingCache:
+    """
+    降维结果的磁盘缓存
+    文件名由描述符内容的sha1和降维方法参数的sha1组成
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def get_key(desc_array, name, params):
+        desc_array = np.ascontiguousarray(desc_array)
+        data_hash = hashlib.sha1()
+        data_hash.update(f"{desc_array.dtype.str}{desc_array.shape}".encode())
+        data_hash.update(memoryview(desc_array).cast("B"))
+        params_hash = hashlib.sha1(json.dumps({"name": name, **params}, sort_keys=True).encode())
+        return f"{data_hash.hexdigest()[:20]}_{params_hash.hexdigest()[:12]}"
+
+    def get_path(self, key):
+        return self.directory.joinpath(f"{key}.npy")
+
+    def get(self, key):
+        path = self.get_path(key)
+        if not path.exists():
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            logger.warning(f"Failed to read the embedding cache {path}")
+            return None
+
+    def put(self, key, embedding):
+        path = self.get_path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, embedding)
+            tmp_path.replace(path)
+        except OSError:
+            logger.warning(f"Failed to write the embedding cache {path}")
+
+
+def get_embedding_cache_dir():
+    """默认的降维结果缓存目录 在用户配置目录下"""
+    return os.path.join(get_user_config_path(), "cache", "embedding")
+
+
+def run_reducer(desc_array, name, params, cache_dir=None, queue=None):
+    """
+    降维入口 可以直接调用 也可以作为子进程的target
+    结果通过queue发送 ("result", embedding) 或 ("error", message)
+    """
+    try:
+        reducer = get_reducer(name, **params)
+        cache = EmbeddingCache(cache_dir) if cache_dir else None
+        key = EmbeddingCache.get_key(desc_array, name, reducer.params) if cache else None
+        embedding = cache.get(key) if cache else None
+        if embedding is None or embedding.shape[0] != desc_array.shape[0]:
+            embedding = np.asarray(reducer.fit_transform(desc_array), dtype=np.float32)
+            if cache:
+                cache.put(key, embedding)
+        message = ("result", embedding)
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        message = ("error", str(e))
+    if queue is None:
+        return message
+    queue.put(message)
+
+
+class ReducerProcess(QObject):
+    """
+    在子进程中降维 用定时器检查结果 不阻塞界面
+    完成后发送finishedSignal(embedding)
+    """
+    finishedSignal = Signal(object)
+    errorSignal = Signal(str)
+
+    def __init__(self, parent=None, interval=200):
+        super().__init__(parent)
+        self.process = None
+        self.queue = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._poll)
+
+    @property
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, desc_array, name, params=None, cache_dir=None):
+        self.stop()
+        self.queue = Queue()
+        self.process = Process(target=run_reducer,
+                               args=(desc_array, name, params or {}, cache_dir, self.queue),
+                               daemon=True)
+        self.process.start()
+        self.timer.start()
+
+    def _poll(self):
+        try:
+            status, value = self.queue.get_nowait()
+        except Empty:
+            if self.process is not None and not self.process.is_alive() and self.queue.empty():
+                self.stop()
+                self.errorSignal.emit("Dimensionality reduction process exited unexpectedly")
+            return
+        self.stop()
+        if status == "result":
+            self.finishedSignal.emit(value)
+        else:
+            self.errorSignal.emit(value)
+
+    def stop(self):
+        self.timer.stop()
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process.join()
+            self.process = None
+        if self.queue is not None:
+            self.queue.close()
+            self.queue.cancel_join_thread()
+            self.queue = None
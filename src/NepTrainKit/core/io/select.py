@@ -4,6 +4,8 @@
 # @Author  : 兵
 # @email    : 1747193328@qq.com
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 def numpy_cdist(X, Y):
@@ -26,59 +28,381 @@ def numpy_cdist(X, Y):
     # 返回距离（平方根）
     return np.sqrt(squared_dist)
 
-def farthest_point_sampling(points, n_samples, min_dist=0.1, selected_data=None):
+# FPS每个行块的行数 30维float32时约0.5MB 可以放进缓存
+FPS_BLOCK_SIZE = 1 << 12
+
+
+# 计算到已有样本最近距离时 距离分块占用内存的上限(字节)
+FPS_MEMORY_BUDGET = 256 << 20
+
+
+def nearest_squared_distances(points, references, memory_budget=None, center=None):
     """
-    最远点采样：支持已有样本扩展，并加入最小距离限制。
+    每个点到references中最近点的平方距离
+    按(点块, 参考点块)分块 用 |p|^2 + |r|^2 - 2 p·r 计算
+    峰值内存由memory_budget限制 不会产生(N, M, D)的差值数组
+
+    参数:
+        points (ndarray): 形状为 (N, D)
+        references (ndarray): 形状为 (M, D)
+        memory_budget (int or None): 分块的内存上限(字节) 默认FPS_MEMORY_BUDGET
+        center (ndarray or None): 计算前减去的向量 默认使用points的均值 可减小float32误差
+
+    返回:
+        ndarray: float32 (N,)
+    """
+    points = np.asarray(points, dtype=np.float32)
+    references = np.asarray(references, dtype=np.float32)
+    n_points, n_refs = points.shape[0], references.shape[0]
+    result = np.full(n_points, np.inf, dtype=np.float32)
+    if n_points == 0 or n_refs == 0:
+        return result
+    if center is None:
+        center = points.mean(axis=0, dtype=np.float64)
+    center = np.asarray(center, dtype=np.float32)
+    references = references - center
+    ref_norms = np.einsum("ij,ij->i", references, references)
+
+    memory_budget = int(memory_budget or FPS_MEMORY_BUDGET)
+    # 每块里有点积和距离两个float32临时数组
+    n_elements = max(memory_budget // (2 * 4), 1)
+    col_block = int(min(n_refs, max(1, np.sqrt(n_elements))))
+    row_block = int(min(n_points, max(1, n_elements // col_block)))
+    for row_start in range(0, n_points, row_block):
+        rows = slice(row_start, min(row_start + row_block, n_points))
+        chunk = points[rows] - center
+        chunk_norms = np.einsum("ij,ij->i", chunk, chunk)
+        for col_start in range(0, n_refs, col_block):
+            cols = slice(col_start, min(col_start + col_block, n_refs))
+            distance = chunk @ references[cols].T
+            distance *= -2
+            distance += chunk_norms[:, np.newaxis]
+            distance += ref_norms[np.newaxis, cols]
+            np.minimum(result[rows], distance.min(axis=1), out=result[rows])
+    np.maximum(result, 0, out=result)
+    return result
+
+
+class FarthestPointSampler:
+    """
+    最远点采样的计算核心
+    点集转成float32并中心化 预先计算平方模长
+    新采样点到所有点的平方距离用 |p|^2 + |q|^2 - 2 p·q 按行块计算 不产生(N, D)的临时数组
+    n_jobs>1时用线程并行处理行块(numpy的矩阵乘法会释放GIL)
+    """
+    def __init__(self, points, block_size=None, n_jobs=1):
+        points = np.asarray(points, dtype=np.float32)
+        if points.ndim == 1:
+            points = points.reshape(-1, 1)
+        # 中心化后模长变小 减小展开公式在float32下的误差
+        self.mean = points.mean(axis=0, dtype=np.float64).astype(np.float32)
+        self.points = np.ascontiguousarray(points - self.mean)
+        self.sq_norms = np.einsum("ij,ij->i", self.points, self.points)
+        self.n_points = self.points.shape[0]
+        block_size = int(block_size or FPS_BLOCK_SIZE)
+        self.blocks = [slice(start, min(start + block_size, self.n_points))
+                       for start in range(0, self.n_points, block_size)]
+        self.n_jobs = max(int(n_jobs or 1), 1)
+        self._executor = None
+        if self.n_jobs > 1 and len(self.blocks) > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _map_blocks(self, func):
+        if self._executor is None:
+            for block in self.blocks:
+                func(block)
+        else:
+            list(self._executor.map(func, self.blocks))
+
+    def get_block(self, block):
+        """中心化后的行块"""
+        return self.points[block]
+
+    def get_point(self, index):
+        return self.points[index]
+
+    def squared_distances_to(self, index):
+        """所有点到第index个点的平方距离"""
+        result = np.empty(self.n_points, dtype=np.float32)
+        query = self.get_point(index)
+        query_norm = self.sq_norms[index]
+
+        def compute(block):
+            np.subtract(self.sq_norms[block] + query_norm, 2 * (self.get_block(block) @ query), out=result[block])
+            np.maximum(result[block], 0, out=result[block])
+        self._map_blocks(compute)
+        return result
+
+    def update(self, min_sq_distances, index):
+        """用第index个点更新每个点到采样集的最小平方距离(原地修改)"""
+        query = self.get_point(index)
+        query_norm = self.sq_norms[index]
+
+        def compute(block):
+            distance = self.sq_norms[block] + query_norm
+            distance -= 2 * (self.get_block(block) @ query)
+            np.minimum(min_sq_distances[block], distance, out=min_sq_distances[block])
+        self._map_blocks(compute)
+
+    def sample(self, n_samples, min_dist=0.1, min_sq_distances=None):
+        """
+        :param n_samples: 最多采样的点数
+        :param min_dist: 最远点到采样集的距离小于该值时停止
+        :param min_sq_distances: 每个点到已有采样集的最小平方距离 None时从第0个点开始
+        :return: 采样点的下标
+        """
+        sampled_indices = []
+        if self.n_points == 0 or n_samples <= 0:
+            return sampled_indices
+        if min_sq_distances is None:
+            sampled_indices.append(0)
+            min_sq_distances = self.squared_distances_to(0)
+        else:
+            min_sq_distances = np.array(min_sq_distances, dtype=np.float32)
+        min_sq_dist = float(min_dist) ** 2
+        while len(sampled_indices) < n_samples:
+            current_index = int(np.argmax(min_sq_distances))
+            # 提前结束 剩下的点离采样集都不够远
+            # 距离为0说明所有点都已选中 min_dist为0时也要停止 否则会重复选择
+            if min_sq_distances[current_index] <= 0 or min_sq_distances[current_index] < min_sq_dist:
+                break
+            sampled_indices.append(current_index)
+            self.update(min_sq_distances, current_index)
+            # 已选中的点距离为0 避免浮点误差导致重复选择
+            min_sq_distances[current_index] = 0
+        return sampled_indices
+
+    def sample_groups(self, n_samples, group_offsets, min_dist=0.1):
+        """
+        点按组(比如结构中的原子)连续排列 对点做FPS 返回选中点所在的组
+        一个组被选中后组内所有点的距离置0 之后不会再从这个组里选点
+        :param n_samples: 最多选择的组数
+        :param group_offsets: 每组的起始行 长度为组数+1 最后一个元素等于点数
+        :param min_dist: 最远点到采样集的距离小于该值时停止
+        :return: 选中组的下标 按选择顺序排列
+        """
+        group_offsets = np.asarray(group_offsets, dtype=np.int64)
+        sampled_groups = []
+        if self.n_points == 0 or n_samples <= 0:
+            return sampled_groups
+        min_sq_distances = np.full(self.n_points, np.inf, dtype=np.float32)
+        min_sq_dist = float(min_dist) ** 2
+        current_index = 0
+        while len(sampled_groups) < n_samples:
+            group = int(np.searchsorted(group_offsets, current_index, side="right")) - 1
+            sampled_groups.append(group)
+            self.update(min_sq_distances, current_index)
+            min_sq_distances[group_offsets[group]:group_offsets[group + 1]] = 0
+            current_index = int(np.argmax(min_sq_distances))
+            # 所有组都已选中时距离全为0 min_dist为0时也要停止
+            if min_sq_distances[current_index] <= 0 or min_sq_distances[current_index] < min_sq_dist:
+                break
+        return sampled_groups
+
+
+class StreamingFarthestPointSampler(FarthestPointSampler):
+    """
+    点集很大(比如上千万个原子的描述符)时使用的FPS
+    points可以是memmap 不复制整个点集 每次更新时按行块读取并中心化
+    常驻内存的只有每个点的平方模长和最小距离 (2N个float32)
+    每个行块记录中心和半径 由三角不等式判断新采样点不可能缩短块内距离时跳过该块
+    """
+    def __init__(self, points, block_size=None, n_jobs=1):
+        if points.ndim != 2:
+            points = np.asarray(points, dtype=np.float32).reshape(points.shape[0], -1)
+        self.points = points
+        self.n_points = points.shape[0]
+        block_size = int(block_size or FPS_BLOCK_SIZE)
+        self.blocks = [slice(start, min(start + block_size, self.n_points))
+                       for start in range(0, self.n_points, block_size)]
+        total = np.zeros(points.shape[1], dtype=np.float64)
+        for block in self.blocks:
+            total += np.asarray(points[block], dtype=np.float64).sum(axis=0)
+        self.mean = (total / max(self.n_points, 1)).astype(np.float32)
+
+        self.sq_norms = np.empty(self.n_points, dtype=np.float32)
+        self.block_centers = np.empty((len(self.blocks), points.shape[1]), dtype=np.float32)
+        self.block_radii = np.empty(len(self.blocks), dtype=np.float32)
+        for i, block in enumerate(self.blocks):
+            chunk = self.get_block(block)
+            self.sq_norms[block] = np.einsum("ij,ij->i", chunk, chunk)
+            self.block_centers[i] = chunk.mean(axis=0)
+            self.block_radii[i] = np.sqrt(np.max(np.sum((chunk - self.block_centers[i]) ** 2, axis=1)))
+        # 每个块内最小距离的上界
+        self.block_max = np.full(len(self.blocks), np.inf, dtype=np.float32)
+
+        self.n_jobs = max(int(n_jobs or 1), 1)
+        self._executor = None
+        if self.n_jobs > 1 and len(self.blocks) > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+
+    def get_block(self, block):
+        return np.asarray(self.points[block], dtype=np.float32) - self.mean
+
+    def get_point(self, index):
+        return np.asarray(self.points[index], dtype=np.float32) - self.mean
+
+    def update(self, min_sq_distances, index):
+        query = self.get_point(index)
+        # (p - mean)·q = p·q - mean·q 直接用memmap中的块相乘 不复制中心化的块
+        query_norm = self.sq_norms[index] + 2 * float(self.mean @ query)
+        lower = np.linalg.norm(self.block_centers - query, axis=1) - self.block_radii
+        lower = np.maximum(lower, 0) ** 2
+        active = np.flatnonzero(lower < self.block_max)
+
+        def compute(i):
+            block = self.blocks[i]
+            distance = self.sq_norms[block] + query_norm
+            distance -= 2 * (np.asarray(self.points[block], dtype=np.float32) @ query)
+            np.minimum(min_sq_distances[block], distance, out=min_sq_distances[block])
+            self.block_max[i] = min_sq_distances[block].max()
+        if self._executor is None:
+            for i in active:
+                compute(i)
+        else:
+            list(self._executor.map(compute, active))
+
+
+def select_grid_candidates(points, n_candidates, n_components=3, fit_size=100000, random_state=0):
+    """
+    在PCA空间中做网格分桶 每个非空格子保留一个代表点
+    代表点取格子中离数据中心最远的点 尽量保留FPS会优先选择的边缘点
+
+    参数:
+        points (ndarray): 点集，形状为 (N, D)，可以是memmap。
+        n_candidates (int): 期望的格子数 实际代表点数不超过非空格子数。
+        n_components (int): 分桶使用的主成分数。
+        fit_size (int): 拟合PCA时最多使用的点数。
+
+    返回:
+        ndarray: 代表点的下标 从小到大排列
+    """
+    from NepTrainKit.core.io.pca import IncrementalPCA
+
+    n_points, n_features = points.shape
+    n_components = max(1, min(n_components, n_features))
+    if n_points > fit_size:
+        rng = np.random.default_rng(random_state)
+        fit_rows = np.sort(rng.choice(n_points, fit_size, replace=False))
+        model = IncrementalPCA(n_components).fit(np.asarray(points[fit_rows]))
+    else:
+        model = IncrementalPCA(n_components).fit(points)
+    projected = model.transform(points)
+
+    cells_per_axis = max(int(np.ceil(n_candidates ** (1.0 / n_components))), 1)
+    lower = projected.min(axis=0)
+    span = np.maximum(projected.max(axis=0) - lower, np.finfo(np.float32).tiny)
+    cell = np.floor((projected - lower) / span * cells_per_axis).astype(np.int64)
+    np.clip(cell, 0, cells_per_axis - 1, out=cell)
+    cell_id = np.ravel_multi_index(tuple(cell.T), (cells_per_axis,) * n_components)
+
+    radius = np.einsum("ij,ij->i", projected, projected)
+    # 按格子排序 同一格子里半径大的在前
+    order = np.lexsort((-radius, cell_id))
+    _, first = np.unique(cell_id[order], return_index=True)
+    return np.sort(order[first])
+
+
+def approximate_farthest_point_sampling(points, n_samples, min_dist=0.1, selected_data=None, n_candidates=None,
+                                        n_components=3, **kwargs):
+    """
+    两阶段的近似最远点采样
+    1. 粗选：在PCA空间中网格分桶 每个格子保留一个代表点 (select_grid_candidates)
+    2. 精选：在代表点上用原始维度做精确FPS
+
+    质量与速度:
+        耗时约为 O(N·D) 的投影 + O(n_candidates·n_samples·D) 的FPS 与N基本无关
+        选中的点之间仍然满足min_dist 但同一格子内的点只能选到一个
+        格子较粗时可能漏掉投影后重叠、但在原始空间中较远的点
+        n_candidates越大越接近精确FPS 默认取 max(20·n_samples, 20000)
 
     参数:
         points (ndarray): 点集，形状为 (N, D)。
         n_samples (int): 最大采样点的数量。
         min_dist (float): 最小距离阈值。
-        initial_indices (list or None): 已选择的样本索引列表，默认无。
+        selected_data (ndarray or None): 已选择的样本。
+        n_candidates (int or None): 粗选保留的候选点数。
+        n_components (int): 分桶使用的主成分数。
+        其余参数传给farthest_point_sampling。
 
     返回:
-        sampled_indices (list): 采样点的索引。
+        sampled_indices (list): 采样点在points中的索引。
     """
     n_points = points.shape[0]
+    if n_candidates is None:
+        n_candidates = max(20 * n_samples, 20000)
+    if n_points <= n_candidates:
+        return farthest_point_sampling(points, n_samples, min_dist, selected_data, **kwargs)
+    candidates = select_grid_candidates(points, n_candidates, n_components)
+    sampled = farthest_point_sampling(np.asarray(points[candidates]), n_samples, min_dist, selected_data, **kwargs)
+    return candidates[sampled].tolist()
 
-    if isinstance(selected_data, np.ndarray) and selected_data.size == 0:
-        selected_data=None
-    # 初始化采样点列表
-    sampled_indices = []
-
-    # 如果已有采样点，则计算到所有点的最小距离
-    if selected_data is not None :
-        # 使用 cdist 计算已有点与所有点之间的距离，返回形状为 (n_points, len(sampled_indices)) 的矩阵
-        distances_to_samples = numpy_cdist(points, selected_data)
-        min_distances = np.min(distances_to_samples, axis=1)  # 每个点到现有采样点集的最小距离
-
-    else:
-        # 如果没有初始点，则随机选择一个作为第一个点
-        first_index = 0
-        sampled_indices.append(first_index)
-        # 计算所有点到第一个点的距离
-        min_distances = np.linalg.norm(points - points[first_index], axis=1)
 
-    # 进行最远点采样
-    while len(sampled_indices) < n_samples:
-        # 找到距离采样点集最远的点
-        current_index = np.argmax(min_distances)
+def farthest_point_sampling(points, n_samples, min_dist=0.1, selected_data=None, n_jobs=1, block_size=None,
+                            memory_budget=None, approximate=False, n_candidates=None):
+    """
+    最远点采样：支持已有样本扩展，并加入最小距离限制。
 
-        # 如果没有点能满足最小距离要求，则提前终止
-        if min_distances[current_index] < min_dist:
-            break
+    参数:
+        points (ndarray): 点集，形状为 (N, D)。
+        n_samples (int): 最大采样点的数量。
+        min_dist (float): 最小距离阈值。
+        selected_data (ndarray or None): 已选择的样本，形状为 (M, D)，默认无。
+        n_jobs (int): 并行计算行块的线程数。
+        block_size (int or None): 每个行块的行数，默认FPS_BLOCK_SIZE。
+        memory_budget (int or None): 计算到已有样本距离时的内存上限(字节)，默认FPS_MEMORY_BUDGET。
+        approximate (bool): 使用两阶段近似采样，适合百万级数据，见approximate_farthest_point_sampling。
+        n_candidates (int or None): 近似采样时粗选保留的候选点数。
 
-        # 添加当前点到采样集
-        sampled_indices.append(int(current_index))
+    返回:
+        sampled_indices (list): 采样点的索引。
+    """
+    if isinstance(selected_data, np.ndarray) and selected_data.size == 0:
+        selected_data=None
+    if approximate:
+        return approximate_farthest_point_sampling(points, n_samples, min_dist, selected_data,
+                                                   n_candidates=n_candidates, n_jobs=n_jobs,
+                                                   block_size=block_size, memory_budget=memory_budget)
 
-        # 更新最小距离：仅计算当前点到新选择点的距离
-        # 获取当前点到所有其他点的距离
-        new_point = points[current_index]
-        new_distances = np.linalg.norm(points - new_point, axis=1)
+    with FarthestPointSampler(points, block_size=block_size, n_jobs=n_jobs) as sampler:
+        min_sq_distances = None
+        # 如果已有采样点，则计算到所有点的最小距离
+        if selected_data is not None:
+            min_sq_distances = nearest_squared_distances(points, selected_data, memory_budget, center=sampler.mean)
+        return sampler.sample(n_samples, min_dist, min_sq_distances)
 
-        # 更新每个点到现有样本点集的最小距离
-        min_distances = np.minimum(min_distances, new_distances)
-    return sampled_indices
 
+def structure_farthest_point_sampling(atom_points, atom_counts, n_samples, min_dist=0.1, n_jobs=1, block_size=None):
+    """
+    原子环境的最远点采样：对所有原子的描述符做FPS 返回包含被选原子的结构
+    结构平均的描述符会把大晶胞中少数特殊的局部环境平均掉 这里按原子挑选可以保留它们
+    原子描述符可以是memmap 采样时分块读取 内存占用与原子数成线性(每个原子8字节)
 
+    参数:
+        atom_points (ndarray): 所有原子的描述符，按结构顺序拼接，形状为 (N_atoms, D)。
+        atom_counts (array-like): 每个结构的原子数。
+        n_samples (int): 最多选择的结构数。
+        min_dist (float): 最小距离阈值。
+        n_jobs (int): 并行计算行块的线程数。
+        block_size (int or None): 每个行块的行数。
 
+    返回:
+        sampled_indices (list): 选中结构的索引，按选择顺序排列。
+    """
+    atom_counts = np.asarray(atom_counts, dtype=np.int64)
+    if atom_counts.sum() != atom_points.shape[0]:
+        raise ValueError("The number of descriptor rows does not match the number of atoms")
+    group_offsets = np.concatenate(([0], np.cumsum(atom_counts)))
+    with StreamingFarthestPointSampler(atom_points, block_size=block_size, n_jobs=n_jobs) as sampler:
+        return sampler.sample_groups(n_samples, group_offsets, min_dist)
@@ -3,14 +3,32 @@
 # @Time    : 2024/10/18 17:14
 # @Author  : 兵
 # @email    : 1747193328@qq.com
+import hashlib
+import json
 import os
 import re
+import struct
+import warnings
 from functools import partial
 
 import numpy as np
 from loguru import logger
 
 
+def get_file_hash(file_name, chunk_size=1 << 20):
+    """
+    计算文件内容的sha1 用来判断缓存是否对应同一个势函数文件
+    文件不存在时返回空字符串
+    """
+    if not os.path.exists(file_name):
+        return ""
+    sha1 = hashlib.sha1()
+    with open(file_name, "rb") as f:
+        for block in iter(partial(f.read, chunk_size), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
 def read_nep_in(  file_name):
     run_in={}
 
@@ -43,10 +61,245 @@ def read_nep_out_file(file_path,**kwargs):
     else:
         return np.array([])
 
+# segment_reduce 支持的归约方式
+SEGMENT_REDUCTIONS = ("mean", "sum", "norm", "max")
+# memmap输入默认每块的行数
+SEGMENT_CHUNK_SIZE = 1 << 20
+# 按块读取文本文件时每块的行数 loadtxt的临时内存约为结果的数倍 块不宜过大
+TEXT_CHUNK_ROWS = 1 << 16
+
+
+def get_segment_offsets(atoms_num_list):
+    """
+    根据原子数列表计算每个结构在原子数组中的起始下标
+    :param atoms_num_list: 原子数列表
+    :return: 起始下标数组 长度与结构数一致
+    """
+    counts = np.asarray(atoms_num_list, dtype=np.int64)
+    offsets = np.zeros(counts.shape[0], dtype=np.int64)
+    if counts.shape[0] > 1:
+        np.cumsum(counts[:-1], out=offsets[1:])
+    return offsets
+
+
+def _segment_reduce(array, counts, reduce):
+    """对一段连续的数据做分段归约 counts之和必须等于array的行数"""
+    offsets = get_segment_offsets(counts)
+    nonempty = counts > 0
+    starts = offsets[nonempty]
+    out_shape = (counts.shape[0],) + array.shape[1:]
+    out_dtype = array.dtype if np.issubdtype(array.dtype, np.floating) else np.float64
+
+    if reduce == "max":
+        result = np.full(out_shape, np.nan, dtype=out_dtype)
+        if starts.size:
+            result[nonempty] = np.maximum.reduceat(array, starts, axis=0)
+        return result
+
+    result = np.zeros(out_shape, dtype=out_dtype)
+    if starts.size == 0:
+        return result
+    # 统一用float64累加 避免float32在大结构上的精度损失
+    if reduce == "norm":
+        sums = np.add.reduceat(np.square(array, dtype=np.float64), starts, axis=0)
+        result[nonempty] = np.sqrt(sums)
+    else:
+        sums = np.add.reduceat(array, starts, axis=0, dtype=np.float64)
+        if reduce == "mean":
+            sums /= counts[nonempty].reshape((-1,) + (1,) * (array.ndim - 1))
+            result[~nonempty] = np.nan
+        result[nonempty] = sums
+    return result
+
+
+def segment_reduce(array, atoms_num_list, reduce="mean", chunk_size=None):
+    """
+    按原子数列表对原子数组做向量化的分段归约，用于把原子性质(力、描述符等)转换成结构性质
+    基于np.add.reduceat/np.maximum.reduceat实现，不会为每个结构生成一个子数组
+    :param array: 原子数组 第一维是所有结构的原子拼接
+    :param atoms_num_list: 原子数列表
+    :param reduce: 归约方式 "mean" "sum" "norm" "max"
+    :param chunk_size: 每次处理的最大行数 None表示一次处理
+        对于np.memmap输入默认按SEGMENT_CHUNK_SIZE分块，避免把整个文件读入内存
+    :return: 形状为(结构数, ...)的数组
+    """
+    if reduce not in SEGMENT_REDUCTIONS:
+        raise ValueError(f"Unsupported reduce type: {reduce}")
+    if len(array) == 0:
+        return array
+    counts = np.asarray(atoms_num_list, dtype=np.int64)
+    if counts.sum() != array.shape[0]:
+        raise ValueError(f"The number of rows ({array.shape[0]}) does not match the total number of atoms ({counts.sum()})")
+    if chunk_size is None and isinstance(array, np.memmap):
+        chunk_size = SEGMENT_CHUNK_SIZE
+    if chunk_size is None or array.shape[0] <= chunk_size:
+        return _segment_reduce(np.asarray(array), counts, reduce)
+
+    ends = np.cumsum(counts)
+    results = []
+    start_struct = 0
+    start_row = 0
+    while start_struct < counts.shape[0]:
+        # 一个块内只放完整的结构 单个结构超过chunk_size时单独成块
+        stop_struct = int(np.searchsorted(ends, start_row + chunk_size, side="right"))
+        stop_struct = max(stop_struct, start_struct + 1)
+        stop_row = int(ends[stop_struct - 1])
+        chunk = np.asarray(array[start_row:stop_row])
+        results.append(_segment_reduce(chunk, counts[start_struct:stop_struct], reduce))
+        start_struct = stop_struct
+        start_row = stop_row
+    return np.concatenate(results, axis=0)
+
+
+def count_file_lines(file_path, chunk_size=1 << 24):
+    """
+    统计文件中的数据行数 不解析内容
+    与np.loadtxt一致 空白行和#开头的注释行不计入
+    """
+    count = 0
+    with open(file_path, "rb", buffering=chunk_size) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith(b"#"):
+                count += 1
+    return count
+
+
+def iter_nep_out_chunks(file_path, chunk_rows=None, dtype=np.float32):
+    """
+    按块读取文本格式的输出文件(descriptor.out等)
+    每次用np.loadtxt读取chunk_rows行 峰值内存只有一块
+    :return: 生成器 每次返回 (行数, 列数) 的数组
+    """
+    chunk_rows = int(chunk_rows or TEXT_CHUNK_ROWS)
+    with open(file_path, "r") as f, warnings.catch_warnings():
+        # 读到文件末尾时loadtxt会提示没有数据
+        warnings.simplefilter("ignore", UserWarning)
+        while True:
+            chunk = np.loadtxt(f, dtype=dtype, max_rows=chunk_rows, ndmin=2)
+            if chunk.shape[0] == 0:
+                return
+            yield chunk
+
+
+def stream_segment_reduce(chunks, atoms_num_list, reduce="mean"):
+    """
+    对按块到达的原子数组做分段归约 块的边界可以在结构中间
+    跨块的结构保留到下一块 不需要整个原子数组在内存中
+    :param chunks: 依次返回原子数组块的可迭代对象
+    :param atoms_num_list: 原子数列表
+    :return: 形状为(结构数, ...)的数组
+    """
+    if reduce not in SEGMENT_REDUCTIONS:
+        raise ValueError(f"Unsupported reduce type: {reduce}")
+    counts = np.asarray(atoms_num_list, dtype=np.int64)
+    ends = np.cumsum(counts)
+    results = []
+    pending = None
+    start_struct = 0
+    start_row = 0
+    n_rows = 0
+    for chunk in chunks:
+        n_rows += chunk.shape[0]
+        pending = chunk if pending is None else np.concatenate((pending, chunk), axis=0)
+        stop_struct = int(np.searchsorted(ends, n_rows, side="right"))
+        if stop_struct == start_struct:
+            continue
+        stop_row = int(ends[stop_struct - 1])
+        results.append(_segment_reduce(pending[:stop_row - start_row], counts[start_struct:stop_struct], reduce))
+        pending = pending[stop_row - start_row:]
+        start_struct = stop_struct
+        start_row = stop_row
+    total = int(ends[-1]) if ends.size else 0
+    if n_rows != total:
+        raise ValueError(f"The number of rows ({n_rows}) does not match the total number of atoms ({total})")
+    if not results:
+        return np.array([])
+    return np.concatenate(results, axis=0)
+
+
+def read_descriptor_file(file_path, atoms_num_list, chunk_rows=None):
+    """
+    读取文本格式的描述符(descriptor.out)并返回结构描述符
+    先统计行数判断是原子描述符还是结构描述符
+    原子描述符按块读取并按原子数求平均 大文件不会整个读入内存
+    :param file_path: 描述符文件
+    :param atoms_num_list: 每个结构的原子数
+    :return: float32 (结构数, D) 行数与原子数、结构数都对不上时返回None
+    """
+    counts = np.asarray(atoms_num_list, dtype=np.int64)
+    logger.info("Reading file: {}".format(file_path))
+    n_rows = count_file_lines(file_path)
+    if n_rows == counts.shape[0]:
+        return np.concatenate(list(iter_nep_out_chunks(file_path, chunk_rows)), axis=0)
+    if n_rows == counts.sum():
+        result = stream_segment_reduce(iter_nep_out_chunks(file_path, chunk_rows), counts, "mean")
+        return result.astype(np.float32)
+    return None
+
+
+# NepTrainKit自己保存描述符用的二进制格式
+# 8字节标识 + 4字节头长度 + json头(dtype shape和元数据) + 按64字节对齐的原始数据
+DESCRIPTOR_BINARY_MAGIC = b"NTKDESC1"
+
+
+def write_descriptor_binary(file_path, array, **metadata):
+    """
+    把描述符写成二进制文件 metadata(比如势函数的sha1)写在文件头里
+    先写临时文件再替换
+    """
+    array = np.ascontiguousarray(array)
+    header = {"dtype": array.dtype.str, "shape": list(array.shape), "metadata": metadata}
+    header_bytes = json.dumps(header).encode()
+    prefix = len(DESCRIPTOR_BINARY_MAGIC) + 4
+    header_bytes += b" " * (-(prefix + len(header_bytes)) % 64)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(DESCRIPTOR_BINARY_MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(memoryview(array).cast("B"))
+    os.replace(tmp_path, file_path)
+
+
+def read_descriptor_binary(file_path, mmap=True):
+    """
+    读取write_descriptor_binary写的文件
+    :param mmap: 为True时返回只读的memmap
+    :return: (数组, metadata) 文件不存在或格式不对时返回 (None, {})
+    """
+    if not os.path.exists(file_path):
+        return None, {}
+    with open(file_path, "rb") as f:
+        if f.read(len(DESCRIPTOR_BINARY_MAGIC)) != DESCRIPTOR_BINARY_MAGIC:
+            return None, {}
+        header_length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+        offset = f.tell()
+    shape = tuple(header["shape"])
+    dtype = np.dtype(header["dtype"])
+    if os.path.getsize(file_path) < offset + dtype.itemsize * int(np.prod(shape)):
+        return None, {}
+    if mmap and int(np.prod(shape)) > 0:
+        array = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    else:
+        array = np.fromfile(file_path, dtype=dtype, offset=offset).reshape(shape)
+    return array, header.get("metadata", {})
+
+
+_SEGMENT_FUNC_MAP = {
+    np.mean: "mean",
+    np.sum: "sum",
+    np.linalg.norm: "norm",
+    np.max: "max",
+}
+
+
 def parse_array_by_atomnum(array,atoms_num_list,map_func=np.linalg.norm,axis=0):
     """
     根据一个映射列表，将原数组按照原子数列表拆分，
     这个主要是处理文件中原子数不一致的情况，比如力 描述符等文件是按照原子数的 把他们转换成结构的
+    对于常用的np.mean np.sum np.linalg.norm np.max 会走segment_reduce的向量化实现
     :param array: 原数组
     :param atoms_num_list: 原子数列表
     :param map_func: 需要对每个结构的数据进行处理的函数 比如求平均 求和等
@@ -56,13 +309,15 @@ def parse_array_by_atomnum(array,atoms_num_list,map_func=np.linalg.norm,axis=0):
     """
     if len(array)==0:
         return array
+    reduce = _SEGMENT_FUNC_MAP.get(map_func)
+    if reduce is not None and axis == 0:
+        return segment_reduce(array, atoms_num_list, reduce)
     # 使用 np.cumsum() 计算每个分组的结束索引
     split_indices = np.cumsum(atoms_num_list)[:-1]
     # 使用 np.split() 按照分组拆分数组
     split_arrays = np.split(array, split_indices)
     func = partial(map_func, axis=axis)
 
-    # 对每个分组求和，使用 np.vectorize 进行向量化
     new_array = np.array(list(map(func, split_arrays)))
     return new_array
 
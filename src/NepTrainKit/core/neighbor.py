@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+截断半径内的近邻搜索
+周期方向上先把原子折回晶胞 再只复制离晶面不超过截断半径的周期像(皮层)
+在原始原子和皮层上各建一棵KD树 一次查询得到所有近邻对
+每个方向需要的周期像数为 ceil(cutoff / d_i) d_i=V/|a_j×a_k| 是晶面间距
+所以倾斜的晶胞和比截断半径还小的晶胞也是精确的 内存和时间都是O(N)
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+# 体积小于该值的晶格视为没有晶格(非周期)
+VOLUME_EPS = 1e-8
+
+
+def get_pbc(pbc):
+    """把 True / "T T F" / [True, True, False] 转成长度为3的布尔数组"""
+    if isinstance(pbc, str):
+        flags = pbc.split()
+        if len(flags) == 1:
+            flags = flags * 3
+        return np.array([flag.upper() in ("T", "TRUE", "1") for flag in flags[:3]], dtype=bool)
+    return np.broadcast_to(np.asarray(pbc, dtype=bool), (3,)).copy()
+
+
+def get_face_distances(lattice):
+    """三组晶面的间距 d_i = V / |a_j × a_k|"""
+    lattice = np.asarray(lattice, dtype=np.float64)
+    volume = abs(np.linalg.det(lattice))
+    cross = np.cross(lattice[[1, 2, 0]], lattice[[2, 0, 1]])
+    return volume / np.linalg.norm(cross, axis=1)
+
+
+def get_neighbor_pairs(lattice, positions, cutoff, pbc=True):
+    """
+    所有距离不超过cutoff的原子对 每个(原子对, 周期像)只出现一次
+
+    参数:
+    lattice: 晶格 3x3 每行一个晶格矢量
+    positions: 笛卡尔坐标 Nx3
+    cutoff: 截断半径
+    pbc: 每个方向是否周期 可以是bool、长度为3的数组或"T T T"
+
+    返回:
+    i, j: int64 (M,) 原子序号 i==j 时是原子和自己的周期像(晶胞很小时)
+    distances: float64 (M,)
+    shifts: int64 (M, 3) 满足 positions[j] + shifts @ lattice - positions[i] 为对应的距离矢量
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    lattice = np.asarray(lattice, dtype=np.float64).reshape(3, 3)
+    pbc = get_pbc(pbc)
+    n_atoms = positions.shape[0]
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+             np.zeros(0, dtype=np.float64), np.zeros((0, 3), dtype=np.int64))
+    if n_atoms == 0 or cutoff <= 0:
+        return empty
+    if abs(np.linalg.det(lattice)) < VOLUME_EPS:
+        pbc = np.zeros(3, dtype=bool)
+
+    if not pbc.any():
+        tree = cKDTree(positions)
+        pairs = tree.query_pairs(cutoff, output_type="ndarray").astype(np.int64).reshape(-1, 2)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        i, j = pairs[:, 0], pairs[:, 1]
+        distances = np.linalg.norm(positions[j] - positions[i], axis=1)
+        return i, j, distances, np.zeros((i.shape[0], 3), dtype=np.int64)
+
+    # 周期方向折回晶胞 offsets记录每个原子被移动了几个晶格矢量
+    frac = np.linalg.solve(lattice.T, positions.T).T
+    offsets = np.where(pbc, np.floor(frac), 0).astype(np.int64)
+    frac -= offsets
+    wrapped = frac @ lattice
+
+    skin = np.where(pbc, cutoff / get_face_distances(lattice), 0)
+    n_images = np.ceil(skin).astype(np.int64)
+    ranges = [np.arange(-n, n + 1) for n in n_images]
+    images = np.array(np.meshgrid(*ranges, indexing="ij")).reshape(3, -1).T
+
+    # 皮层: 所有周期像中离晶胞不超过cutoff的原子
+    image_frac = frac[np.newaxis, :, :] + images[:, np.newaxis, :]
+    # 非周期方向没有折回 原子可以在晶胞外 不做边界检查
+    inside = (image_frac >= -skin) & (image_frac <= 1 + skin)
+    keep = np.all(inside | ~pbc, axis=2)
+    image_ids, atom_ids = np.nonzero(keep)
+    image_positions = wrapped[atom_ids] + images[image_ids] @ lattice
+
+    tree = cKDTree(wrapped)
+    image_tree = cKDTree(image_positions)
+    pairs = tree.sparse_distance_matrix(image_tree, cutoff, output_type="ndarray")
+    i = pairs["i"].astype(np.int64)
+    k = pairs["j"].astype(np.int64)
+    j = atom_ids[k]
+    image_shifts = images[image_ids[k]]
+
+    # 每对(i, j, s)同时也以(j, i, -s)出现 只保留s为正 或s为0且i<j的一半
+    nonzero = image_shifts != 0
+    has_nonzero = nonzero.any(axis=1)
+    first = image_shifts[np.arange(image_shifts.shape[0]), np.argmax(nonzero, axis=1)]
+    half = np.where(has_nonzero, first > 0, i < j)
+    i, j, image_shifts = i[half], j[half], image_shifts[half]
+    distances = pairs["v"][half]
+
+    # 换算回未折回的原始坐标
+    shifts = image_shifts + offsets[i] - offsets[j]
+    return i, j, distances, shifts
+
+
+def get_pair_min_distances(species, i, j, distances, n_species=None):
+    """
+    每种元素对的最小距离
+
+    参数:
+    species: int (N,) 每个原子的元素编号 0..n_species-1
+    i, j, distances: get_neighbor_pairs的结果
+
+    返回:
+    float64 (n_species, n_species) 对称矩阵 没有原子对的元素对为inf
+    """
+    species = np.asarray(species, dtype=np.int64)
+    if n_species is None:
+        n_species = int(species.max()) + 1 if species.shape[0] else 0
+    code_i = species[i]
+    code_j = species[j]
+    # 元素对编码 小的编号在前 A-B与B-A是同一种
+    pair_codes = np.minimum(code_i, code_j) * n_species + np.maximum(code_i, code_j)
+    minimum = np.full(n_species * n_species, np.inf)
+    np.minimum.at(minimum, pair_codes, distances)
+    minimum = minimum.reshape(n_species, n_species)
+    return np.minimum(minimum, minimum.T)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from .base import (
+    ProcessorManager,
+    StructureProcessor,
+    iter_processed_structures,
+    process_structures,
+    PROCESS_CHUNK_SIZE,
+    PROCESS_PARALLEL_THRESHOLD,
+)
+# 导入时注册各卡片的处理器
+from .lattice import (
+    SuperCellProcessor,
+    CellStrainProcessor,
+    CellScalingProcessor,
+    ShearMatrixProcessor,
+    ShearAngleProcessor,
+)
+from .perturb import PerturbProcessor
+from .defect import RandomDopingProcessor, RandomVacancyProcessor, VacancyDefectProcessor
+from .surface import RandomSlabProcessor, StackingFaultProcessor
+from .filter import FilterProcessor, FPSFilterProcessor, NoveltyFilterProcessor
+from .pipeline import CardPipeline, read_structures
+
+__all__ = [
+    "ProcessorManager",
+    "StructureProcessor",
+    "FilterProcessor",
+    "iter_processed_structures",
+    "process_structures",
+    "PROCESS_CHUNK_SIZE",
+    "PROCESS_PARALLEL_THRESHOLD",
+    "SuperCellProcessor",
+    "CellStrainProcessor",
+    "CellScalingProcessor",
+    "ShearMatrixProcessor",
+    "ShearAngleProcessor",
+    "PerturbProcessor",
+    "RandomDopingProcessor",
+    "RandomVacancyProcessor",
+    "VacancyDefectProcessor",
+    "RandomSlabProcessor",
+    "StackingFaultProcessor",
+    "FPSFilterProcessor",
+    "NoveltyFilterProcessor",
+    "CardPipeline",
+    "read_structures",
+]
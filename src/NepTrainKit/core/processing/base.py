@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+卡片的无界面处理逻辑
+每种卡片对应一个StructureProcessor 只由卡片to_dict导出的配置驱动 不依赖任何Qt控件
+所以可以在进程池中执行 输入结构按块分发 结果按输入顺序返回
+"""
+import numpy as np
+from ase.build.tools import sort as ase_sort
+from loguru import logger
+
+from NepTrainKit.core.geometry import iter_chunk_results
+
+# 每块的输入结构数 一个输入结构通常会生成几十个结构 所以块比几何扫描小得多
+PROCESS_CHUNK_SIZE = 16
+# 输入结构数少于该值时在当前进程中处理
+PROCESS_PARALLEL_THRESHOLD = 64
+
+
+class ProcessorManager:
+    """按卡片的类名(to_dict中的class)注册处理器"""
+    processor_info_dict = {}
+
+    @classmethod
+    def register_processor(cls, processor_class):
+        name = processor_class.card_class
+        if name in cls.processor_info_dict:
+            logger.warning(f"The registered processor for {name} is duplicated. The most recently registered one will be used.")
+        cls.processor_info_dict[name] = processor_class
+        return processor_class
+
+    @classmethod
+    def has_processor(cls, card_class):
+        return card_class in cls.processor_info_dict
+
+    @classmethod
+    def get_card_class(cls, card_type):
+        """
+        卡片类的MRO中第一个注册了处理器的类名 继承内置卡片的自定义卡片使用父类的处理器
+        :param card_type: 卡片的类
+        :return: 类名 没有时为None
+        """
+        for klass in card_type.__mro__:
+            if klass.__name__ in cls.processor_info_dict:
+                return klass.__name__
+        return None
+
+    @classmethod
+    def create(cls, config):
+        """
+        根据卡片的配置创建处理器
+        :param config: 卡片to_dict的结果
+        """
+        card_class = config.get("class")
+        if card_class not in cls.processor_info_dict:
+            raise NotImplementedError(f"No headless processor for card {card_class}")
+        return cls.processor_info_dict[card_class](config)
+
+
+class StructureProcessor:
+    """
+    一张卡片的处理逻辑
+    子类设置card_class 在__init__中解析配置 process对一个结构返回生成的结构列表
+    对象只保存普通的python数据 可以pickle
+    """
+    card_class = None
+
+    def __init__(self, config):
+        self.config = dict(config)
+
+    def process(self, structure):
+        """
+        :param structure: ase.Atoms
+        :return: 处理后的结构列表
+        """
+        raise NotImplementedError
+
+
+def _process_chunk(structures, config, sort_atoms):
+    """进程池中执行 处理一块输入结构 每个输入结构返回一个列表"""
+    # 每块重新从系统取熵 同一个进程处理的块以及当前进程中的串行处理都不会重复扰动
+    np.random.seed()
+    processor = ProcessorManager.create(config)
+    results = []
+    for structure in structures:
+        processed = processor.process(structure)
+        if sort_atoms:
+            processed = [ase_sort(s) for s in processed]
+        results.append(processed)
+    return results
+
+
+def iter_processed_structures(structures, config, sort_atoms=False, n_jobs=None, chunk_size=PROCESS_CHUNK_SIZE,
+                              parallel_threshold=PROCESS_PARALLEL_THRESHOLD):
+    """
+    用卡片的处理器处理所有结构
+
+    参数:
+    structures: 输入的ase.Atoms列表
+    config: 卡片to_dict的结果 必须可以pickle
+    sort_atoms: 是否按元素排序生成的结构
+    n_jobs: 进程数 None为CPU数
+
+    返回:
+    生成器 每块产生 (输入结构的slice, 生成的结构列表) 按输入顺序
+    """
+    for rows, results in iter_chunk_results(structures, lambda structure: structure, _process_chunk,
+                                            (config, sort_atoms), n_jobs, chunk_size, parallel_threshold):
+        yield rows, [structure for processed in results for structure in processed]
+
+
+def process_structures(structures, config, sort_atoms=False, n_jobs=None, chunk_size=PROCESS_CHUNK_SIZE,
+                       parallel_threshold=PROCESS_PARALLEL_THRESHOLD):
+    """iter_processed_structures的结果合并成一个列表"""
+    result = []
+    for _, processed in iter_processed_structures(structures, config, sort_atoms, n_jobs, chunk_size,
+                                                  parallel_threshold):
+        result.extend(processed)
+    return result
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""缺陷类卡片的处理逻辑: 随机掺杂 随机空位 空位缺陷"""
+import json
+
+import numpy as np
+from scipy.stats.qmc import Sobol
+
+from .base import ProcessorManager, StructureProcessor
+
+
+def sample_dopants(dopant_list, ratios, N, exact=False, seed=None):
+    """
+    采样 dopant 的函数。
+
+    参数：
+    - dopant_list: list，可选的 dopant 值列表，比如 [0,1,2]
+    - ratios: list，与 dopant_list 对应的概率或比例列表，比如 [0.6,0.3,0.1]
+    - N: int，要生成的样本总数
+    - exact: bool，控制采样方式：
+        - False（默认）：每次独立按概率 p=ratios 抽样，结果数量只在期望值附近波动
+        - True：严格按 ratios*N 计算各值的个数（向下取整后把差值补给概率最高的那一项），然后打乱顺序
+    - seed: int 或 None，用于设置随机种子，保证可复现
+
+    返回：
+    - list，长度为 N 的采样结果
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    dopant_list = list(dopant_list)
+    ratios = np.array(ratios, dtype=float)
+    ratios = ratios / ratios.sum()  # 归一化，以防输入不规范
+
+    if not exact:
+        # 独立概率抽样
+        return list(np.random.choice(dopant_list, size=N, p=ratios))
+    else:
+        # 严格按比例生成固定个数再打乱
+        counts = (ratios * N).astype(int)
+        diff = N - counts.sum()
+        if diff != 0:
+            # 差值补给比例最大的那一项
+            max_idx = np.argmax(ratios)
+            counts[max_idx] += diff
+
+        arr = np.repeat(dopant_list, counts)
+        np.random.shuffle(arr)
+        return list(arr)
+
+
+def parse_rules(rules):
+    """卡片配置中的规则是json字符串 解析失败时视为没有规则"""
+    if isinstance(rules, str):
+        try:
+            rules = json.loads(rules)
+        except Exception:
+            rules = []
+    return rules if isinstance(rules, list) else []
+
+
+def get_candidate_indices(structure, element, groups):
+    """结构中元素为element的原子 规则指定了group且结构有group列时只取这些组"""
+    if groups and "group" in structure.arrays:
+        return [i for i, elem, g in zip(range(len(structure)), structure, structure.arrays["group"])
+                if elem.symbol == element and g in groups]
+    return [i for i, a in enumerate(structure) if a.symbol == element]
+
+
+@ProcessorManager.register_processor
+class RandomDopingProcessor(StructureProcessor):
+    card_class = "RandomDopingCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.rules = parse_rules(config.get("rules", ""))
+        self.exact = config.get("doping_type", "Exact") == "Exact"
+        self.max_num = config.get("max_atoms_condition", [1])[0]
+
+    def process(self, structure):
+        structure_list = []
+        if not self.rules:
+            return [structure]
+
+        for _ in range(self.max_num):
+            new_structure = structure.copy()
+            total_doping = 0
+            for rule in self.rules:
+                target = rule.get("target")
+                dopants = rule.get("dopants", {})
+                if not target or not dopants:
+                    continue
+
+                candidate_indices = get_candidate_indices(new_structure, target, rule.get("group"))
+                if not candidate_indices:
+                    continue
+
+                if "concentration" == rule["use"]:
+                    conc_min, conc_max = rule.get("concentration", [0.0, 1.0])
+                    conc = np.random.uniform(float(conc_min), float(conc_max))
+                    doping_num = max(1, int(len(candidate_indices) * conc))
+                elif "count" == rule["use"]:
+                    count_min, count_max = rule.get("count", [1, 1])
+                    doping_num = np.random.randint(int(count_min), int(count_max) + 1)
+                else:
+                    doping_num = len(candidate_indices)
+
+                doping_num = min(doping_num, len(candidate_indices))
+
+                idxs = np.random.choice(candidate_indices, doping_num, replace=False)
+
+                dopant_list = list(dopants.keys())
+                ratios = np.array(list(dopants.values()), dtype=float)
+                ratios = ratios / ratios.sum()
+                sample = sample_dopants(dopant_list, ratios, doping_num, self.exact)
+
+                for idx, elem in zip(idxs, sample):
+                    new_structure[idx].symbol = elem
+                total_doping += doping_num
+            if total_doping:
+                new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Doping(num={total_doping})"
+
+            structure_list.append(new_structure)
+
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class RandomVacancyProcessor(StructureProcessor):
+    card_class = "RandomVacancyCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.rules = parse_rules(config.get("rules", ""))
+        self.max_num = config.get("max_atoms_condition", [1])[0]
+
+    def process(self, structure):
+        structure_list = []
+        if not self.rules:
+            return [structure]
+
+        for _ in range(self.max_num):
+            new_structure = structure.copy()
+            total_remove = 0
+            for rule in self.rules:
+                element = rule.get("element")
+                count_min, count_max = rule.get("count", [0, 0])
+                if not element or int(count_max) <= 0:
+                    continue
+
+                candidate_indices = get_candidate_indices(new_structure, element, rule.get("group"))
+                if not candidate_indices:
+                    continue
+
+                remove_num = np.random.randint(int(count_min), int(count_max) + 1)
+                remove_num = min(remove_num, len(candidate_indices))
+                if remove_num <= 0:
+                    continue
+
+                idxs = np.random.choice(candidate_indices, remove_num, replace=False)
+                for idx in sorted(idxs, reverse=True):
+                    del new_structure[idx]
+                total_remove += remove_num
+
+            if total_remove:
+                new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Vacancy(num={total_remove})"
+
+            structure_list.append(new_structure)
+
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class VacancyDefectProcessor(StructureProcessor):
+    card_class = "VacancyDefectCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.engine_type = config["engine_type"]
+        self.use_concentration = config["concentration_radio_button"]
+        self.concentration = config["concentration_condition"][0]
+        self.defect_num = config["num_condition"][0]
+        self.max_num = config["max_atoms_condition"][0]
+
+    def process(self, structure):
+        structure_list = []
+        engine_type = self.engine_type
+        max_num = self.max_num
+
+        n_atoms = len(structure)
+        if self.use_concentration:
+            max_defects = int(self.concentration * n_atoms)
+        else:
+            max_defects = self.defect_num  # 固定数量
+        if max_defects == n_atoms:
+            max_defects = max_defects - 1
+
+        if engine_type == 0:
+            # 为数量和位置分配维度：1 维用于数量，n_atoms 维用于位置
+            sobol_engine = Sobol(d=n_atoms + 1, scramble=True)
+            sobol_seq = sobol_engine.random(max_num)  # 生成 [0, 1] 的序列
+        else:
+            # Uniform 模式下分开处理
+            defect_counts = np.random.randint(1, max_defects + 1, max_num)
+
+        for i in range(max_num):
+            new_structure = structure.copy()
+
+            # 确定当前结构的缺陷数量
+            if engine_type == 0:
+                # 使用 Sobol 第 0 维控制数量 剩余维度控制位置
+                target_defects = 1 + int(sobol_seq[i, 0] * max_defects)  # [0, 1] -> [1, max_defects]
+                target_defects = min(target_defects, max_defects)  # 确保不超过 max_defects
+                position_scores = sobol_seq[i, 1:]
+            else:
+                target_defects = defect_counts[i]
+
+            if target_defects == 0:
+                structure_list.append(new_structure)
+                continue
+            if engine_type == 0:
+                sorted_indices = np.argsort(position_scores)
+                defect_indices = sorted_indices[:target_defects]
+            else:
+                defect_indices = np.random.choice(n_atoms, target_defects, replace=False)
+            # 创建空位
+            mask = np.zeros(n_atoms, dtype=bool)
+            mask[defect_indices] = True
+            n_vacancies = np.sum(mask)
+            del new_structure[mask]
+            new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Vacancy(num={n_vacancies})"
+            structure_list.append(new_structure)
+
+        return structure_list
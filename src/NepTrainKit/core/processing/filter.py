@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+筛选类卡片的处理逻辑: FPS 新颖度
+筛选需要整个数据集的描述符 不能逐个结构处理 所以不分块 由filter一次处理所有结构
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from loguru import logger
+
+from NepTrainKit import module_path
+from NepTrainKit.core.calculator import run_nep_calculator
+from NepTrainKit.core.io.descriptor_store import get_descriptor_store
+from NepTrainKit.core.io.novelty import get_novelty_index
+from NepTrainKit.core.io.select import farthest_point_sampling, structure_farthest_point_sampling
+from NepTrainKit.core.structure import Structure
+from .base import ProcessorManager, StructureProcessor
+
+# 原子环境模式下每批计算描述符的原子数
+ATOMIC_DESCRIPTOR_BATCH = 1 << 20
+
+
+def get_nep_path(nep_path):
+    """与卡片from_dict一致 配置中的势函数不存在时使用nep89"""
+    if nep_path and os.path.exists(nep_path):
+        return nep_path
+    default_path = os.path.join(module_path, "Config", "nep89.txt")
+    logger.warning(f"NEP file {nep_path} not exists, use {default_path}")
+    return default_path
+
+
+class FilterProcessor(StructureProcessor):
+    """
+    整个数据集一起处理的卡片
+    calculate(nep_path, structures, calculator_type)计算描述符 界面中替换成可以中止的NEPProcess
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.calculate = run_nep_calculator
+
+    def process(self, structure):
+        raise NotImplementedError(f"{self.card_class} filters the whole dataset, use filter instead")
+
+    def filter(self, structures, progress=None):
+        """
+        :param structures: 输入的ase.Atoms列表
+        :param progress: progress(百分比) 汇报进度
+        :return: 保留的结构列表
+        """
+        raise NotImplementedError
+
+
+@ProcessorManager.register_processor
+class FPSFilterProcessor(FilterProcessor):
+    card_class = "FPSFilterDataCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.nep_path = get_nep_path(config.get("nep_path"))
+        self.n_samples = config["num_condition"][0]
+        self.distance = config["min_distance_condition"][0]
+        self.approximate = config.get("approximate", False)
+        self.level = config.get("level", 0)
+
+    def filter(self, structures, progress=None):
+        if self.level == 1:
+            return self.filter_atomic_environment(structures, progress)
+        desc_array = get_descriptor_store().get(self.nep_path, "structure", structures,
+                                                lambda s: self.calculate(self.nep_path, s, "descriptor"))
+        remaining_indices = farthest_point_sampling(desc_array, n_samples=self.n_samples, min_dist=self.distance,
+                                                    n_jobs=os.cpu_count(), approximate=self.approximate)
+        return [structures[i] for i in remaining_indices]
+
+    def compute_atomic_descriptor(self, structures, path, progress=None):
+        """
+        读取或分批计算所有原子的描述符 写入path处的npy(memmap)
+        已经算过的结构从描述符缓存中读取
+        每批不超过ATOMIC_DESCRIPTOR_BATCH个原子 内存占用与数据集大小无关
+        """
+        atom_counts = np.array([len(structure) for structure in structures], dtype=np.int64)
+        total = max(int(atom_counts.sum()), 1)
+        computed = [0]
+
+        def compute(batch):
+            block = self.calculate(self.nep_path, batch, "atomic_descriptor")
+            computed[0] += sum(len(structure) for structure in batch)
+            if progress is not None:
+                progress(int(90 * computed[0] / total))
+            return block
+
+        desc_array = get_descriptor_store().get(self.nep_path, "atomic", structures, compute,
+                                                path=path, batch_rows=ATOMIC_DESCRIPTOR_BATCH)
+        if desc_array.size == 0:
+            raise RuntimeError("Failed to calculate the atomic descriptors")
+        return desc_array, atom_counts
+
+    def filter_atomic_environment(self, structures, progress=None):
+        """对原子描述符做FPS 保留包含被选原子的结构"""
+        cache_dir = tempfile.mkdtemp(prefix="neptrainkit_fps_")
+        try:
+            desc_array, atom_counts = self.compute_atomic_descriptor(structures,
+                                                                     os.path.join(cache_dir, "descriptor.npy"),
+                                                                     progress)
+            remaining_indices = structure_farthest_point_sampling(desc_array, atom_counts, n_samples=self.n_samples,
+                                                                  min_dist=self.distance, n_jobs=os.cpu_count())
+            del desc_array
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        return [structures[i] for i in remaining_indices]
+
+
+@ProcessorManager.register_processor
+class NoveltyFilterProcessor(FilterProcessor):
+    card_class = "NoveltyFilterDataCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.nep_path = get_nep_path(config.get("nep_path"))
+        self.train_path = config.get("train_path", "")
+        self.n_samples = config["num_condition"][0]
+        self.distance = config["min_distance_condition"][0]
+
+    def filter(self, structures, progress=None):
+        if not os.path.exists(self.train_path):
+            raise FileNotFoundError(f"Training set file {self.train_path} not exists")
+        store = get_descriptor_store()
+        compute = lambda s: self.calculate(self.nep_path, s, "descriptor")
+
+        train_structures = Structure.read_multiple(self.train_path)
+        reference = store.get(self.nep_path, "structure", train_structures, compute)
+        desc_array = store.get(self.nep_path, "structure", structures, compute)
+        if reference.size == 0 or desc_array.size == 0:
+            raise RuntimeError("Failed to calculate the descriptors")
+        index = get_novelty_index(reference, store.index_dir)
+        store.evict()
+        scores = index.query(desc_array)
+        # 从最新颖的开始保留
+        order = np.argsort(-scores, kind="stable")
+        order = order[scores[order] >= self.distance][:self.n_samples]
+        return [structures[i] for i in order]
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""晶格类卡片的处理逻辑: 扩胞 应变 晶格缩放 剪切"""
+from itertools import combinations
+from typing import List, Tuple
+
+import numpy as np
+from ase.build import make_supercell
+from ase.geometry import cell_to_cellpar, cellpar_to_cell
+from scipy.stats.qmc import Sobol
+
+from NepTrainKit.core.structure import process_organic_clusters, get_clusters
+from .base import ProcessorManager, StructureProcessor
+
+
+@ProcessorManager.register_processor
+class SuperCellProcessor(StructureProcessor):
+    card_class = "SuperCellCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.super_cell_type = config["super_cell_type"]
+        self.use_scale = config["super_scale_radio_button"]
+        self.scale_condition = config["super_scale_condition"]
+        self.use_cell = config["super_cell_radio_button"]
+        self.cell_condition = config["super_cell_condition"]
+        self.use_max_atoms = config["max_atoms_radio_button"]
+        self.max_atoms_condition = config["max_atoms_condition"]
+
+    def _get_scale_factors(self) -> List[Tuple[int, int, int]]:
+        """扩包比例"""
+        na, nb, nc = self.scale_condition
+        return [(na, nb, nc)]
+
+    def _get_max_cell_factors(self, structure) -> List[Tuple[int, int, int]]:
+        """根据最大晶格常数计算扩包比例"""
+        max_a, max_b, max_c = self.cell_condition
+        lattice = structure.cell.array
+
+        # 计算晶格向量长度
+        a_len = np.linalg.norm(lattice[0])
+        b_len = np.linalg.norm(lattice[1])
+        c_len = np.linalg.norm(lattice[2])
+
+        # 计算最大倍数并确保至少为 1
+        na = max(int(max_a / a_len) if a_len > 0 else 0, 1)
+        nb = max(int(max_b / b_len) if b_len > 0 else 0, 1)
+        nc = max(int(max_c / c_len) if c_len > 0 else 0, 1)
+
+        # 调整倍数以不超过最大值
+        na = na - 1 if na * a_len > max_a else na
+        nb = nb - 1 if nb * b_len > max_b else nb
+        nc = nc - 1 if nc * c_len > max_c else nc
+
+        # 确保最小值为 1
+        return [(max(na, 1), max(nb, 1), max(nc, 1))]
+
+    def _get_max_atoms_factors(self, structure) -> List[Tuple[int, int, int]]:
+        """根据最大原子数计算所有可能的扩包比例"""
+        max_atoms = self.max_atoms_condition[0]
+        num_atoms_orig = len(structure)
+        # 估算最大可能倍数
+        max_n = int(max_atoms / num_atoms_orig)
+        max_n_a = max_n_b = max_n_c = max(max_n, 1)
+
+        # 枚举所有可能的扩包比例
+        expansion_factors = []
+        for na in range(1, max_n_a + 1):
+            for nb in range(1, max_n_b + 1):
+                for nc in range(1, max_n_c + 1):
+                    total_atoms = num_atoms_orig * na * nb * nc
+                    if total_atoms <= max_atoms:
+                        expansion_factors.append((na, nb, nc))
+                    else:
+                        break
+
+        # 按总原子数排序
+        expansion_factors.sort(key=lambda x: num_atoms_orig * x[0] * x[1] * x[2])
+        if len(expansion_factors) == 0:
+            return [(1, 1, 1)]
+
+        return expansion_factors
+
+    def _generate_structures(self, structure, expansion_factors):
+        """根据超胞类型和扩包比例生成结构列表"""
+        structure_list = []
+
+        if self.super_cell_type == 0:  # 最大扩包
+            na, nb, nc = expansion_factors[-1]  # 取最大的扩包比例
+
+            if na == 1 and nb == 1 and nc == 1:  # 只有一个扩包
+                return [structure.copy()]  # 直接返回原始结构
+
+            supercell = make_supercell(structure, np.diag([na, nb, nc]), order="atom-major")
+            supercell.info["Config_type"] = supercell.info.get("Config_type", "") + f" supercell({na, nb, nc})"
+
+            structure_list.append(supercell)
+
+        elif self.super_cell_type == 1:  # 随机组合或所有组合
+            if self.use_max_atoms:
+                # 对于 max_atoms，返回所有可能的扩包
+                for na, nb, nc in expansion_factors:
+                    if na == 1 and nb == 1 and nc == 1:  # 只有一个扩包
+                        supercell = structure.copy()
+                    else:
+                        supercell = make_supercell(structure, np.diag([na, nb, nc]), order="atom-major")
+                        supercell.info["Config_type"] = supercell.info.get("Config_type", "") + f" supercell({na, nb, nc})"
+                    structure_list.append(supercell)
+            else:
+                # 对于 scale 或 max_cell，枚举所有子组合
+                na, nb, nc = expansion_factors[0]
+                for i in range(1, na + 1):
+                    for j in range(1, nb + 1):
+                        for k in range(1, nc + 1):
+                            if na == 1 and nb == 1 and nc == 1:  # 只有一个扩包
+                                supercell = structure.copy()
+                            else:
+                                supercell = make_supercell(structure, np.diag([i, j, k]), order="atom-major")
+                                supercell.info["Config_type"] = supercell.info.get("Config_type", "") + f" supercell({i, j, k})"
+                            structure_list.append(supercell)
+
+        # super_cell_type == 2 的情况未实现，保持为空
+        return structure_list
+
+    def process(self, structure):
+        # 根据选择的扩包方式获取扩包参数
+        if self.use_scale:
+            expansion_factors = self._get_scale_factors()
+        elif self.use_cell:
+            expansion_factors = self._get_max_cell_factors(structure)
+        elif self.use_max_atoms:
+            expansion_factors = self._get_max_atoms_factors(structure)
+        else:
+            expansion_factors = [(1, 1, 1)]  # 默认情况
+
+        return self._generate_structures(structure, expansion_factors)
+
+
+@ProcessorManager.register_processor
+class CellStrainProcessor(StructureProcessor):
+    card_class = "CellStrainCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.axes = config["engine_type"]
+        self.ranges = [config["x_range"], config["y_range"], config["z_range"]]
+        self.identify_organic = config.get("organic", False)
+
+    def process(self, structure):
+        structure_list = []
+        axes = self.axes
+        if self.identify_organic:
+            clusters, is_organic_list = get_clusters(structure)
+        strain_range = [np.arange(start=start, stop=stop + 0.001, step=step) for start, stop, step in self.ranges]
+        cell = structure.get_cell()
+        # Define possible axes (0: x, 1: y, 2: z)
+        all_axes = [0, 1, 2]
+
+        if axes == 'isotropic':
+            for strain in strain_range[0]:
+                new_structure = structure.copy()
+                new_cell = cell.copy() * (1 + strain / 100)
+                new_structure.set_cell(new_cell, scale_atoms=True)
+                if self.identify_organic:
+                    process_organic_clusters(structure, new_structure, clusters, is_organic_list)
+
+                strain_info = [f"all:{strain}%"]
+                new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Strain({'|'.join(strain_info)})"
+                structure_list.append(new_structure)
+        else:
+            if axes == 'uniaxial':
+                axes_combinations = [[i] for i in all_axes]
+            elif axes == 'biaxial':
+                axes_combinations = list(combinations(all_axes, 2))
+            elif axes == 'triaxial':
+                axes_combinations = [all_axes]
+            else:
+                axes_combinations = [["XYZ".index(i.upper()) for i in axes if i.upper() in "XYZ"]]
+            for ax_comb in axes_combinations:
+                if len(ax_comb) == 0:
+                    continue
+                strain_combinations = (np.array(np.meshgrid(*[strain_range[_] for _ in ax_comb])).T.reshape(-1, len(ax_comb)))
+                for strain_vals in strain_combinations:
+                    new_structure = structure.copy()
+                    new_cell = cell.copy()
+                    for ax_idx, strain in zip(ax_comb, strain_vals):
+                        new_cell[ax_idx] *= (1 + strain / 100)
+                    new_structure.set_cell(new_cell, scale_atoms=True)
+                    if self.identify_organic:
+                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
+
+                    strain_info = ["XYZ"[ax] + ":" + str(s) + "%" for ax, s in zip(ax_comb, strain_vals)]
+                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Strain({'|'.join(strain_info)})"
+                    structure_list.append(new_structure)
+
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class CellScalingProcessor(StructureProcessor):
+    card_class = "CellScalingCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.engine_type = config["engine_type"]
+        self.perturb_angles = config["perturb_angle"]
+        self.max_scaling = config["scaling_condition"][0]
+        self.max_num = config["num_condition"][0]
+        self.identify_organic = config.get("organic", False)
+
+    def process(self, structure):
+        structure_list = []
+        engine_type = self.engine_type
+        max_scaling = self.max_scaling
+        max_num = self.max_num
+        perturb_angles = self.perturb_angles
+        dim = 6 if perturb_angles else 3  # abc + angles
+        if engine_type == 0:
+            sobol_engine = Sobol(d=dim, scramble=True)
+            sobol_seq = sobol_engine.random(max_num)  # 生成 [0, 1] 的序列
+            perturbation_factors = 1 + (sobol_seq - 0.5) * 2 * max_scaling
+        else:
+            perturbation_factors = 1 + np.random.uniform(-max_scaling, max_scaling, (max_num, dim))
+
+        orig_lattice = structure.cell.array
+        orig_lengths = np.linalg.norm(orig_lattice, axis=1)
+        unit_vectors = orig_lattice / orig_lengths[:, np.newaxis]  # 原始晶格的单位向量
+        if self.identify_organic:
+            clusters, is_organic_list = get_clusters(structure)
+        for i in range(max_num):
+            # 提取微扰因子
+            new_structure = structure.copy()
+            length_factors = perturbation_factors[i, :3]
+            new_lengths = orig_lengths * length_factors
+
+            # 构造新晶格：仅缩放长度，保持方向
+            new_lattice = unit_vectors * new_lengths[:, np.newaxis]
+
+            # 可选：扰动角度
+            if perturb_angles:
+                angle_factors = perturbation_factors[i, 3:]
+                angles = np.arccos([
+                    np.dot(orig_lattice[1], orig_lattice[2]) / (orig_lengths[1] * orig_lengths[2]),
+                    np.dot(orig_lattice[0], orig_lattice[2]) / (orig_lengths[0] * orig_lengths[2]),
+                    np.dot(orig_lattice[0], orig_lattice[1]) / (orig_lengths[0] * orig_lengths[1])
+                ])
+                new_angles = angles * angle_factors
+                # 重新构造晶格（保持角度扰动）
+                new_lattice = np.zeros((3, 3), dtype=np.float32)
+                new_lattice[0] = [new_lengths[0], 0, 0]
+                new_lattice[1] = [new_lengths[1] * np.cos(new_angles[2]),
+                                  new_lengths[1] * np.sin(new_angles[2]), 0]
+                cx = new_lengths[2] * np.cos(new_angles[1])
+                cy = new_lengths[2] * (np.cos(new_angles[0]) - np.cos(new_angles[1]) * np.cos(new_angles[2])) / np.sin(
+                    new_angles[2])
+                cz = np.sqrt(max(new_lengths[2] ** 2 - cx ** 2 - cy ** 2, 0))  # 防止负值
+                new_lattice[2] = [cx, cy, cz]
+
+            new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Scaling(scaling={max_scaling},{'uniform' if engine_type == 1 else 'Sobol'})"
+
+            # 缩放原子位置
+            new_structure.set_cell(new_lattice, scale_atoms=True)
+            if self.identify_organic:
+                process_organic_clusters(structure, new_structure, clusters, is_organic_list)
+
+            structure_list.append(new_structure)
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class ShearMatrixProcessor(StructureProcessor):
+    card_class = "ShearMatrixCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.identify_organic = config.get("organic", False)
+        self.symmetric = config.get("symmetric", True)
+        self.xy = config.get("xy_range", [-5, 5, 1])
+        self.yz = config.get("yz_range", [-5, 5, 1])
+        self.xz = config.get("xz_range", [-5, 5, 1])
+
+    def process(self, structure):
+        structure_list = []
+        xy, yz, xz = self.xy, self.yz, self.xz
+        symmetric = self.symmetric
+        if self.identify_organic:
+            clusters, is_organic_list = get_clusters(structure)
+
+        xy_range = np.arange(xy[0], xy[1] + 0.001, xy[2])
+        yz_range = np.arange(yz[0], yz[1] + 0.001, yz[2])
+        xz_range = np.arange(xz[0], xz[1] + 0.001, xz[2])
+        cell = structure.get_cell()
+
+        for sxy in xy_range:
+            for syz in yz_range:
+                for sxz in xz_range:
+                    new_structure = structure.copy()
+                    shear_matrix = np.eye(3)
+                    shear_matrix[0, 1] += sxy / 100
+                    shear_matrix[1, 2] += syz / 100
+                    shear_matrix[0, 2] += sxz / 100
+                    if symmetric:
+                        shear_matrix[1, 0] += sxy / 100
+                        shear_matrix[2, 1] += syz / 100
+                        shear_matrix[2, 0] += sxz / 100
+
+                    new_cell = np.matmul(cell, shear_matrix)
+                    new_structure.set_cell(new_cell, scale_atoms=True)
+                    if self.identify_organic:
+                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
+                    info_list = []
+                    if abs(sxy) > 1e-8:
+                        info_list.append(f"xy:{sxy}%")
+                    if abs(syz) > 1e-8:
+                        info_list.append(f"yz:{syz}%")
+                    if abs(sxz) > 1e-8:
+                        info_list.append(f"xz:{sxz}%")
+                    info_str = "|".join(info_list)
+                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Shear({info_str},symmetric={symmetric})"
+                    structure_list.append(new_structure)
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class ShearAngleProcessor(StructureProcessor):
+    card_class = "ShearAngleCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.identify_organic = config.get("organic", False)
+        self.alpha = config.get("alpha_range", [-2, 2, 1])
+        self.beta = config.get("beta_range", [-2, 2, 1])
+        self.gamma = config.get("gamma_range", [-2, 2, 1])
+
+    def process(self, structure):
+        structure_list = []
+        alpha, beta, gamma = self.alpha, self.beta, self.gamma
+        if self.identify_organic:
+            clusters, is_organic_list = get_clusters(structure)
+
+        alpha_range = np.arange(alpha[0], alpha[1] + 0.001, alpha[2])
+        beta_range = np.arange(beta[0], beta[1] + 0.001, beta[2])
+        gamma_range = np.arange(gamma[0], gamma[1] + 0.001, gamma[2])
+        cell = structure.get_cell()
+        cellpar = cell_to_cellpar(cell)  # [a,b,c,alpha,beta,gamma] in degrees
+        lengths = cellpar[:3]
+        angles0 = cellpar[3:]
+
+        for da in alpha_range:
+            for db in beta_range:
+                for dg in gamma_range:
+                    new_structure = structure.copy()
+                    new_angles = angles0 + np.array([da, db, dg])
+                    new_cellpar = [*lengths, *new_angles]
+                    new_lattice = cellpar_to_cell(new_cellpar)
+                    new_structure.set_cell(new_lattice, scale_atoms=True)
+                    if self.identify_organic:
+                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
+                    info_list = []
+                    if abs(da) > 1e-8:
+                        info_list.append(f"alpha:{da}°")
+                    if abs(db) > 1e-8:
+                        info_list.append(f"beta:{db}°")
+                    if abs(dg) > 1e-8:
+                        info_list.append(f"gamma:{dg}°")
+                    info_str = "|".join(info_list)
+                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" ShearAngle({info_str})"
+                    structure_list.append(new_structure)
+        return structure_list
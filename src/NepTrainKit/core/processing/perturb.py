@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""原子微扰卡片的处理逻辑"""
+import numpy as np
+from scipy.stats.qmc import Sobol
+
+from NepTrainKit.core.structure import get_clusters
+from .base import ProcessorManager, StructureProcessor
+
+
+@ProcessorManager.register_processor
+class PerturbProcessor(StructureProcessor):
+    card_class = "PerturbCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.engine_type = config["engine_type"]
+        self.max_scaling = config["scaling_condition"][0]
+        self.max_num = config["num_condition"][0]
+        self.identify_organic = config.get("organic", False)
+
+    def process(self, structure):
+        structure_list = []
+        engine_type = self.engine_type
+        max_scaling = self.max_scaling
+        max_num = self.max_num
+
+        n_atoms = len(structure)
+        dim = n_atoms * 3
+
+        # 生成扰动因子
+        if engine_type == 0:
+            sobol_engine = Sobol(d=dim, scramble=True)
+            perturbation_factors = (sobol_engine.random(max_num) - 0.5) * 2
+        else:
+            perturbation_factors = np.random.uniform(-1, 1, (max_num, dim))
+
+        # 识别团簇（如启用）
+        if self.identify_organic:
+            clusters, is_organic_list = get_clusters(structure)
+            organic_clusters = [cluster for cluster, is_org in zip(clusters, is_organic_list) if is_org]
+            inorganic_clusters = [cluster for cluster, is_org in zip(clusters, is_organic_list) if not is_org]
+
+        orig_positions = structure.positions
+
+        for i in range(max_num):
+            delta = perturbation_factors[i].reshape(n_atoms, 3) * max_scaling
+            new_positions = orig_positions + delta  # 默认：全部扰动
+
+            if self.identify_organic:
+                # 初始化为原始坐标，随后分组替换
+                new_positions = orig_positions.copy()
+
+                # 有机分子：整体平移
+                for cluster in organic_clusters:
+                    new_positions[cluster] += delta[cluster[0]]
+
+                # 无机分子：逐原子扰动
+                for cluster in inorganic_clusters:
+                    new_positions[cluster] += delta[cluster]
+
+            # 构造新结构
+            new_structure = structure.copy()
+            new_structure.set_positions(new_positions)
+            new_structure.wrap()
+            config_str = f" Perturb(distance={max_scaling}, {'uniform' if engine_type == 1 else 'Sobol'})"
+            new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + config_str
+            structure_list.append(new_structure)
+
+        return structure_list
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+不依赖界面的卡片流水线
+按导出的card_config.json依次执行勾选的卡片 语义与界面中的运行和导出一致:
+每张卡片的输入是上一张卡片的结果 结果为空时停止 导出时按卡片顺序写出结果
+相邻的结构处理卡片合并成一段 每个输入结构在同一个子进程中依次经过这些卡片 结果逐块写出
+筛选卡片和卡片组需要整个数据集 在这里等前面的卡片全部完成
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from ase.build.tools import sort as ase_sort
+from ase.io import read as ase_read, write as ase_write
+
+from NepTrainKit.core.geometry import iter_chunk_results
+from .base import ProcessorManager, PROCESS_CHUNK_SIZE, PROCESS_PARALLEL_THRESHOLD, process_structures
+from .filter import FilterProcessor
+
+GROUP_CARD_CLASS = "CardGroup"
+
+
+def read_structures(paths):
+    """
+    读取结构文件 并把Config_type统一成字符串
+    :param paths: 文件路径列表
+    :return: ase.Atoms列表
+    """
+    structures_list = []
+    for path in paths:
+        atoms = ase_read(path, ":")
+        # ase有时候会将字符串解析成数组或者int  这里转换成str
+        for atom in atoms:
+            if "config_type" in atom.info:
+                atom.info["Config_type"] = atom.info["config_type"]
+                del atom.info["config_type"]
+            if isinstance(atom.info.get("Config_type"), np.ndarray):
+                if atom.info["Config_type"].size == 0:
+                    atom.info["Config_type"] = ""
+                else:
+                    atom.info["Config_type"] = " ".join(atom.info["Config_type"])
+            else:
+                atom.info["Config_type"] = str(atom.info.get("Config_type", ""))
+            structures_list.append(atom)
+    return structures_list
+
+
+def _process_chain(structures, configs, sort_atoms, keep_all):
+    """
+    进程池中执行 一块输入结构依次经过一段卡片
+    返回每张卡片的结果列表 keep_all为False时只返回最后一张卡片的结果 中间结果不回传
+    """
+    np.random.seed()
+    processors = [ProcessorManager.create(config) for config in configs]
+    outputs = []
+    batch = structures
+    for processor in processors:
+        processed = []
+        for structure in batch:
+            result = processor.process(structure)
+            if sort_atoms:
+                result = [ase_sort(s) for s in result]
+            processed.extend(result)
+        outputs.append(processed if keep_all else [])
+        batch = processed
+    outputs[-1] = batch
+    return outputs
+
+
+class CardPipeline:
+    """
+    由卡片配置构建的流水线
+
+    参数:
+    cards: 卡片to_dict的结果列表 未勾选的卡片会被跳过
+    sort_atoms: 是否按元素排序生成的结构
+    n_jobs: 进程数 None为CPU数
+    """
+
+    def __init__(self, cards, sort_atoms=False, n_jobs=None, chunk_size=PROCESS_CHUNK_SIZE,
+                 parallel_threshold=PROCESS_PARALLEL_THRESHOLD):
+        self.cards = [card for card in cards if card.get("check_state", True)]
+        self.sort_atoms = sort_atoms
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+        for card in self.cards:
+            self._check_card(card)
+        self.stages = self._build_stages()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """读取界面导出的card_config.json"""
+        with open(path, "r", encoding="utf-8") as file:
+            config = json.load(file)
+        return cls(config.get("cards", []), **kwargs)
+
+    @staticmethod
+    def _check_card(card):
+        """提前创建一次处理器 没有无界面实现的卡片在开始计算前就报错"""
+        if card.get("class") == GROUP_CARD_CLASS:
+            for sub_card in card.get("card_list", []):
+                if sub_card.get("check_state", True):
+                    ProcessorManager.create(sub_card)
+            if card.get("filter_card"):
+                ProcessorManager.create(card["filter_card"])
+        else:
+            ProcessorManager.create(card)
+
+    def _build_stages(self):
+        """
+        相邻的结构处理卡片合并成一段
+        :return: [(类型, 第一张卡片的下标, 卡片配置列表)] 类型为chain filter group
+        """
+        stages = []
+        for index, card in enumerate(self.cards):
+            if card.get("class") == GROUP_CARD_CLASS:
+                stages.append(("group", index, [card]))
+            elif issubclass(ProcessorManager.processor_info_dict[card["class"]], FilterProcessor):
+                stages.append(("filter", index, [card]))
+            elif stages and stages[-1][0] == "chain":
+                stages[-1][2].append(card)
+            else:
+                stages.append(("chain", index, [card]))
+        return stages
+
+    def _run_group(self, card, structures):
+        """
+        卡片组中勾选的卡片都以同一个数据集为输入 结果拼接
+        与界面一致 下一张卡片的输入是拼接的结果 筛选卡片只影响导出
+        :return: (传给下一张卡片的结构, 导出的结构)
+        """
+        sub_cards = [sub_card for sub_card in card.get("card_list", []) if sub_card.get("check_state", True)]
+        if not sub_cards:
+            return structures, []
+        result = []
+        for sub_card in sub_cards:
+            result.extend(process_structures(structures, sub_card, self.sort_atoms, self.n_jobs, self.chunk_size,
+                                             self.parallel_threshold))
+        filter_card = card.get("filter_card")
+        if filter_card and filter_card.get("check_state", True):
+            return result, ProcessorManager.create(filter_card).filter(result)
+        return result, result
+
+    def run(self, structures, keep_all=False, progress=None):
+        """
+        执行流水线
+
+        参数:
+        structures: 输入的ase.Atoms列表
+        keep_all: True时产生每张卡片的结果 与界面导出一致 否则只产生最后一张卡片的结果
+        progress: progress(卡片下标, 百分比) 汇报进度 合并成一段的卡片同时推进 每张卡片都会汇报
+
+        返回:
+        生成器 逐块产生 (卡片下标, 结构列表) 同一张卡片的结果按顺序产生 不同卡片的块可能交错
+        """
+        last_index = len(self.cards) - 1
+        for kind, first_index, cards in self.stages:
+            if not structures:
+                return
+            if kind == "chain":
+                total = len(structures)
+                next_structures = []
+                card_indices = range(first_index, first_index + len(cards))
+                is_last = card_indices[-1] == last_index
+                for rows, outputs in iter_chunk_results(structures, lambda structure: structure, _process_chain,
+                                                        (cards, self.sort_atoms, keep_all), self.n_jobs,
+                                                        self.chunk_size, self.parallel_threshold):
+                    for index, output in zip(card_indices, outputs):
+                        if output and (keep_all or index == last_index):
+                            yield index, output
+                    if not is_last:
+                        # 最后一段的结果直接写出 不在内存中累积
+                        next_structures.extend(outputs[-1])
+                    if progress is not None:
+                        # 每块依次经过这一段的所有卡片 这些卡片的进度相同
+                        for index in card_indices:
+                            progress(index, int(rows.stop / total * 100))
+                structures = next_structures
+            elif kind == "filter":
+                processor = ProcessorManager.create(cards[0])
+                structures = processor.filter(structures,
+                                              None if progress is None else lambda p: progress(first_index, p))
+                if structures and (keep_all or first_index == last_index):
+                    yield first_index, structures
+            else:
+                structures, exported = self._run_group(cards[0], structures)
+                if exported and (keep_all or first_index == last_index):
+                    yield first_index, exported
+            if progress is not None:
+                for index in range(first_index, first_index + len(cards)):
+                    progress(index, 100)
+
+    def run_to_file(self, structures, path, keep_all=False, progress=None):
+        """
+        执行流水线并把结果写到扩展xyz文件
+        keep_all时每张卡片的结果先写到临时文件 最后按卡片顺序合并 与界面的导出一致
+        :return: 写出的结构数
+        """
+        count = 0
+        if not keep_all:
+            with open(path, "w") as file:
+                for _, batch in self.run(structures, False, progress):
+                    ase_write(file, batch, format="extxyz", append=True)
+                    count += len(batch)
+            return count
+
+        temp_dir = tempfile.mkdtemp(prefix="neptrainkit_pipeline_")
+        card_files = {}
+        try:
+            try:
+                for index, batch in self.run(structures, True, progress):
+                    if index not in card_files:
+                        card_files[index] = open(os.path.join(temp_dir, f"{index}.xyz"), "w")
+                    ase_write(card_files[index], batch, format="extxyz", append=True)
+                    count += len(batch)
+            finally:
+                for file in card_files.values():
+                    file.close()
+            with open(path, "w") as output:
+                for index in sorted(card_files):
+                    with open(os.path.join(temp_dir, f"{index}.xyz"), "r") as file:
+                        shutil.copyfileobj(file, output)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return count
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""表面类卡片的处理逻辑: 随机切面 层错"""
+import numpy as np
+from ase.build import surface
+from loguru import logger
+
+from .base import ProcessorManager, StructureProcessor
+
+
+@ProcessorManager.register_processor
+class RandomSlabProcessor(StructureProcessor):
+    card_class = "RandomSlabCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.h = config.get("h_range", [0, 1, 1])
+        self.k = config.get("k_range", [0, 1, 1])
+        self.l = config.get("l_range", [1, 3, 1])
+        self.layers = config.get("layer_range", [3, 6, 1])
+        self.vacuum = config.get("vacuum_range", [10, 10, 1])
+
+    def process(self, structure):
+        structure_list = []
+
+        h_min, h_max, h_step = self.h
+        k_min, k_max, k_step = self.k
+        l_min, l_max, l_step = self.l
+        layer_min, layer_max, layer_step = self.layers
+        vac_min, vac_max, vac_step = self.vacuum
+
+        h_range = np.arange(h_min, h_max + 1, h_step)
+        k_range = np.arange(k_min, k_max + 1, k_step)
+        l_range = np.arange(l_min, l_max + 1, l_step)
+        layer_range = np.arange(layer_min, layer_max + 1, layer_step)
+        vac_range = np.arange(vac_min, vac_max + vac_step, vac_step)
+
+        for h in h_range:
+            for k in k_range:
+                for l in l_range:
+                    if h == 0 and k == 0 and l == 0:
+                        continue
+                    for layers in layer_range:
+                        for vac in vac_range:
+                            try:
+                                if vac == 0:
+                                    vac = None
+                                slab = surface(structure, (int(h), int(k), int(l)), int(layers), vacuum=vac, periodic=True)
+                                slab.wrap()
+                                slab.info["Config_type"] = slab.info.get("Config_type", "") + f" Slab(hkl={int(h)}{int(k)}{int(l)},layers={int(layers)},vacuum={vac})"
+                                structure_list.append(slab)
+                            except Exception as e:
+                                logger.error(f"Failed to build slab {(h, k, l)}: {e}")
+        return structure_list
+
+
+@ProcessorManager.register_processor
+class StackingFaultProcessor(StructureProcessor):
+    card_class = "StackingFaultCard"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.hkl = [int(v) for v in config.get("hkl", [1, 1, 1])]
+        self.step = config.get("step", [0.0, 1.0, 0.5])
+        self.num_layers = int(config.get("layers", [1])[0])
+
+    def process(self, structure):
+        structure_list = []
+        h, k, l = self.hkl
+        step_start, step_end, step_step = self.step
+        num_layers = self.num_layers
+
+        cell = structure.cell.array
+        recip = np.linalg.inv(cell).T
+        normal = h * recip[0] + k * recip[1] + l * recip[2]
+        if np.linalg.norm(normal) < 1e-8:
+            return [structure]
+        normal = normal / np.linalg.norm(normal)
+
+        positions = structure.get_positions()
+        # 计算与 normal 垂直的向量
+        non_parallel_vector = np.array([1, 0, 0]) if normal[0] != 1 else np.array([0, 1, 0])
+        perpendicular_vector = np.cross(normal, non_parallel_vector)
+        perpendicular_vector = perpendicular_vector / np.linalg.norm(perpendicular_vector)  # 归一化
+
+        # 使用垂直向量进行分层
+        coord = positions @ perpendicular_vector  # 使用垂直向量进行投影
+        unique_coords = np.unique(np.round(coord, 8))
+        unique_coords.sort()
+        # 按照分层数选择平面位置
+        if num_layers >= len(unique_coords):
+            plane_pos = unique_coords[len(unique_coords) // 2]
+        else:
+            plane_pos = unique_coords[num_layers - 1]
+        mask = coord >= plane_pos
+
+        step_values = np.arange(step_start, step_end + step_step / 2, step_step)
+        for d in step_values:
+            new_structure = structure.copy()
+            pos = new_structure.positions.copy()
+
+            pos[mask] += normal * d
+
+            new_structure.set_positions(pos)
+            new_structure.wrap()
+            new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" StackingFault(hkl={h}{k}{l},step={d})"
+            structure_list.append(new_structure)
+        return structure_list
@@ -4,6 +4,7 @@
 # @Author  : 兵
 # @email    : 1747193328@qq.com
 import glob
+import hashlib
 import json
 import os
 import re
@@ -11,12 +12,14 @@ from copy import deepcopy
 from pathlib import Path
 
 import numpy as np
-from ase import neighborlist
+from ase.data import covalent_radii as ase_covalent_radii
 from ase.geometry import find_mic
 from loguru import logger
+from scipy.sparse import coo_matrix
 from scipy.sparse.csgraph import connected_components
-from collections import defaultdict
-from NepTrainKit import utils, module_path
+from collections import defaultdict, OrderedDict
+from NepTrainKit import module_path, timeit
+from .neighbor import get_neighbor_pairs, get_pair_min_distances
 
 
 
@@ -25,6 +28,16 @@ with open(os.path.join(module_path, "Config/ptable.json"), "r", encoding="utf-8"
 
 
 atomic_numbers={elem_info["symbol"]:elem_info["number"] for elem_info in table_info.values()}
+# 按原子序数索引的查找表 没有的原子序数为0
+covalent_radii_table = np.zeros(max(atomic_numbers.values()) + 1, dtype=np.float64)
+for _elem_info in table_info.values():
+    covalent_radii_table[_elem_info["number"]] = _elem_info["radii"] / 100
+# 最小距离统计的默认截断半径(Å) 超过该距离的原子对不再统计
+MINI_DISTANCE_CUTOFF = 6.0
+# 团簇识别时加在共价半径上的距离 与ase NeighborList的skin默认值相同
+CLUSTER_SKIN = 0.3
+# 缓存团簇识别结果的结构数
+CLUSTER_CACHE_SIZE = 128
 
 class Structure:
     """
@@ -91,9 +104,36 @@ class Structure:
         gamma = _angle(a_vec, b_vec)
         return np.array([alpha, beta, gamma], dtype=np.float32)
 
+    def _get_species_cache(self):
+        """按species数组缓存元素编号 元素不变时只计算一次"""
+        elements = self.elements
+        cache = getattr(self, "_species_cache", None)
+        if cache is None or cache[0] is not elements or len(cache[2]) != len(elements):
+            symbols, codes = np.unique(np.asarray(elements, dtype=str), return_inverse=True)
+            symbol_numbers = np.array([atomic_numbers[symbol] for symbol in symbols.tolist()], dtype=np.int64)
+            cache = (elements, symbols.tolist(), codes.astype(np.int64), symbol_numbers[codes])
+            self._species_cache = cache
+        return cache
+
+    @property
+    def species_codes(self):
+        """(元素符号, 每个原子的元素编号) 元素符号按字母顺序排列"""
+        _, symbols, codes, _ = self._get_species_cache()
+        return symbols, codes
+
+    @property
+    def number_array(self):
+        """原子序数 int64数组"""
+        return self._get_species_cache()[3]
+
     @property
     def numbers(self):
-        return [atomic_numbers[element] for element in self.elements ]
+        return self.number_array.tolist()
+
+    @property
+    def covalent_radii(self):
+        """每个原子的共价半径(Å)"""
+        return covalent_radii_table[self.number_array]
 
     @property
     def formula(self):
@@ -297,15 +337,15 @@ class Structure:
         :return:
 
         """
-        distance_info = self.get_mini_distance_info()
-        for elems, bond_length in distance_info.items():
-            elem0_info = table_info[str(atomic_numbers[elems[0]])]
-            elem1_info = table_info[str(atomic_numbers[elems[1]])]
-
-            # 相邻原子距离小于共价半径之和×系数就选中
-            if (elem0_info["radii"] + elem1_info["radii"]) * coefficient > bond_length * 100:
-                return False
-        return True
+        if len(self) == 0:
+            return True
+        symbols, species = self.species_codes
+        radii = covalent_radii_table[[atomic_numbers[symbol] for symbol in symbols]]
+        # 只需要搜索到最大的 共价半径之和×系数
+        i, j, distances, _ = self.get_neighbor_pairs(2 * radii.max() * coefficient)
+        minimum = get_pair_min_distances(species, i, j, distances, len(symbols))
+        # 相邻原子距离小于共价半径之和×系数就选中
+        return not np.any((radii[:, np.newaxis] + radii[np.newaxis, :]) * coefficient > minimum)
 
 
 
@@ -435,7 +475,7 @@ class Structure:
         return parsed_properties
 
     @staticmethod
-    @utils.timeit
+    @timeit
     def read_multiple(filename ):
         """
         Read a multi-structure XYZ file and return a list of Structure objects.
@@ -517,47 +557,49 @@ class Structure:
     def get_all_distances(self):
         return  calculate_pairwise_distances(self.cell, self.positions,False)
 
-    def get_mini_distance_info(self):
+    def get_neighbor_pairs(self, cutoff):
         """
-        返回原子对之间的最小距离
+        截断半径内的所有原子对(含周期像) 稀疏的形式 见neighbor.get_neighbor_pairs
+        :return: i, j, distances, shifts
         """
-        dist_matrix = calculate_pairwise_distances(self.cell, self.positions,False)
-        symbols=self.elements
-        # 提取上三角矩阵（排除对角线）
-        i, j = np.triu_indices(len(self), k=1)
-        # 用字典来存储每种元素对的最小键长
-        bond_lengths = {}
-        # 遍历所有原子对，计算每一对元素的最小键长
-        for idx in range(len(i)):
-            atom_i, atom_j = symbols[i[idx]], symbols[j[idx]]
-            # if atom_i==atom_j:
-            #     continue
-            # 获取当前键长
-            bond_length = dist_matrix[i[idx], j[idx]]
-            # if bond_length>5:
-            #     continue
-            # 确保元素对按字母顺序排列，避免 Cs-Ag 和 Ag-Cs 视为不同
-            element_pair = tuple(sorted([atom_i, atom_j]))
-            # 如果该元素对尚未存在于字典中，初始化其最小键长
-            if element_pair not in bond_lengths:
-                bond_lengths[element_pair] = bond_length
-            else:
-                # 更新最小键长
-                bond_lengths[element_pair] = min(bond_lengths[element_pair], bond_length)
+        return get_neighbor_pairs(self.cell, self.positions, cutoff)
 
+    def get_mini_distance_info(self, cutoff=MINI_DISTANCE_CUTOFF):
+        """
+        返回原子对之间的最小距离
+        只统计cutoff以内的原子对 没有原子对在cutoff以内的元素对不会出现在结果中
+        """
+        i, j, distances, _ = self.get_neighbor_pairs(cutoff)
+        # 元素按字母顺序编号 编号小的在前就是排好序的元素对 避免 Cs-Ag 和 Ag-Cs 视为不同
+        symbols, species = self.species_codes
+        minimum = get_pair_min_distances(species, i, j, distances, len(symbols))
+        rows, cols = np.triu_indices(len(symbols))
+        found = np.isfinite(minimum[rows, cols])
+        bond_lengths = {(symbols[row], symbols[col]): float(minimum[row, col])
+                        for row, col in zip(rows[found].tolist(), cols[found].tolist())}
         return bond_lengths
+    def get_bonds(self, coefficient=1.15, pbc=True):
+        """
+        距离小于 共价半径之和×coefficient 的所有键 包括跨越晶胞边界的键
+        :param coefficient: 系数
+        :param pbc: 是否考虑周期像
+        :return: i, j, shifts  原子j的周期像位于 positions[j] + shifts @ cell
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 3), dtype=np.int64)
+        covalent_radii = self.covalent_radii
+        i, j, distances, shifts = get_neighbor_pairs(self.cell, self.positions,
+                                                     2 * covalent_radii.max() * coefficient, pbc)
+        bond_mask = distances < (covalent_radii[i] + covalent_radii[j]) * coefficient
+        return i[bond_mask], j[bond_mask], shifts[bond_mask]
+
     def get_bond_pairs(self):
         """
         返回在范围内的所有键长
+        不考虑周期像 跨越边界的键见get_bonds
         """
-        i, j = np.triu_indices(len(self), k=1)
-        pos = np.array(self.positions)
-        diff = pos[i] - pos[j]
-        upper_distances = np.linalg.norm(diff, axis=1)
-        covalent_radii = np.array([table_info[str(n)]["radii"] / 100 for n in self.numbers])
-        radius_sum = covalent_radii[i] + covalent_radii[j]
-        bond_mask = (upper_distances < radius_sum * 1.15)
-        bond_pairs = [(i[k], j[k]) for k in np.where(bond_mask)[0]]
+        i, j, _ = self.get_bonds(pbc=False)
+        bond_pairs = [(a, b) for a, b in zip(i.tolist(), j.tolist())]
         return bond_pairs
 
     def get_bad_bond_pairs(self, coefficient=0.8):
@@ -565,19 +607,21 @@ class Structure:
         根据键长阈值判断
         返回所有的非物理键长
         """
-        i, j = np.triu_indices(len(self), k=1)
-        distances = self.get_all_distances()
-        upper_distances = distances[i, j]
-        covalent_radii = np.array([table_info[str(n)]["radii"] / 100 for n in self.numbers])
+        if len(self) == 0:
+            return []
+        covalent_radii = self.covalent_radii
+        i, j, distances, _ = self.get_neighbor_pairs(2 * covalent_radii.max() * coefficient)
         radius_sum = covalent_radii[i] + covalent_radii[j]
-        bond_mask = (upper_distances < radius_sum * coefficient)
-
-        bad_bond_pairs = [(i[k], j[k]) for k in np.where(bond_mask)[0]]
+        bond_mask = (distances < radius_sum * coefficient)
+        # 同一对原子可能通过多个周期像成键 只保留一次
+        pairs = np.unique(np.sort(np.column_stack((i[bond_mask], j[bond_mask])), axis=1), axis=0)
+        bad_bond_pairs = [(pair[0], pair[1]) for pair in pairs.tolist()]
         return bad_bond_pairs
 
 def calculate_pairwise_distances(lattice_params:np.ndarray, atom_coords:np.ndarray, fractional=True):
     """
     计算晶体中所有原子对之间的距离，考虑周期性边界条件
+    只考虑相邻的27个周期像 需要(N, N, 27, 3)的内存 大体系请使用neighbor.get_neighbor_pairs
 
     参数:
     lattice_params: 晶格参数，3x3 numpy array 表示晶格向量 (a, b, c)
@@ -613,73 +657,126 @@ def is_organic_cluster(symbols):
 # # 识别结构中的团簇
 
 
-def get_clusters(structure):
-    cutoff = neighborlist.natural_cutoffs(structure)
-    nl = neighborlist.NeighborList(cutoff, self_interaction=False, bothways=True)
-    nl.update(structure)
-    matrix = nl.get_connectivity_matrix()
-    n_components, component_list = connected_components(matrix)
-
-    component_array = np.array(component_list)
-    all_symbols = [atom.symbol for atom in structure]
-
-    clusters = []
-    is_organic_list = []
-    for i in range(n_components):
-        cluster_indices = np.where(component_array == i)[0].tolist()
-        cluster_symbols = [all_symbols[j] for j in cluster_indices]
-        clusters.append(cluster_indices)
-        is_organic_list.append(is_organic_cluster(cluster_symbols))
-
-    return clusters, is_organic_list
-# 解包跨越边界的分子
+def get_cluster_labels(numbers, positions, cell, pbc=True):
+    """
+    按ASE natural_cutoffs的判据把原子分成团簇
+    两原子距离 < r_i + r_j + 2*skin 即相连 (r为ase.data.covalent_radii, skin与ase NeighborList默认值相同)
+    :return: 团簇数, 每个原子的团簇编号 团簇按最小原子序号排序
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    n_atoms = numbers.shape[0]
+    if n_atoms == 0:
+        return 0, np.zeros(0, dtype=np.int64)
+    radii = ase_covalent_radii[numbers] + CLUSTER_SKIN
+    i, j, distances, _ = get_neighbor_pairs(cell, positions, 2 * radii.max(), pbc)
+    bonded = distances < radii[i] + radii[j]
+    i, j = i[bonded], j[bonded]
+    matrix = coo_matrix((np.ones(i.shape[0], dtype=np.int8), (i, j)), shape=(n_atoms, n_atoms))
+    n_components, labels = connected_components(matrix, directed=False)
+    return n_components, labels.astype(np.int64)
 
 
-def unwrap_molecule(structure, cluster_indices):
-    pos = structure.positions[cluster_indices]
-    cell = structure.cell
-    ref_pos = pos[0]
+def _get_cluster_key(structure):
+    sha1 = hashlib.sha1()
+    sha1.update(np.ascontiguousarray(structure.numbers, dtype=np.int64).tobytes())
+    sha1.update(np.ascontiguousarray(structure.positions, dtype=np.float64).tobytes())
+    sha1.update(np.ascontiguousarray(structure.cell, dtype=np.float64).tobytes())
+    sha1.update(np.ascontiguousarray(structure.pbc, dtype=bool).tobytes())
+    return sha1.digest()
 
-    # 所有位置相对 ref_pos 的位移
-    delta = pos - ref_pos
 
-    # 求解最小镜像向量
-    inv_cell = np.linalg.inv(cell.T)  # 提前计算逆矩阵
-    frac_delta = np.dot(delta, inv_cell)
-    frac_delta -= np.round(frac_delta)
-    mic_delta = np.dot(frac_delta, cell.T)
+_cluster_cache = OrderedDict()
 
-    unwrapped_pos = ref_pos + mic_delta
-    return unwrapped_pos
 
+def get_clusters(structure):
+    """
+    识别结构中的团簇
+    :param structure: ase.Atoms
+    :return: 团簇的原子序号列表, 每个团簇是否为有机分子
+    结果按结构内容缓存 同一个结构多次调用(多个卡片)时只计算一次
+    """
+    key = _get_cluster_key(structure)
+    if key in _cluster_cache:
+        _cluster_cache.move_to_end(key)
+        clusters, is_organic_list = _cluster_cache[key]
+        return [list(cluster) for cluster in clusters], list(is_organic_list)
+
+    numbers = np.asarray(structure.numbers, dtype=np.int64)
+    n_components, labels = get_cluster_labels(numbers, structure.positions, structure.cell.array, structure.pbc)
+    # 按团簇编号分组 每个团簇内原子序号升序
+    order = np.argsort(labels, kind="stable")
+    counts = np.bincount(labels, minlength=n_components)
+    clusters = [cluster.tolist() for cluster in np.split(order, np.cumsum(counts)[:-1])] if n_components else []
+
+    # 含C且含H/O/N/S/P的团簇为有机分子
+    has_carbon = np.bincount(labels, weights=numbers == atomic_numbers["C"], minlength=n_components) > 0
+    organic_numbers = [atomic_numbers[symbol] for symbol in ("H", "O", "N", "S", "P")]
+    has_organic = np.bincount(labels, weights=np.isin(numbers, organic_numbers), minlength=n_components) > 0
+    is_organic_list = (has_carbon & has_organic).tolist()
+
+    _cluster_cache[key] = (clusters, is_organic_list)
+    if len(_cluster_cache) > CLUSTER_CACHE_SIZE:
+        _cluster_cache.popitem(last=False)
+    return [list(cluster) for cluster in clusters], list(is_organic_list)
+# 解包跨越边界的分子
 
-# 封装循环部分：处理有机分子团簇
-def process_organic_clusters(structure, new_structure, clusters, is_organic_list):
-    """处理有机分子团簇并更新原子位置"""
 
-    for cluster_indices, is_organic in zip(clusters, is_organic_list):
-        if is_organic:
-            # 解包分子
-            unwrapped_pos = unwrap_molecule(structure, cluster_indices)
+def get_cluster_layout(clusters):
+    """
+    团簇列表转成数组
+    :return: 按团簇依次排列的原子序号, 每个原子的团簇编号, 每个团簇的起始位置
+    """
+    lengths = np.array([len(cluster) for cluster in clusters], dtype=np.int64)
+    indices = np.concatenate([np.asarray(cluster, dtype=np.int64) for cluster in clusters]) if clusters else np.zeros(0, dtype=np.int64)
+    labels = np.repeat(np.arange(len(clusters)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    return indices, labels, starts
 
-            # 计算解包后质心
-            center_unwrapped = np.mean(unwrapped_pos, axis=0)
 
-            # 将质心转换到分数坐标并映射回晶胞内
-            scaled_center = np.dot(center_unwrapped, np.linalg.inv(structure.cell)) % 1.0
-            center_original = np.dot(scaled_center, structure.cell)
+def unwrap_clusters(positions, cell, indices, labels, starts):
+    """
+    一次解包所有团簇 每个原子取相对团簇第一个原子的最小镜像
+    参数见get_cluster_layout
+    :return: 解包后的坐标 与indices顺序相同
+    """
+    cell = np.asarray(cell, dtype=np.float64)
+    pos = np.asarray(positions, dtype=np.float64)[indices]
+    ref_pos = pos[starts][labels]
+    # 分数坐标下的位移取最近的整数周期
+    frac_delta = np.linalg.solve(cell.T, (pos - ref_pos).T).T
+    frac_delta -= np.round(frac_delta)
+    return ref_pos + frac_delta @ cell
 
-            # 计算原子相对于质心的位移
-            delta_pos = unwrapped_pos - center_unwrapped
 
-            # 在新晶胞中计算新质心
-            center_new = np.dot(scaled_center, new_structure.cell)
+def unwrap_molecule(structure, cluster_indices):
+    indices, labels, starts = get_cluster_layout([cluster_indices])
+    return unwrap_clusters(structure.positions, structure.cell, indices, labels, starts)
 
-            # 新位置 = 新质心 + 原始位移
-            pos_new = center_new + delta_pos
 
-            # 更新原子位置
-            new_structure.positions[cluster_indices] = pos_new
+# 封装循环部分：处理有机分子团簇
+def process_organic_clusters(structure, new_structure, clusters, is_organic_list):
+    """
+    处理有机分子团簇并更新原子位置
+    有机分子作为刚体 质心按分数坐标映射到新晶胞 分子内的相对位置不变
+    所有分子一起计算 不逐个循环
+    """
+    organic_clusters = [cluster for cluster, is_organic in zip(clusters, is_organic_list) if is_organic]
+    if organic_clusters:
+        indices, labels, starts = get_cluster_layout(organic_clusters)
+        cell = np.asarray(structure.cell, dtype=np.float64)
+        # 解包分子
+        unwrapped_pos = unwrap_clusters(structure.positions, cell, indices, labels, starts)
+
+        # 计算解包后质心
+        counts = np.diff(np.append(starts, indices.shape[0]))
+        center_unwrapped = np.add.reduceat(unwrapped_pos, starts, axis=0) / counts[:, np.newaxis]
+
+        # 将质心转换到分数坐标并映射回晶胞内 在新晶胞中计算新质心
+        scaled_center = np.linalg.solve(cell.T, center_unwrapped.T).T % 1.0
+        center_new = scaled_center @ np.asarray(new_structure.cell, dtype=np.float64)
+
+        # 新位置 = 新质心 + 原子相对于质心的位移
+        new_structure.positions[indices] = center_new[labels] + (unwrapped_pos - center_unwrapped[labels])
     new_structure.wrap()
 
 
@@ -777,7 +874,7 @@ def load_npy_structure(folders):
 
         return structures
 
-@utils.timeit
+@timeit
 def save_npy_structure(folder, structures):
     """
     保存结构信息到指定的文件夹，根据Config_type将数据组织
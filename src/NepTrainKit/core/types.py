@@ -63,6 +63,9 @@ def mkPen(*args, **kwargs):
 
     return pen
 
+# 没有参考值的子图 不画对角线也不计算rmse
+FREE_AXES_TITLES = ("descriptor", "geometry", "coordination")
+
 class ForcesMode(Enum):
     Raw="Raw"
     Norm="Norm"
@@ -71,6 +74,12 @@ class CanvasMode(Enum):
     vispy="vispy"
     pyqtgraph="pyqtgraph"
 
+class ReducerMode(Enum):
+    pca="pca"
+    umap="umap"
+    tsne="tsne"
+    landmark="landmark"
+
 class Base:
     @classmethod
     def get(cls,name):
@@ -8,8 +8,11 @@ from .label import ProcessLabel
 from .completer import CompleterModel, JoinDelegate, ConfigCompleter
 from .dialog import (
     GetIntMessageBox,
+    MaxErrorMessageBox,
     SparseMessageBox,
     IndexSelectMessageBox,
+    GeometrySelectMessageBox,
+    ErrorStatisticsMessageBox,
     ShiftEnergyMessageBox,
     ProgressDialog,
     PeriodicTableDialog, DFTD3MessageBox,
@@ -34,8 +37,11 @@ __all__ = [
     "JoinDelegate",
     "ConfigCompleter",
     "GetIntMessageBox",
+    "MaxErrorMessageBox",
     "SparseMessageBox",
     "IndexSelectMessageBox",
+    "GeometrySelectMessageBox",
+    "ErrorStatisticsMessageBox",
     "ShiftEnergyMessageBox",
     "ProgressDialog",
     "PeriodicTableDialog",
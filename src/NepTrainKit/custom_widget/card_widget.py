@@ -13,6 +13,7 @@ from qfluentwidgets import FluentIcon as FIF
 
 from NepTrainKit import utils
 from NepTrainKit.core import MessageManager
+from NepTrainKit.core.processing import ProcessorManager
 from NepTrainKit.custom_widget import ProcessLabel
 from ase.io import write as ase_write
 
@@ -168,21 +169,42 @@ class MakeDataCard(MakeDataCardWidget):
             thread=utils.LoadingThread(self,show_tip=True,title="Exporting data")
             thread.start_work(self.write_result_dataset, path)
 
+    @property
+    def processor_class(self):
+        """处理器注册的卡片类名 继承内置卡片时沿MRO查找父类"""
+        return ProcessorManager.get_card_class(type(self))
+
+    @property
+    def has_processor(self):
+        """是否注册了无界面的处理器 有的话在进程池中处理 重写了process_structure的卡片仍然逐个处理"""
+        return (self.processor_class is not None
+                and type(self).process_structure is MakeDataCard.process_structure)
+
+    def get_processor_config(self):
+        """to_dict的结果 class换成注册了处理器的类名"""
+        config = self.to_dict()
+        config["class"] = self.processor_class
+        return config
+
     def process_structure(self, structure) :
         """
         params:
         structure:Atoms
         自定义对每个结构的处理 最后返回一个处理后的结构列表
+        默认使用注册的处理器 自定义卡片可以直接重写
         """
-        raise NotImplementedError
+        return ProcessorManager.create(self.get_processor_config()).process(structure)
 
     def closeEvent(self, event):
 
         if hasattr(self, "worker_thread"):
 
             if self.worker_thread.isRunning():
-
-                self.worker_thread.terminate()
+                if isinstance(self.worker_thread, utils.CardProcessingThread):
+                    # 不等待 线程在当前块结束后自己退出
+                    self.worker_thread.stop()
+                else:
+                    self.worker_thread.terminate()
                 self.runFinishedSignal.emit(self.index)
 
         self.deleteLater()
@@ -191,19 +213,32 @@ class MakeDataCard(MakeDataCardWidget):
     def stop(self):
         if hasattr(self, "worker_thread"):
             if self.worker_thread.isRunning():
-                self.worker_thread.terminate()
-                self.result_dataset = self.worker_thread.result_dataset
-                self.update_dataset_info()
+                if isinstance(self.worker_thread, utils.CardProcessingThread):
+                    # 不阻塞界面 线程结束后在on_processing_stopped中取结果
+                    self.worker_thread.finished.connect(self.on_processing_stopped)
+                    self.worker_thread.stop()
+                    self.status_label.setText("Stopping...")
+                else:
+                    self.worker_thread.terminate()
+                    self.result_dataset = self.worker_thread.result_dataset
+                    self.update_dataset_info()
                 del self.worker_thread
 
     def run(self):
         # 创建并启动线程
 
         if self.check_state:
-            self.worker_thread = utils.DataProcessingThread(
-                self.dataset,
-                self.process_structure
-            )
+            if self.has_processor:
+                # 设置在这里取一次 子进程只拿到配置
+                self.worker_thread = utils.CardProcessingThread(
+                    self.dataset,
+                    self.get_processor_config()
+                )
+            else:
+                self.worker_thread = utils.DataProcessingThread(
+                    self.dataset,
+                    self.process_structure
+                )
             self.status_label.set_colors(["#59745A" ])
 
             # 连接信号
@@ -231,6 +266,14 @@ class MakeDataCard(MakeDataCardWidget):
         self.runFinishedSignal.emit(self.index)
         del self.worker_thread
 
+    def on_processing_stopped(self):
+        """中止的线程结束 已经重新运行时结果属于新的线程 这里不处理"""
+        if hasattr(self, "worker_thread"):
+            return
+        self.result_dataset = self.sender().result_dataset
+        self.update_dataset_info()
+        self.runFinishedSignal.emit(self.index)
+
     def on_processing_error(self, error):
         self.close_button.setEnabled(True)
 
@@ -4,7 +4,7 @@
 # @Author  : 兵
 # @email    : 1747193328@qq.com
 from PySide6.QtGui import QIcon
-from PySide6.QtWidgets import QVBoxLayout, QFrame, QGridLayout, QPushButton, QLineEdit
+from PySide6.QtWidgets import QVBoxLayout, QFrame, QGridLayout, QPushButton, QLineEdit, QTableWidgetItem, QHeaderView
 from PySide6.QtCore import Signal, Qt, QUrl
 from qfluentwidgets import (
     MessageBoxBase,
@@ -16,7 +16,7 @@ from qfluentwidgets import (
     ComboBox,
     FluentStyleSheet,
     FluentTitleBar,
-    TitleLabel, HyperlinkLabel, RadioButton, LineEdit, MessageBox, EditableComboBox
+    TitleLabel, HyperlinkLabel, RadioButton, LineEdit, MessageBox, EditableComboBox, TableWidget
 )
 from qframelesswindow import FramelessDialog
 import json
@@ -40,6 +40,23 @@ class GetIntMessageBox(MessageBoxBase):
 
         self.widget.setMinimumWidth(100 )
         self.intSpinBox.setMaximum(100000000)
+
+class MaxErrorMessageBox(GetIntMessageBox):
+    """查找最大误差结构的弹窗 可以选择结构误差的聚合方式"""
+
+    def __init__(self, parent=None,tip=""):
+        super().__init__(parent,tip)
+        self._frame = QFrame(self)
+        self.frame_layout=QGridLayout(self._frame)
+        self.frame_layout.setContentsMargins(0,0,0,0)
+        self.frame_layout.setSpacing(0)
+        self.modeCombo = ComboBox(self._frame)
+        self.modeCombo.addItems(["max", "mean", "sum", "rmse"])
+        self.modeCombo.setToolTip("How the errors of the atoms/rows of one structure are combined")
+        self.frame_layout.addWidget(CaptionLabel("Aggregation", self),0,0,1,1)
+        self.frame_layout.addWidget(self.modeCombo,0,1,1,2)
+        self.viewLayout.addWidget(self._frame)
+
 class SparseMessageBox(MessageBoxBase):
     """用于最远点取样的弹窗 """
 
@@ -66,6 +83,9 @@ class SparseMessageBox(MessageBoxBase):
         self.frame_layout.addWidget(CaptionLabel("Min distance", self),1,0,1,1)
 
         self.frame_layout.addWidget(self.doubleSpinBox,1,1,1,2)
+        self.approximateCheckBox = CheckBox("Approximate (faster for large datasets)", self)
+        self.approximateCheckBox.setToolTip("Run FPS on one candidate per grid cell in PCA space")
+        self.frame_layout.addWidget(self.approximateCheckBox,2,0,1,3)
 
         self.viewLayout.addWidget(self.titleLabel)
         self.viewLayout.addWidget(self._frame )
@@ -96,6 +116,81 @@ class IndexSelectMessageBox(MessageBoxBase):
         self.widget.setMinimumWidth(200)
 
 
+class GeometrySelectMessageBox(MessageBoxBase):
+    """按几何统计筛选结构的弹窗 勾选的边界才生效"""
+
+    def __init__(self, parent=None, tip="Select structures by geometry", fields=()):
+        super().__init__(parent)
+        self.titleLabel = CaptionLabel(tip, self)
+        self.titleLabel.setWordWrap(True)
+        self._frame = QFrame(self)
+        self.frame_layout = QGridLayout(self._frame)
+        self.frame_layout.setContentsMargins(0, 0, 0, 0)
+        self.frame_layout.setSpacing(2)
+
+        self.fieldCombo = ComboBox(self._frame)
+        self.fieldCombo.addItems(list(fields))
+        self.fieldCombo.setToolTip("Geometry statistic, or the min distance of an element pair")
+        self.minCheckBox = CheckBox("Minimum", self._frame)
+        self.minSpinBox = DoubleSpinBox(self._frame)
+        self.maxCheckBox = CheckBox("Maximum", self._frame)
+        self.maxSpinBox = DoubleSpinBox(self._frame)
+        for spin_box in (self.minSpinBox, self.maxSpinBox):
+            spin_box.setDecimals(4)
+            spin_box.setRange(0, 1e6)
+        self.maxCheckBox.setChecked(True)
+
+        self.frame_layout.addWidget(CaptionLabel("Field", self), 0, 0, 1, 1)
+        self.frame_layout.addWidget(self.fieldCombo, 0, 1, 1, 2)
+        self.frame_layout.addWidget(self.minCheckBox, 1, 0, 1, 1)
+        self.frame_layout.addWidget(self.minSpinBox, 1, 1, 1, 2)
+        self.frame_layout.addWidget(self.maxCheckBox, 2, 0, 1, 1)
+        self.frame_layout.addWidget(self.maxSpinBox, 2, 1, 1, 2)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self._frame)
+        self.yesButton.setText('Ok')
+        self.cancelButton.setText('Cancel')
+        self.widget.setMinimumWidth(250)
+
+
+class ErrorStatisticsMessageBox(MessageBoxBase):
+    """
+    显示每个数据集当前的误差统计 可以按Config_type分组
+    get_rows(by_config_type) 返回表格的每一行 与表头对应的字符串
+    """
+    headers = ["Dataset", "Config_type", "Count", "RMSE", "MAE", "R²"]
+
+    def __init__(self, parent=None, get_rows=None):
+        super().__init__(parent)
+        self.get_rows = get_rows
+        self.titleLabel = CaptionLabel("Errors of the remaining structures", self)
+        self.groupCheckBox = CheckBox("Split by Config_type", self)
+        self.table = TableWidget(self)
+        self.table.setColumnCount(len(self.headers))
+        self.table.setHorizontalHeaderLabels(self.headers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setEditTriggers(TableWidget.EditTrigger.NoEditTriggers)
+        self.groupCheckBox.toggled.connect(self.update_table)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.groupCheckBox)
+        self.viewLayout.addWidget(self.table)
+        self.yesButton.setText('Ok')
+        self.cancelButton.hide()
+        self.widget.setMinimumWidth(600)
+        self.widget.setMinimumHeight(400)
+        self.update_table()
+
+    def update_table(self):
+        rows = self.get_rows(self.groupCheckBox.isChecked()) if self.get_rows else []
+        self.table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+
+
 class ShiftEnergyMessageBox(MessageBoxBase):
     """Dialog for energy baseline shift parameters."""
 
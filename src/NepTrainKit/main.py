@@ -3,6 +3,7 @@
 # @Time    : 2024/10/17 13:03
 # @Author  : 兵
 # @email    : 1747193328@qq.com
+import multiprocessing
 import os
 import sys
 if sys.platform == "darwin":
@@ -150,6 +151,8 @@ def set_light_theme(app):
     # 禁用系统主题（可选，视平台而定）
     app.setStyle("Fusion")  # 使用 Fusion 样式，确保一致性
 def main():
+    # 进程池用spawn启动 打包后的程序需要
+    multiprocessing.freeze_support()
     setTheme(Theme.LIGHT)
 
     sys.excepthook = global_exception_handler
@@ -6,13 +6,13 @@
 import json
 import os.path
 
-import numpy as np
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QAction, QIcon
 from PySide6.QtWidgets import QWidget, QGridLayout, QApplication
 from qfluentwidgets import HyperlinkLabel, BodyLabel, SubtitleLabel
 
 from NepTrainKit.core import MessageManager, CardManager
+from NepTrainKit.core.processing import read_structures
 from NepTrainKit.custom_widget import MakeWorkflowArea
 
 from NepTrainKit.views.cards import   ConsoleWidget
@@ -20,7 +20,6 @@ from NepTrainKit.views.cards import   ConsoleWidget
 
 from NepTrainKit.version import __version__
 from NepTrainKit import utils, get_user_config_path
-from ase.io import read as ase_read
 
 
 
@@ -119,29 +118,7 @@ class MakeDataWidget(QWidget):
 
     def load_base_structure(self,paths):
 
-        structures_list = []
-        for path  in paths:
-            atoms = ase_read(path,":")
-            #ase有时候会将字符串解析成数组或者int  这里转换成str
-            for atom in atoms:
-
-                if 'config_type' in atom.info:
-                    atom.info["Config_type"]=atom.info["config_type"]
-                    del atom.info["config_type"]
-
-
-
-                if isinstance(atom.info.get("Config_type"),np.ndarray):
-                    if atom.info["Config_type"].size==0:
-
-                        atom.info["Config_type"] = ""
-                    else:
-                        atom.info["Config_type"]=" ".join(atom.info["Config_type"])
-
-                else:
-                    atom.info["Config_type"]=str(atom.info.get("Config_type",""))
-                structures_list.append(atom)
-
+        structures_list = read_structures(paths)
         self.dataset=structures_list
         MessageManager.send_success_message(f"success load {len(structures_list)} structures.")
         self.dataset_info_label.setText(f" Success load {len(structures_list)} structures.")
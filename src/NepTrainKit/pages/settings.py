@@ -13,8 +13,9 @@ from qfluentwidgets import SettingCardGroup, HyperlinkCard, PrimaryPushSettingCa
     OptionsValidator, EnumSerializer, SwitchSettingCard
 
 from NepTrainKit.core import Config
+from NepTrainKit.core.io.descriptor_store import set_descriptor_store_size
 from NepTrainKit.custom_widget import MyComboBoxSettingCard, DoubleSpinBoxSettingCard
-from NepTrainKit.core.types import ForcesMode, CanvasMode
+from NepTrainKit.core.types import ForcesMode, CanvasMode, ReducerMode
 from NepTrainKit.core.update import UpdateWoker,UpdateNEP89Woker
 from NepTrainKit.version import HELP_URL, FEEDBACK_URL, __version__, YEAR, AUTHOR
 
@@ -62,12 +63,27 @@ class SettingsWidget(ScrollArea):
         )
 
 
+        reducer_type = Config.get("widget","descriptor_reducer","pca")
+        self.reducer_card = MyComboBoxSettingCard(
+            OptionsConfigItem("reducer","reducer",ReducerMode(reducer_type),OptionsValidator(ReducerMode), EnumSerializer(ReducerMode)),
+            FIF.BRUSH,
+            'Descriptor projection',
+            "Non-PCA methods run in the background; umap and tsne need umap-learn/scikit-learn",
+            texts=[
+                "pca","umap","tsne","landmark"
+            ],
+            default=reducer_type,
+            parent=self.personal_group
+        )
+
         auto_load_config = Config.getboolean("widget","auto_load",False)
 
         sort_atoms_config = Config.getboolean("widget", "sort_atoms", False)
 
         use_group_menu_config = Config.getboolean("widget", "use_group_menu", False)
 
+        geometry_panes_config = Config.getboolean("widget", "geometry_panes", False)
+
         self.auto_load_card = SwitchSettingCard(
             QIcon(":/images/src/images/auto_load.svg"),
             self.tr('Auto loading'),
@@ -92,6 +108,14 @@ class SettingsWidget(ScrollArea):
             parent=self.personal_group
         )
         self.use_group_menu_card.setValue(use_group_menu_config)
+
+        self.geometry_panes_card = SwitchSettingCard(
+            QIcon(":/images/src/images/defect.svg"),
+            'Geometry panes',
+            'Plot min distance, volume, density and coordination of each structure when loading',
+            parent=self.personal_group
+        )
+        self.geometry_panes_card.setValue(geometry_panes_config)
         radius_coefficient_config=Config.getfloat("widget","radius_coefficient",0.7)
 
         self.radius_coefficient_Card = DoubleSpinBoxSettingCard(
@@ -103,6 +127,16 @@ class SettingsWidget(ScrollArea):
         )
         self.radius_coefficient_Card.setValue(radius_coefficient_config)
         self.radius_coefficient_Card.setRange(0.0, 1.5)
+        descriptor_cache_size_config=Config.getfloat("widget","descriptor_cache_size",2.0)
+        set_descriptor_store_size(descriptor_cache_size_config)
+        self.descriptor_cache_size_card = DoubleSpinBoxSettingCard(
+            FIF.SAVE,
+            'Descriptor cache size (GB)',
+            'Descriptors of computed structures are reused until the cache exceeds this size',
+            self.personal_group
+        )
+        self.descriptor_cache_size_card.setRange(0.0, 1024.0)
+        self.descriptor_cache_size_card.setValue(descriptor_cache_size_config)
 
         self.about_group = SettingCardGroup("About", self.scrollWidget)
         self.help_card = HyperlinkCard(
@@ -149,10 +183,13 @@ class SettingsWidget(ScrollArea):
 
         self.personal_group.addSettingCard(self.optimization_forces_card)
         self.personal_group.addSettingCard(self.canvas_card)
+        self.personal_group.addSettingCard(self.reducer_card)
         self.personal_group.addSettingCard(self.auto_load_card)
         self.personal_group.addSettingCard(self.radius_coefficient_Card)
+        self.personal_group.addSettingCard(self.descriptor_cache_size_card)
         self.personal_group.addSettingCard(self.sort_atoms_card)
         self.personal_group.addSettingCard(self.use_group_menu_card)
+        self.personal_group.addSettingCard(self.geometry_panes_card)
 
         self.about_group.addSettingCard(self.about_nep89_card)
         self.about_group.addSettingCard(self.help_card)
@@ -163,9 +200,15 @@ class SettingsWidget(ScrollArea):
         self.expand_layout.addWidget(self.personal_group)
         self.expand_layout.addWidget(self.about_group)
 
+    def set_descriptor_cache_size(self, value):
+        Config.set("widget","descriptor_cache_size",value)
+        set_descriptor_store_size(value)
+
     def init_signal(self):
         self.canvas_card.optionChanged.connect(lambda option:Config.set("widget","canvas_type",option ))
+        self.reducer_card.optionChanged.connect(lambda option:Config.set("widget","descriptor_reducer",option ))
         self.radius_coefficient_Card.valueChanged.connect(lambda value:Config.set("widget","radius_coefficient",value))
+        self.descriptor_cache_size_card.valueChanged.connect(self.set_descriptor_cache_size)
         self.optimization_forces_card.optionChanged.connect(lambda option:Config.set("widget","forces_data",option ))
         self.about_card.clicked.connect(self.check_update)
         self.about_nep89_card.clicked.connect(self.check_update_nep89)
@@ -173,6 +216,7 @@ class SettingsWidget(ScrollArea):
         self.auto_load_card.checkedChanged.connect(lambda state:Config.set("widget","auto_load",state))
         self.sort_atoms_card.checkedChanged.connect(lambda state:Config.set("widget","sort_atoms",state))
         self.use_group_menu_card.checkedChanged.connect(lambda state:Config.set("widget","use_group_menu",state))
+        self.geometry_panes_card.checkedChanged.connect(lambda state:Config.set("widget","geometry_panes",state))
         # self.about_card.clicked.connect(lambda: QDesktopServices.openUrl(QUrl(RELEASES_URL)))
         self.feedback_card.clicked.connect(
             lambda: QDesktopServices.openUrl(QUrl(FEEDBACK_URL)))
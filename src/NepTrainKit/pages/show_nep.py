@@ -335,7 +335,7 @@ class ShowNepWidget(QWidget):
         current_index = self.struct_index_spinbox.value()
         if self.nep_result_data.select_index:
 
-            sort_index = np.sort(np.array(list(self.nep_result_data.select_index)) )
+            sort_index = self.nep_result_data.select_index.indices
         else:
             sort_index = np.sort(self.nep_result_data.structure.group_array.now_data, axis=0)
         index = np.searchsorted(sort_index, current_index, side='left')
@@ -348,7 +348,7 @@ class ShowNepWidget(QWidget):
             return None
         current_index=self.struct_index_spinbox.value()
         if self.nep_result_data.select_index:
-            sort_index = np.sort(np.array(list(self.nep_result_data.select_index)) )
+            sort_index = self.nep_result_data.select_index.indices
 
         else:
             sort_index = np.sort(self.nep_result_data.structure.group_array.now_data, axis=0)
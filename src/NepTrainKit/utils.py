@@ -17,25 +17,12 @@ from loguru import logger
 from qfluentwidgets import StateToolTip
 
 from NepTrainKit.core import Config
+from NepTrainKit.core.processing import iter_processed_structures
 from ase.build.tools import sort as ase_sort
+from NepTrainKit import timeit
 from NepTrainKit.version import UPDATE_EXE, UPDATE_FILE, NepTrainKit_EXE
 
 
-def timeit(func):
-    """
-    统计函数耗时
-    使用用法：
-        @timeit
-        def demo():
-            pass
-    """
-    def wrapper(*args, **kwargs):
-        start_time = time.time()  # 记录开始时间
-        result = func(*args, **kwargs)  # 调用原始函数
-        end_time = time.time()  # 记录结束时间
-        logger.debug(f"Function '{func.__name__}' executed in {end_time - start_time:.4f} seconds")
-        return result
-    return wrapper
 
 def check_path_type(path:str) -> str:
     """
@@ -188,6 +175,54 @@ class DataProcessingThread(QThread):
             self.errorSignal.emit(str(e))
 
 
+class CardProcessingThread(QThread):
+    """
+    用卡片的无界面处理器并行处理结构 与DataProcessingThread的信号相同
+    卡片的设置在主线程中用to_dict取出 子进程中不接触任何控件
+    """
+    progressSignal = Signal(int)  # 进度更新信号
+    finishSignal = Signal()  # 处理完成信号
+    errorSignal = Signal(str)  # 错误信号
+    # 已经请求中止但还在计算当前块的线程 卡片不再引用它们 在这里保持引用直到线程结束
+    _stopping = set()
+
+    def __init__(self, dataset, config):
+        super().__init__()
+        self.dataset = dataset
+        self.config = config
+        self.result_dataset = []
+        self.sort_atoms = Config.getboolean("widget", "sort_atoms", False)
+
+    def run(self):
+        """线程主逻辑"""
+        try:
+            total = len(self.dataset)
+            self.progressSignal.emit(0)
+            for rows, processed in iter_processed_structures(self.dataset, self.config, self.sort_atoms):
+                self.result_dataset.extend(processed)
+                self.progressSignal.emit(int(rows.stop / total * 100))
+                if self.isInterruptionRequested():
+                    # 中止时卡片从finished中取结果 不发完成信号
+                    return
+            self.finishSignal.emit()
+        except Exception as e:
+            logger.debug(traceback.format_exc())
+            self.errorSignal.emit(str(e))
+
+    def stop(self):
+        """
+        请求中止后立即返回 不阻塞界面
+        正在计算的块结束后线程退出并发出finished 未开始的块会被取消
+        """
+        if self.isRunning():
+            CardProcessingThread._stopping.add(self)
+            self.finished.connect(self._release)
+        self.requestInterruption()
+
+    def _release(self):
+        CardProcessingThread._stopping.discard(self)
+
+
 class FilterProcessingThread(QThread):
     # 定义信号用于通信
     progressSignal = Signal(int)  # 进度更新信号
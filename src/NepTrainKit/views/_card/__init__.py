@@ -11,6 +11,7 @@ from .vacancy_defect_card import VacancyDefectCard
 from .stacking_fault_card import StackingFaultCard
 
 from .fps_filter_card import FilterDataCard
+from .novelty_filter_card import NoveltyFilterDataCard
 from .card_group import CardGroup
 
 
@@ -28,6 +29,7 @@ __all__ = [
     "StackingFaultCard",
 
     "FilterDataCard",
+    "NoveltyFilterDataCard",
     "CardGroup"
 
 ]
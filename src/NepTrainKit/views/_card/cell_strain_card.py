@@ -3,14 +3,12 @@
 # @Time    : 2025/6/18 13:21
 # @Author  : 兵
 # @email    : 1747193328@qq.com
-from itertools import combinations
 
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
 from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, EditableComboBox
 
 from NepTrainKit import utils
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
 @CardManager.register_card
@@ -87,66 +85,6 @@ class CellStrainCard(MakeDataCard):
         self.settingLayout.addWidget(self.strain_z_label, 4, 0, 1, 1)
         self.settingLayout.addWidget(self.strain_z_frame, 4, 1, 1,1)
 
-    def process_structure(self, structure):
-        structure_list=[]
-        axes=self.engine_type_combo.currentText()
-        x=self.strain_x_frame.get_input_value()
-        y=self.strain_y_frame.get_input_value()
-        z=self.strain_z_frame.get_input_value()
-        identify_organic=self.organic_checkbox.isChecked()
-
-
-        if identify_organic:
-            clusters, is_organic_list = get_clusters(structure)
-        strain_range=[
-            np.arange(start=x[0],stop=x[1]+0.001,step=x[2]),
-            np.arange(start=y[0], stop=y[1]+0.001, step=y[2]),
-            np.arange(start=z[0], stop=z[1]+0.001, step=z[2]),
-        ]
-        cell = structure.get_cell()
-        # Define possible axes (0: x, 1: y, 2: z)
-        all_axes = [0, 1, 2]
-
-
-        if axes == 'isotropic':
-            for strain in strain_range[0]:
-                new_structure = structure.copy()
-                new_cell = cell.copy() * (1 + strain / 100)
-                new_structure.set_cell(new_cell, scale_atoms=True)
-                if identify_organic:
-                    process_organic_clusters(structure, new_structure, clusters, is_organic_list )
-
-                strain_info = [f"all:{strain}%"]
-                new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Strain({'|'.join(strain_info)})"
-                structure_list.append(new_structure)
-        else:
-            if axes == 'uniaxial':
-                axes_combinations = [[i] for i in all_axes]
-            elif axes == 'biaxial':
-                axes_combinations = list(combinations(all_axes, 2))
-            elif axes == 'triaxial':
-                axes_combinations = [all_axes]
-            else:
-                axes_combinations = [["XYZ".index(i.upper()) for i in axes if i.upper() in "XYZ"]]
-            for ax_comb in axes_combinations:
-                if len(ax_comb) == 0:
-                    continue
-                strain_combinations = (np.array(np.meshgrid(*[strain_range[_] for _ in ax_comb])).T.reshape(-1, len(ax_comb)))
-                for strain_vals in strain_combinations:
-                    new_structure = structure.copy()
-                    new_cell = cell.copy()
-                    for ax_idx, strain in zip(ax_comb, strain_vals):
-                        new_cell[ax_idx] *= (1 + strain / 100)
-                    new_structure.set_cell(new_cell, scale_atoms=True)
-                    if identify_organic:
-                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
-
-                    strain_info = ["XYZ"[ax] + ":" + str(s) + "%" for ax, s in zip(ax_comb, strain_vals)]
-                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Strain({'|'.join(strain_info)})"
-                    structure_list.append(new_structure)
-
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
         data_dict['organic'] = self.organic_checkbox.isChecked()
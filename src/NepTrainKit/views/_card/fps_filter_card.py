@@ -4,19 +4,15 @@
 # @Author  : 兵
 # @email    : 1747193328@qq.com
 import os
-from itertools import combinations
 
-import numpy as np
-from PySide6.QtWidgets import QFrame, QGridLayout
-from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, EditableComboBox, LineEdit
+from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, LineEdit
 
 from NepTrainKit import module_path, utils
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters, MessageManager
+from NepTrainKit.core import CardManager, MessageManager
 from NepTrainKit.core.calculator import NEPProcess
-from NepTrainKit.core.io.select import farthest_point_sampling
+from NepTrainKit.core.processing import ProcessorManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
-from NepTrainKit.custom_widget.card_widget import MakeDataCard, FilterDataCard
-
+from NepTrainKit.custom_widget.card_widget import FilterDataCard
 
 @CardManager.register_card
 
@@ -70,16 +66,37 @@ class FPSFilterDataCard(FilterDataCard):
         self.settingLayout.addWidget(self.nep_path_label, 2, 0, 1, 1)
         self.settingLayout.addWidget(self.nep_path_lineedit, 2, 1, 1, 2)
 
+        self.approximate_label = BodyLabel("Optional", self.setting_widget)
+        self.approximate_checkbox = CheckBox("Approximate", self.setting_widget)
+        self.approximate_checkbox.setChecked(False)
+        self.approximate_label.setToolTip("Two-stage FPS on grid candidates in PCA space. "
+                                          "Much faster for very large pools, slightly less uniform")
+        self.approximate_label.installEventFilter(ToolTipFilter(self.approximate_label, 300, ToolTipPosition.TOP))
+        self.settingLayout.addWidget(self.approximate_label, 3, 0, 1, 1)
+        self.settingLayout.addWidget(self.approximate_checkbox, 3, 1, 1, 2)
+
+        self.level_label = BodyLabel("Sampling level", self.setting_widget)
+        self.level_combo = ComboBox(self.setting_widget)
+        self.level_combo.addItem("Structure")
+        self.level_combo.addItem("Atomic environment")
+        self.level_combo.setCurrentIndex(0)
+        self.level_label.setToolTip("Structure: FPS on atom-averaged descriptors\n"
+                                    "Atomic environment: FPS on per-atom descriptors, "
+                                    "keeps structures containing rare local environments")
+        self.level_label.installEventFilter(ToolTipFilter(self.level_label, 300, ToolTipPosition.TOP))
+        self.settingLayout.addWidget(self.level_label, 4, 0, 1, 1)
+        self.settingLayout.addWidget(self.level_combo, 4, 1, 1, 2)
+
     def process_structure(self,*args, **kwargs ):
-        nep_path=self.nep_path_lineedit.text()
-        n_samples=self.num_condition_frame.get_input_value()[0]
-        distance=self.min_distance_condition_frame.get_input_value()[0]
-        self.nep_thread = NEPProcess()
-        self.nep_thread.run_nep3_calculator_process(nep_path, self.dataset, "descriptor",wait=True)
-        desc_array=self.nep_thread.func_result
-        remaining_indices = farthest_point_sampling(desc_array, n_samples=n_samples, min_dist=distance)
+        processor = ProcessorManager.create(self.to_dict())
+        processor.calculate = self.calculate_descriptor
+        progress = self.worker_thread.progressSignal.emit if hasattr(self, "worker_thread") else None
+        self.result_dataset = processor.filter(self.dataset, progress)
 
-        self.result_dataset = [self.dataset[i] for i in remaining_indices]
+    def calculate_descriptor(self, nep_path, structures, calculator_type):
+        self.nep_thread = NEPProcess()
+        self.nep_thread.run_nep3_calculator_process(nep_path, structures, calculator_type, wait=True)
+        return self.nep_thread.func_result
 
     def stop(self):
         super().stop()
@@ -124,6 +141,8 @@ class FPSFilterDataCard(FilterDataCard):
         data_dict['nep_path']=self.nep_path_lineedit.text()
         data_dict['num_condition'] = self.num_condition_frame.get_input_value()
         data_dict['min_distance_condition'] = self.min_distance_condition_frame.get_input_value()
+        data_dict['approximate'] = self.approximate_checkbox.isChecked()
+        data_dict['level'] = self.level_combo.currentIndex()
         return data_dict
 
     def from_dict(self, data_dict):
@@ -136,6 +155,8 @@ class FPSFilterDataCard(FilterDataCard):
                 self.nep_path_lineedit.setText(self.nep89_path )
             self.num_condition_frame.set_input_value(data_dict['num_condition'])
             self.min_distance_condition_frame.set_input_value(data_dict['min_distance_condition'])
+            self.approximate_checkbox.setChecked(data_dict.get('approximate', False))
+            self.level_combo.setCurrentIndex(data_dict.get('level', 0))
         except:
             pass
 
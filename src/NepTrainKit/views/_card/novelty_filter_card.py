@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+from qfluentwidgets import BodyLabel, ToolTipFilter, ToolTipPosition, LineEdit
+
+from NepTrainKit import module_path, utils
+from NepTrainKit.core import CardManager, MessageManager
+from NepTrainKit.core.calculator import NEPProcess
+from NepTrainKit.core.processing import ProcessorManager
+from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
+from NepTrainKit.custom_widget.card_widget import FilterDataCard
+
+
+@CardManager.register_card
+class NoveltyFilterDataCard(FilterDataCard):
+    card_name= "Novelty Filter"
+    menu_icon=r":/images/src/images/search.svg"
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setTitle("Filter by Novelty")
+        self.init_ui()
+
+    def init_ui(self):
+        self.setObjectName("novelty_filter_card_widget")
+        self.nep_path_label = BodyLabel("NEP file path: ", self.setting_widget)
+        self.nep_path_lineedit = LineEdit(self.setting_widget)
+        self.nep_path_lineedit.setPlaceholderText("nep.txt path")
+        self.nep_path_label.setToolTip("Path to NEP model")
+        self.nep_path_label.installEventFilter(ToolTipFilter(self.nep_path_label, 300, ToolTipPosition.TOP))
+        self.nep89_path = os.path.join(module_path, "Config","nep89.txt")
+        self.nep_path_lineedit.setText(self.nep89_path )
+
+        self.train_path_label = BodyLabel("Training set: ", self.setting_widget)
+        self.train_path_lineedit = LineEdit(self.setting_widget)
+        self.train_path_lineedit.setPlaceholderText("train.xyz path")
+        self.train_path_label.setToolTip("Structures already in the training set")
+        self.train_path_label.installEventFilter(ToolTipFilter(self.train_path_label, 300, ToolTipPosition.TOP))
+
+        self.num_label = BodyLabel("Max selected", self.setting_widget)
+        self.num_condition_frame = SpinBoxUnitInputFrame(self)
+        self.num_condition_frame.set_input("unit", 1, "int")
+        self.num_condition_frame.setRange(1, 100000)
+        self.num_condition_frame.set_input_value([100])
+        self.num_label.setToolTip("Number of the most novel structures to keep")
+        self.num_label.installEventFilter(ToolTipFilter(self.num_label, 300, ToolTipPosition.TOP))
+
+        self.min_distance_label = BodyLabel("Min novelty", self.setting_widget)
+        self.min_distance_condition_frame = SpinBoxUnitInputFrame(self)
+        self.min_distance_condition_frame.set_input("", 1,"float")
+        self.min_distance_condition_frame.setRange(0, 100)
+        self.min_distance_condition_frame.object_list[0].setDecimals(4)
+        self.min_distance_condition_frame.set_input_value([0.01])
+        self.min_distance_label.setToolTip("Minimum descriptor distance to the nearest training structure")
+        self.min_distance_label.installEventFilter(ToolTipFilter(self.min_distance_label, 300, ToolTipPosition.TOP))
+
+        self.settingLayout.addWidget(self.num_label, 0, 0, 1, 1)
+        self.settingLayout.addWidget(self.num_condition_frame, 0, 1, 1, 2)
+        self.settingLayout.addWidget(self.min_distance_label, 1, 0, 1, 1)
+        self.settingLayout.addWidget(self.min_distance_condition_frame, 1, 1, 1, 2)
+        self.settingLayout.addWidget(self.train_path_label, 2, 0, 1, 1)
+        self.settingLayout.addWidget(self.train_path_lineedit, 2, 1, 1, 2)
+        self.settingLayout.addWidget(self.nep_path_label, 3, 0, 1, 1)
+        self.settingLayout.addWidget(self.nep_path_lineedit, 3, 1, 1, 2)
+
+    def calculate_descriptor(self, nep_path, structures, calculator_type="descriptor"):
+        self.nep_thread = NEPProcess()
+        self.nep_thread.run_nep3_calculator_process(nep_path, structures, calculator_type, wait=True)
+        return self.nep_thread.func_result
+
+    def process_structure(self,*args, **kwargs ):
+        processor = ProcessorManager.create(self.to_dict())
+        processor.calculate = self.calculate_descriptor
+        self.result_dataset = processor.filter(self.dataset)
+
+    def stop(self):
+        super().stop()
+        if hasattr(self, "nep_thread"):
+            self.nep_thread.stop()
+            del self.nep_thread
+
+    def run(self):
+        nep_path=self.nep_path_lineedit.text()
+        if not os.path.exists(nep_path):
+            MessageManager.send_warning_message(  "NEP file not exists!")
+            self.runFinishedSignal.emit(self.index)
+            return
+        if not os.path.exists(self.train_path_lineedit.text()):
+            MessageManager.send_warning_message(  "Training set file not exists!")
+            self.runFinishedSignal.emit(self.index)
+            return
+        if self.check_state:
+            self.worker_thread = utils.FilterProcessingThread(
+                self.process_structure
+            )
+            self.status_label.set_colors(["#59745A"])
+            self.worker_thread.progressSignal.connect(self.update_progress)
+            self.worker_thread.finishSignal.connect(self.on_processing_finished)
+            self.worker_thread.errorSignal.connect(self.on_processing_error)
+            self.worker_thread.start()
+        else:
+            self.result_dataset = self.dataset
+            self.update_dataset_info()
+            self.runFinishedSignal.emit(self.index)
+
+    def update_progress(self, progress):
+        self.status_label.setText(f"generate descriptors ...")
+        self.status_label.set_progress(progress)
+
+    def to_dict(self):
+        data_dict = super().to_dict()
+        data_dict['nep_path']=self.nep_path_lineedit.text()
+        data_dict['train_path']=self.train_path_lineedit.text()
+        data_dict['num_condition'] = self.num_condition_frame.get_input_value()
+        data_dict['min_distance_condition'] = self.min_distance_condition_frame.get_input_value()
+        return data_dict
+
+    def from_dict(self, data_dict):
+        try:
+            super().from_dict(data_dict)
+            if os.path.exists(data_dict['nep_path']):
+                self.nep_path_lineedit.setText(data_dict['nep_path'])
+            else:
+                self.nep_path_lineedit.setText(self.nep89_path )
+            self.train_path_lineedit.setText(data_dict.get('train_path', ""))
+            self.num_condition_frame.set_input_value(data_dict['num_condition'])
+            self.min_distance_condition_frame.set_input_value(data_dict['min_distance_condition'])
+        except:
+            pass
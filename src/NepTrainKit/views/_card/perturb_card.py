@@ -3,17 +3,14 @@
 # @Time    : 2025/6/18 13:21
 # @Author  : 兵
 # @email    : 1747193328@qq.com
-from itertools import combinations
 
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
 from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, EditableComboBox
 
 from NepTrainKit import utils
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
-from scipy.stats.qmc import Sobol
 
 @CardManager.register_card
 class PerturbCard(MakeDataCard):
@@ -85,60 +82,6 @@ class PerturbCard(MakeDataCard):
 
 
 
-    def process_structure(self, structure):
-        structure_list = []
-        engine_type = self.engine_type_combo.currentIndex()
-        max_scaling = self.scaling_condition_frame.get_input_value()[0]
-        max_num = self.num_condition_frame.get_input_value()[0]
-        identify_organic = self.organic_checkbox.isChecked()
-
-        n_atoms = len(structure)
-        dim = n_atoms * 3
-
-        # 生成扰动因子
-        if engine_type == 0:
-            sobol_engine = Sobol(d=dim, scramble=True)
-            perturbation_factors = (sobol_engine.random(max_num) - 0.5) * 2
-        else:
-            perturbation_factors = np.random.uniform(-1, 1, (max_num, dim))
-
-        # 识别团簇（如启用）
-        if identify_organic:
-            clusters, is_organic_list = get_clusters(structure)
-            # 预先构建聚类索引（避免每次遍历）
-            organic_clusters = [cluster for cluster, is_org in zip(clusters, is_organic_list) if is_org]
-            inorganic_clusters = [cluster for cluster, is_org in zip(clusters, is_organic_list) if not is_org]
-
-        orig_positions = structure.positions
-
-        for i in range(max_num):
-            delta = perturbation_factors[i].reshape(n_atoms, 3) * max_scaling
-            new_positions = orig_positions + delta  # 默认：全部扰动
-
-            if identify_organic:
-                # 初始化为原始坐标，随后分组替换
-                new_positions = orig_positions.copy()
-
-                # 有机分子：整体平移
-
-                for cluster in organic_clusters:
-                    cluster_delta = delta[cluster[0]]
-                    new_positions[cluster] += cluster_delta  # 利用 NumPy 索引批量加
-
-                # 无机分子：逐原子扰动（其实和默认行为相同，略冗余，但保留逻辑清晰）
-                for cluster in inorganic_clusters:
-                    new_positions[cluster] += delta[cluster]
-
-            # 构造新结构
-            new_structure = structure.copy()
-            new_structure.set_positions(new_positions)
-            new_structure.wrap()
-            config_str = f" Perturb(distance={max_scaling}, {'uniform' if engine_type == 1 else 'Sobol'})"
-            new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + config_str
-            structure_list.append(new_structure)
-
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
 
@@ -3,18 +3,12 @@
 # @Time    : 2025/6/18 13:21
 # @Author  : 兵
 # @email    : 1747193328@qq.com
-from itertools import combinations
-
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
-from ase.build import surface
-from loguru import logger
 from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, EditableComboBox
 
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
-from scipy.stats.qmc import Sobol
 
 @CardManager.register_card
 class RandomSlabCard(MakeDataCard):
@@ -85,40 +79,6 @@ class RandomSlabCard(MakeDataCard):
         self.settingLayout.addWidget(self.vacuum_label, 4, 0, 1, 1)
         self.settingLayout.addWidget(self.vacuum_frame, 4, 1, 1, 2)
 
-    def process_structure(self, structure):
-        structure_list = []
-
-        h_min, h_max, h_step = self.h_frame.get_input_value()
-        k_min, k_max, k_step = self.k_frame.get_input_value()
-        l_min, l_max, l_step = self.l_frame.get_input_value()
-
-        layer_min, layer_max, layer_step = self.layer_frame.get_input_value()
-        vac_min, vac_max, vac_step = self.vacuum_frame.get_input_value()
-
-        h_range = np.arange(h_min, h_max + 1, h_step)
-        k_range = np.arange(k_min, k_max + 1, k_step)
-        l_range = np.arange(l_min, l_max + 1, l_step)
-        layer_range = np.arange(layer_min, layer_max + 1, layer_step)
-        vac_range = np.arange(vac_min, vac_max + vac_step, vac_step)
-
-        for h in h_range:
-            for k in k_range:
-                for l in l_range:
-                    if h == 0 and k == 0 and l == 0:
-                        continue
-                    for layers in layer_range:
-                        for vac in vac_range:
-                            try:
-                                if vac==0:
-                                    vac=None
-                                slab = surface(structure, (int(h), int(k), int(l)), int(layers), vacuum=vac,periodic=True)
-                                slab.wrap()
-                                slab.info["Config_type"] = slab.info.get("Config_type", "") + f" Slab(hkl={int(h)}{int(k)}{int(l)},layers={int(layers)},vacuum={vac})"
-                                structure_list.append(slab)
-                            except Exception as e:
-                                logger.error(f"Failed to build slab {(h, k, l)}: {e}")
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
         data_dict['h_range'] = self.h_frame.get_input_value()
@@ -4,16 +4,13 @@
 # @Author  : 兵
 # @email    : 1747193328@qq.com
 import json
-from itertools import combinations
 
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
 from qfluentwidgets import BodyLabel, ComboBox, ToolTipFilter, ToolTipPosition, CheckBox, EditableComboBox
 
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame, VacancyRulesWidget
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
-from scipy.stats.qmc import Sobol
 
 @CardManager.register_card
 class RandomVacancyCard(MakeDataCard):
@@ -47,49 +44,6 @@ class RandomVacancyCard(MakeDataCard):
         self.settingLayout.addWidget(self.max_atoms_label, 1, 0, 1, 1)
         self.settingLayout.addWidget(self.max_atoms_condition_frame, 1, 1, 1, 2)
 
-    def process_structure(self, structure):
-        structure_list = []
-
-        rules = self.rules_widget.to_rules()
-        if not isinstance(rules, list) or not rules:
-            return [structure]
-
-        max_num = self.max_atoms_condition_frame.get_input_value()[0]
-        for _ in range(max_num):
-            new_structure = structure.copy()
-            total_remove = 0
-            for rule in rules:
-                element = rule.get("element")
-                count_min, count_max = rule.get("count", [0, 0])
-                if not element or int(count_max) <= 0:
-                    continue
-
-                groups = rule.get("group")
-                if groups and "group" in new_structure.arrays:
-                    candidate_indices = [i for i, elem, g in zip(range(len(new_structure)), new_structure, new_structure.arrays["group"]) if elem.symbol == element and g in groups]
-                else:
-                    candidate_indices = [i for i, a in enumerate(new_structure) if a.symbol == element]
-
-                if not candidate_indices:
-                    continue
-
-                remove_num = np.random.randint(int(count_min), int(count_max) + 1)
-                remove_num = min(remove_num, len(candidate_indices))
-                if remove_num <= 0:
-                    continue
-
-                idxs = np.random.choice(candidate_indices, remove_num, replace=False)
-                for idx in sorted(idxs, reverse=True):
-                    del new_structure[idx]
-                total_remove += remove_num
-
-            if total_remove:
-                new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Vacancy(num={total_remove})"
-
-            structure_list.append(new_structure)
-
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
 
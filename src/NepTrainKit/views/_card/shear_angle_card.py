@@ -1,11 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
 from qfluentwidgets import BodyLabel, ToolTipFilter, ToolTipPosition, CheckBox
-from ase.geometry import cell_to_cellpar, cellpar_to_cell
 
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
 
@@ -67,46 +65,6 @@ class ShearAngleCard(MakeDataCard):
         self.settingLayout.addWidget(self.gamma_label, 3, 0, 1, 1)
         self.settingLayout.addWidget(self.gamma_frame, 3, 1, 1, 2)
 
-    def process_structure(self, structure):
-        structure_list = []
-        alpha = self.alpha_frame.get_input_value()
-        beta = self.beta_frame.get_input_value()
-        gamma = self.gamma_frame.get_input_value()
-        identify_organic = self.organic_checkbox.isChecked()
-
-        if identify_organic:
-            clusters, is_organic_list = get_clusters(structure)
-
-        alpha_range = np.arange(alpha[0], alpha[1] + 0.001, alpha[2])
-        beta_range = np.arange(beta[0], beta[1] + 0.001, beta[2])
-        gamma_range = np.arange(gamma[0], gamma[1] + 0.001, gamma[2])
-        cell = structure.get_cell()
-        cellpar = cell_to_cellpar(cell)  # [a,b,c,alpha,beta,gamma] in degrees
-        lengths = cellpar[:3]
-        angles0 = cellpar[3:]
-
-        for da in alpha_range:
-            for db in beta_range:
-                for dg in gamma_range:
-                    new_structure = structure.copy()
-                    new_angles = angles0 + np.array([da, db, dg])
-                    new_cellpar = [*lengths, *new_angles]
-                    new_lattice = cellpar_to_cell(new_cellpar)
-                    new_structure.set_cell(new_lattice, scale_atoms=True)
-                    if identify_organic:
-                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
-                    info_list = []
-                    if abs(da) > 1e-8:
-                        info_list.append(f"alpha:{da}°")
-                    if abs(db) > 1e-8:
-                        info_list.append(f"beta:{db}°")
-                    if abs(dg) > 1e-8:
-                        info_list.append(f"gamma:{dg}°")
-                    info_str = "|".join(info_list)
-                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" ShearAngle({info_str})"
-                    structure_list.append(new_structure)
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
         data_dict["organic"] = self.organic_checkbox.isChecked()
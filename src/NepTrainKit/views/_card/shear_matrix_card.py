@@ -1,10 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import numpy as np
 from PySide6.QtWidgets import QFrame, QGridLayout
 from qfluentwidgets import BodyLabel, ToolTipFilter, ToolTipPosition, CheckBox
 
-from NepTrainKit.core import CardManager, process_organic_clusters, get_clusters
+from NepTrainKit.core import CardManager
 from NepTrainKit.custom_widget import SpinBoxUnitInputFrame
 from NepTrainKit.custom_widget.card_widget import MakeDataCard
 
@@ -71,51 +70,6 @@ class ShearMatrixCard(MakeDataCard):
         self.settingLayout.addWidget(self.xz_label, 3, 0, 1, 1)
         self.settingLayout.addWidget(self.xz_frame, 3, 1, 1, 2)
 
-    def process_structure(self, structure):
-        structure_list = []
-        xy = self.xy_frame.get_input_value()
-        yz = self.yz_frame.get_input_value()
-        xz = self.xz_frame.get_input_value()
-        identify_organic = self.organic_checkbox.isChecked()
-
-        if identify_organic:
-            clusters, is_organic_list = get_clusters(structure)
-
-        xy_range = np.arange(xy[0], xy[1] + 0.001, xy[2])
-        yz_range = np.arange(yz[0], yz[1] + 0.001, yz[2])
-        xz_range = np.arange(xz[0], xz[1] + 0.001, xz[2])
-        cell = structure.get_cell()
-        symmetric = self.symmetric_checkbox.isChecked()
-
-        for sxy in xy_range:
-            for syz in yz_range:
-                for sxz in xz_range:
-                    new_structure = structure.copy()
-                    shear_matrix = np.eye(3)
-                    shear_matrix[0, 1] += sxy / 100
-                    shear_matrix[1, 2] += syz / 100
-                    shear_matrix[0, 2] += sxz / 100
-                    if symmetric:
-                        shear_matrix[1, 0] += sxy / 100
-                        shear_matrix[2, 1] += syz / 100
-                        shear_matrix[2, 0] += sxz / 100
-
-                    new_cell = np.matmul(cell, shear_matrix)
-                    new_structure.set_cell(new_cell, scale_atoms=True)
-                    if identify_organic:
-                        process_organic_clusters(structure, new_structure, clusters, is_organic_list)
-                    info_list = []
-                    if abs(sxy) > 1e-8:
-                        info_list.append(f"xy:{sxy}%")
-                    if abs(syz) > 1e-8:
-                        info_list.append(f"yz:{syz}%")
-                    if abs(sxz) > 1e-8:
-                        info_list.append(f"xz:{sxz}%")
-                    info_str = "|".join(info_list)
-                    new_structure.info["Config_type"] = new_structure.info.get("Config_type", "") + f" Shear({info_str},symmetric={symmetric})"
-                    structure_list.append(new_structure)
-        return structure_list
-
     def to_dict(self):
         data_dict = super().to_dict()
         data_dict["organic"] = self.organic_checkbox.isChecked()
@@ -3,9 +3,10 @@
 # @Time    : 2024/10/20 22:22
 # @Author  : 兵
 # @email    : 1747193328@qq.com
+import os
 import time
 
-from NepTrainKit.core.calculator import NEPProcess
+from NepTrainKit.core.calculator import NEPProcess, run_nep_calculator
 
 start=time.time()
 import numpy as np
@@ -13,14 +14,20 @@ from PySide6.QtWidgets import QHBoxLayout, QWidget, QProgressDialog
 
 
 from NepTrainKit import utils
-from NepTrainKit.core import MessageManager, Config
+from NepTrainKit.core import MessageManager, Config, Structure
 from NepTrainKit.custom_widget import (
-    GetIntMessageBox,
+    MaxErrorMessageBox,
     SparseMessageBox,
     IndexSelectMessageBox,
+    GeometrySelectMessageBox,
+    ErrorStatisticsMessageBox,
     ShiftEnergyMessageBox, DFTD3MessageBox,
 )
+from NepTrainKit.core.geometry import iter_worst_bonds, SCAN_CHUNK_SIZE
 from NepTrainKit.core.io.select import farthest_point_sampling
+from NepTrainKit.core.io.reducer import ReducerProcess, get_embedding_cache_dir
+from NepTrainKit.core.io.descriptor_store import get_descriptor_store
+from NepTrainKit.core.io.novelty import get_novelty_index
 from NepTrainKit.views.toolbar import NepDisplayGraphicsToolBar
 from NepTrainKit.core.energy_shift import shift_dataset_energy, suggest_group_patterns
 
@@ -37,6 +44,11 @@ class NepResultPlotWidget(QWidget):
         canvas_type = Config.get("widget","canvas_type","pyqtgraph")
         self.last_figure_num=None
         self.swith_canvas(canvas_type)
+        # 非PCA的描述符降维在子进程中进行 完成后替换描述符子图
+        self.reducer_process = ReducerProcess(self)
+        self.reducer_process.finishedSignal.connect(self._set_descriptor_embedding)
+        self.reducer_process.errorSignal.connect(
+            lambda message: MessageManager.send_warning_message(f"Dimensionality reduction failed: {message}"))
 
     def swith_canvas(self,canvas_type="pyqtgraph"):
 
@@ -72,9 +84,12 @@ class NepResultPlotWidget(QWidget):
         self.tool_bar.findMaxSignal.connect(self.find_max_error_point)
         self.tool_bar.discoverySignal.connect(self.find_non_physical_structures)
         self.tool_bar.sparseSignal.connect(self.sparse_point)
+        self.tool_bar.noveltySignal.connect(self.color_by_novelty)
         self.tool_bar.shiftEnergySignal.connect(self.shift_energy_baseline)
         self.tool_bar.inverseSignal.connect(self.inverse_select)
         self.tool_bar.selectIndexSignal.connect(self.select_by_index)
+        self.tool_bar.geometrySignal.connect(self.select_by_geometry)
+        self.tool_bar.errorStatisticsSignal.connect(self.show_error_statistics)
         self.tool_bar.dftd3Signal.connect(self.calc_dft_d3)
         self.canvas.tool_bar=self.tool_bar
 
@@ -82,18 +97,18 @@ class NepResultPlotWidget(QWidget):
     def __find_non_physical_structures(self):
         """
         对每个结构进行非物理距离判断
+        结构按块在进程池中检查 每完成一块更新一次进度
         """
         structure_list = self.canvas.nep_result_data.structure.now_data
-        group_array = self.canvas.nep_result_data.structure.group_array.now_data
+        group_array = np.asarray(self.canvas.nep_result_data.structure.group_array.now_data)
         radius_coefficient_config = Config.getfloat("widget","radius_coefficient",0.7)
         unreasonable_index=[]
-        for structure,index in zip(structure_list,group_array):
-
-            if not structure.adjust_reasonable(radius_coefficient_config):
-
-                unreasonable_index.append(index)
+        for rows, ratios, pairs, distances in iter_worst_bonds(structure_list, radius_coefficient_config):
+            bad = ratios < radius_coefficient_config
+            unreasonable_index.extend(group_array[rows][bad].tolist())
             yield 1
         self.canvas.select_index(unreasonable_index,False)
+        MessageManager.send_info_message(f"Found {len(unreasonable_index)} non-physical structures.")
 
 
     def find_non_physical_structures(self):
@@ -102,7 +117,8 @@ class NepResultPlotWidget(QWidget):
         """
         if self.canvas.nep_result_data is None:
             return
-        progress_diag = QProgressDialog(f"" ,"Cancel",0,self.canvas.nep_result_data.structure.num,self._parent)
+        n_chunks = -(-self.canvas.nep_result_data.structure.num // SCAN_CHUNK_SIZE)
+        progress_diag = QProgressDialog(f"" ,"Cancel",0,n_chunks,self._parent)
         thread=utils.LoadingThread(self._parent,show_tip=False )
         progress_diag.setFixedSize(300, 100)
         progress_diag.setWindowTitle("Finding non-physical structures")
@@ -118,15 +134,19 @@ class NepResultPlotWidget(QWidget):
         if dataset is None:
             return
 
-        box= GetIntMessageBox(self._parent,"Please enter an integer N, it will find the top N structures with the largest errors")
+        box= MaxErrorMessageBox(self._parent,"Please enter an integer N, it will find the top N structures with the largest errors")
         n = Config.getint("widget","max_error_value",10)
+        mode = Config.get("widget","max_error_mode","max")
         box.intSpinBox.setValue(n)
+        box.modeCombo.setCurrentText(mode)
 
         if not box.exec():
             return
         nmax= box.intSpinBox.value()
+        mode= box.modeCombo.currentText()
         Config.set("widget","max_error_value",nmax)
-        index= (dataset.get_max_error_index(nmax))
+        Config.set("widget","max_error_mode",mode)
+        index= (dataset.get_max_error_index(nmax,mode))
 
         self.canvas.select_index(index,False)
 
@@ -137,22 +157,27 @@ class NepResultPlotWidget(QWidget):
         n_samples = Config.getint("widget","sparse_num_value",10)
         distance = Config.getfloat("widget","sparse_distance_value",0.01)
 
+        approximate = Config.getboolean("widget","sparse_approximate",False)
         box.intSpinBox.setValue(n_samples)
         box.doubleSpinBox.setValue(distance)
+        box.approximateCheckBox.setChecked(approximate)
 
         if not box.exec():
             return
         n_samples= box.intSpinBox.value()
         distance= box.doubleSpinBox.value()
+        approximate= box.approximateCheckBox.isChecked()
 
         Config.set("widget","sparse_num_value",n_samples)
         Config.set("widget","sparse_distance_value",distance)
+        Config.set("widget","sparse_approximate",approximate)
 
         dataset = self.canvas.nep_result_data.descriptor
         if dataset.now_data.size ==0:
             MessageManager.send_message_box("No descriptor data available","Error")
             return
-        remaining_indices = farthest_point_sampling(dataset.now_data,n_samples=n_samples,min_dist=distance)
+        remaining_indices = farthest_point_sampling(dataset.now_data,n_samples=n_samples,min_dist=distance,
+                                                    n_jobs=os.cpu_count(),approximate=approximate)
 
         # 获取所有索引（从 0 到 len(arr)-1）
         # all_indices = np.arange(dataset.now_data.shape[0])
@@ -162,6 +187,58 @@ class NepResultPlotWidget(QWidget):
         structures = dataset.group_array[remaining_indices]
         self.canvas.select_index(structures.tolist(),False)
 
+    def color_by_novelty(self):
+        """
+        选择训练集 描述符图按每个结构到训练集最近描述符的距离着色
+        已经着色时取消选择文件即恢复默认颜色
+        """
+        nep_result_data = self.canvas.nep_result_data
+        if nep_result_data is None:
+            MessageManager.send_info_message("NEP data has not been loaded yet!")
+            return
+        path = utils.call_path_dialog(self, "Choose the training set", "select", file_filter="XYZ files (*.xyz)")
+        if not path:
+            if nep_result_data.descriptor_novelty is not None:
+                nep_result_data.descriptor_novelty = None
+                self.canvas.update_dataset_plot(nep_result_data.descriptor)
+            return
+        result = {}
+        store = get_descriptor_store()
+        thread = utils.LoadingThread(self, show_tip=True, title="Calculating novelty")
+        thread.finished.connect(lambda: self._set_novelty(nep_result_data, result))
+        thread.start_work(self._calc_novelty, nep_result_data, path, store, result)
+
+    def _calc_novelty(self, nep_result_data, path, store, result):
+        """
+        在后台线程中执行 不使用任何Qt对象
+        得分或警告写到result中 线程结束后由主线程的_set_novelty处理
+        """
+        desc_array = nep_result_data.structure_descriptor
+        if desc_array.ndim != 2 or desc_array.shape[0] != nep_result_data.descriptor.all_data.shape[0]:
+            result["warning"] = "No descriptor data available"
+            return
+        nep_path = nep_result_data.nep_txt_path.as_posix()
+        train_structures = Structure.read_multiple(path)
+        reference = store.get(nep_result_data.nep_txt_path, "structure", train_structures,
+                              lambda structures: run_nep_calculator(nep_path, structures, "descriptor"))
+        if reference.size == 0 or reference.shape[1] != desc_array.shape[1]:
+            result["warning"] = "Failed to calculate the descriptors of the training set"
+            return
+        index = get_novelty_index(reference, store.index_dir)
+        store.evict()
+        result["scores"] = index.query(desc_array)
+
+    def _set_novelty(self, nep_result_data, result):
+        if "warning" in result:
+            MessageManager.send_warning_message(result["warning"])
+            return
+        if "scores" not in result:
+            return
+        scores = result["scores"]
+        nep_result_data.descriptor_novelty = scores
+        MessageManager.send_info_message(f"Novelty: min {scores.min():.4g}, max {scores.max():.4g}")
+        self.canvas.update_dataset_plot(nep_result_data.descriptor)
+
     def export_descriptor_data(self):
         if self.canvas.nep_result_data is None:
             MessageManager.send_info_message("NEP data has not been loaded yet!")
@@ -176,11 +253,11 @@ class NepResultPlotWidget(QWidget):
         if len(self.canvas.nep_result_data.select_index) == 0:
             MessageManager.send_info_message("No data selected!")
             return
-        select_index=self.canvas.nep_result_data.descriptor.convert_index(list(self.canvas.nep_result_data.select_index))
+        select_index=self.canvas.nep_result_data.descriptor.convert_index(self.canvas.nep_result_data.select_index.indices)
         descriptor_data = self.canvas.nep_result_data.descriptor.now_data[select_index,:]
         if hasattr(self.canvas.nep_result_data,"energy") and self.canvas.nep_result_data.energy.num !=0:
             select_index = self.canvas.nep_result_data.energy.convert_index(
-                list(self.canvas.nep_result_data.select_index))
+                self.canvas.nep_result_data.select_index.indices)
 
             energy_data = self.canvas.nep_result_data.energy.now_data[select_index,1]
             descriptor_data = np.column_stack((descriptor_data,energy_data))
@@ -193,7 +270,7 @@ class NepResultPlotWidget(QWidget):
         data = self.canvas.nep_result_data
         if data is None:
             return
-        ref_index = list(data.select_index)
+        ref_index = data.select_index.indices
         # if len(ref_index) == 0:
         #     MessageManager.send_info_message("No data selected!")
         #     return
@@ -252,6 +329,7 @@ class NepResultPlotWidget(QWidget):
             for i, s in enumerate(data.structure.all_data):
                 # print(s.per_atom_energy)
                 data.energy.data._data[i, data.energy.x_cols] = s.per_atom_energy
+            data.energy.reset_error_statistics()
         self.canvas.plot_nep_result()
     def _calc_dft_d3(self,mode,functional,cutoff,cutoff_cn):
         nep_result_data = self.canvas.nep_result_data
@@ -306,11 +384,13 @@ class NepResultPlotWidget(QWidget):
             ref_energies = np.array([s.per_atom_energy for s in nep_result_data.structure.now_data], dtype=np.float32).reshape(-1, 1)
 
             nep_result_data.energy.data._data[now_indices,  nep_result_data.energy.x_cols] = ref_energies
+            nep_result_data.energy.reset_error_statistics()
         if hasattr(nep_result_data, "force") and nep_result_data.force.num != 0:
             force_index=nep_result_data.force.convert_index(now_indices)
             ref_forces = np.vstack([s.forces for s in nep_result_data.structure.now_data], dtype=np.float32)
 
             nep_result_data.force.data._data[force_index,  nep_result_data.force.x_cols] = ref_forces
+            nep_result_data.force.reset_error_statistics()
         if hasattr(nep_result_data, "virial") and nep_result_data.virial.num != 0:
             ref_virials = np.vstack([s.nep_virial for s in nep_result_data.structure.now_data], dtype=np.float32)
             # print(nep_result_data.structure.now_data[0].virial)
@@ -318,6 +398,7 @@ class NepResultPlotWidget(QWidget):
             #
             # print(ref_virials[0])
             nep_result_data.virial.data._data[now_indices, nep_result_data.virial.x_cols] = ref_virials
+            nep_result_data.virial.reset_error_statistics()
 
             # print(nep_result_data.virial.data._data.tolist())
             if hasattr(nep_result_data, "stress") and nep_result_data.stress.num != 0:
@@ -327,6 +408,7 @@ class NepResultPlotWidget(QWidget):
                 stress_array = stress_array.astype(np.float32)
 
                 nep_result_data.stress.data._data[now_indices, nep_result_data.stress.x_cols] = stress_array
+                nep_result_data.stress.reset_error_statistics()
 
 
 
@@ -396,6 +478,75 @@ class NepResultPlotWidget(QWidget):
             indices = data.group_array.now_data[indices].tolist()
         self.canvas.select_index(indices, False)
 
+    def get_error_statistics_rows(self, by_config_type=False):
+        """误差统计表格的每一行 有单位的数据换算成meV等显示单位"""
+        nep_result_data = self.canvas.nep_result_data
+        statistics = nep_result_data.get_error_statistics(by_config_type)
+        datasets = {dataset.title: dataset for dataset in nep_result_data.dataset}
+        rows = []
+        for title, summaries in statistics.items():
+            unit, scale = datasets[title].get_error_unit()
+            if not by_config_type:
+                summaries = {"all": summaries}
+            for config_type, summary in summaries.items():
+                rows.append([
+                    f"{title} ({unit})" if unit else title,
+                    str(config_type),
+                    str(summary["count"]),
+                    f"{summary['rmse'] * scale:.4f}",
+                    f"{summary['mae'] * scale:.4f}",
+                    f"{summary['r2']:.4f}",
+                ])
+        return rows
+
+    def show_error_statistics(self):
+        if self.canvas.nep_result_data is None:
+            MessageManager.send_info_message("NEP data has not been loaded yet!")
+            return
+        box = ErrorStatisticsMessageBox(self._parent, self.get_error_statistics_rows)
+        box.exec()
+
+    def select_by_geometry(self):
+        """
+        按最小距离、密度、每原子体积、配位数或元素对的最小距离筛选结构
+        几何统计在加载时计算 还没有时在后台计算
+        """
+        nep_result_data = self.canvas.nep_result_data
+        if nep_result_data is None:
+            MessageManager.send_info_message("NEP data has not been loaded yet!")
+            return
+        statistics = nep_result_data.geometry_statistics
+        if statistics is None:
+            thread = utils.LoadingThread(self, show_tip=True, title="Calculating geometry statistics")
+            thread.finished.connect(
+                lambda: nep_result_data.geometry_statistics is not None and self.select_by_geometry())
+            thread.start_work(nep_result_data.get_geometry_statistics)
+            return
+        box = GeometrySelectMessageBox(self._parent, "Select structures whose value is within the range",
+                                       statistics.fields)
+        field = Config.get("widget", "geometry_field", "min_distance")
+        if field in statistics.fields:
+            box.fieldCombo.setCurrentText(field)
+        box.minCheckBox.setChecked(Config.getboolean("widget", "geometry_use_min", False))
+        box.minSpinBox.setValue(Config.getfloat("widget", "geometry_min", 0))
+        box.maxCheckBox.setChecked(Config.getboolean("widget", "geometry_use_max", True))
+        box.maxSpinBox.setValue(Config.getfloat("widget", "geometry_max", 1.0))
+        if not box.exec():
+            return
+        field = box.fieldCombo.currentText()
+        Config.set("widget", "geometry_field", field)
+        Config.set("widget", "geometry_use_min", box.minCheckBox.isChecked())
+        Config.set("widget", "geometry_min", box.minSpinBox.value())
+        Config.set("widget", "geometry_use_max", box.maxCheckBox.isChecked())
+        Config.set("widget", "geometry_max", box.maxSpinBox.value())
+        minimum = box.minSpinBox.value() if box.minCheckBox.isChecked() else None
+        maximum = box.maxSpinBox.value() if box.maxCheckBox.isChecked() else None
+        indices = statistics.select(field, minimum, maximum)
+        # 已删除的结构不选
+        indices = np.intersect1d(indices, nep_result_data.structure.group_array.now_data)
+        MessageManager.send_info_message(f"Found {indices.shape[0]} structures.")
+        self.canvas.select_index(indices.tolist(), False)
+
     def set_dataset(self,dataset):
 
         if self.last_figure_num !=len(dataset.dataset):
@@ -405,6 +556,33 @@ class NepResultPlotWidget(QWidget):
 
         self.canvas.set_nep_result_data(dataset)
         self.canvas.plot_nep_result()
+        self.start_descriptor_reducer()
+
+    def start_descriptor_reducer(self):
+        """
+        按设置的降维方法在后台重新计算描述符的二维坐标
+        加载时已经用PCA投影 pca不需要再算
+        """
+        self.reducer_process.stop()
+        nep_result_data = self.canvas.nep_result_data
+        reducer = Config.get("widget","descriptor_reducer","pca")
+        if nep_result_data is None or reducer == "pca":
+            return
+        desc_array = nep_result_data.structure_descriptor
+        if desc_array.ndim != 2 or desc_array.shape[0] != nep_result_data.descriptor.all_data.shape[0]:
+            return
+        self._reducer_dataset = nep_result_data
+        self.reducer_process.start(desc_array, reducer, cache_dir=get_embedding_cache_dir())
+
+    def _set_descriptor_embedding(self, embedding):
+        nep_result_data = self.canvas.nep_result_data
+        if nep_result_data is None or nep_result_data is not getattr(self, "_reducer_dataset", None):
+            return
+        descriptor = nep_result_data.descriptor
+        if embedding.shape != descriptor.all_data.shape:
+            return
+        descriptor.data._data[:] = embedding
+        self.canvas.update_dataset_plot(descriptor)
 
 
 
@@ -36,6 +36,7 @@ class NepDisplayGraphicsToolBar(KitToolBarBase):
     resetSignal=Signal()
     findMaxSignal=Signal()
     sparseSignal=Signal()
+    noveltySignal=Signal()
     penSignal=Signal(bool)
     undoSignal=Signal()
     discoverySignal=Signal()
@@ -45,6 +46,8 @@ class NepDisplayGraphicsToolBar(KitToolBarBase):
     shiftEnergySignal=Signal()
     inverseSignal=Signal()
     selectIndexSignal=Signal()
+    geometrySignal=Signal()
+    errorStatisticsSignal=Signal()
     dftd3Signal=Signal()
     def init_actions(self):
         self.addButton("Reset View",QIcon(":/images/src/images/init.svg"),self.resetSignal)
@@ -56,12 +59,21 @@ class NepDisplayGraphicsToolBar(KitToolBarBase):
         self.addButton("Select by Index",
                        QIcon(":/images/src/images/index.svg"),
                        self.selectIndexSignal)
+        self.addButton("Select by Geometry",
+                       QIcon(":/images/src/images/defect.svg"),
+                       self.geometrySignal)
+        self.addButton("Error Statistics",
+                       QIcon(":/images/src/images/check.svg"),
+                       self.errorStatisticsSignal)
         find_max_action = self.addButton("Find Max Error Point",
                                         QIcon(":/images/src/images/find_max.svg"),
                                         self.findMaxSignal)
         sparse_action=self.addButton("Sparse samples",
                                     QIcon(":/images/src/images/sparse.svg"),
                                     self.sparseSignal)
+        self.addButton("Color by Novelty",
+                       QIcon(":/images/src/images/search.svg"),
+                       self.noveltySignal)
 
 
 
@@ -42,3 +42,76 @@ def test_structure_data(test_setup):
     data = StructureData(structures)
     assert data.num == 25
 
+
+def _legacy_max_error_index(data, nmax):
+    error = np.sum(np.abs(data.now_data[:, 0:data.cols] - data.now_data[:, data.cols:]), axis=1)
+    structure_index = data.group_array.now_data[np.argsort(-error)]
+    _, indices = np.unique(structure_index, return_index=True)
+    return structure_index[np.sort(indices)][:nmax].tolist()
+
+def test_max_error_index():
+    """按结构聚合的最大误差与原来排序去重的结果一致"""
+    rng = np.random.default_rng(0)
+    atoms_num = rng.integers(1, 6, size=30)
+    data = NepPlotData(rng.random((atoms_num.sum(), 6)), group_list=atoms_num)
+    data.remove([3, 7])
+    assert data.get_max_error_index(5) == _legacy_max_error_index(data, 5)
+    assert data.get_max_error_index(100) == _legacy_max_error_index(data, 100)
+
+    structure_index, rmse = data.get_structure_error("rmse")
+    rows = data.group_array.now_data == structure_index[0]
+    diff = data.now_data[rows, :3] - data.now_data[rows, 3:]
+    assert np.isclose(rmse[0], np.sqrt(np.mean(diff ** 2)))
+    for mode in ("mean", "sum", "rmse"):
+        _, error = data.get_structure_error(mode)
+        assert data.get_max_error_index(3, mode) == structure_index[np.argsort(-error)[:3]].tolist()
+    with pytest.raises(ValueError):
+        data.get_max_error_index(3, "median")
+
+def test_error_statistics_incremental():
+    """删除和撤销后缓存的误差与直接计算一致"""
+    rng = np.random.default_rng(1)
+    atoms_num = rng.integers(1, 5, size=20)
+    data = NepPlotData(rng.random((atoms_num.sum(), 6)), group_list=atoms_num)
+
+    def direct():
+        diff = data.now_data[:, :3] - data.now_data[:, 3:]
+        return np.sqrt(np.mean(diff ** 2)), np.mean(np.abs(diff))
+
+    data.remove([0, 5])
+    summary = data.get_error_summary()
+    assert np.allclose((summary["rmse"], summary["mae"]), direct())
+    data.remove([5, 6, 7])
+    data.remove(19)
+    assert np.isclose(data.get_rmse(), direct()[0])
+    data.revoke()
+    data.revoke()
+    assert np.isclose(data.get_rmse(), direct()[0])
+    assert data.get_error_summary()["count"] == data.now_data.shape[0] * 3
+
+    ref = data.now_data[:, 3:]
+    r2 = 1 - np.sum((data.now_data[:, :3] - ref) ** 2) / np.sum((ref - ref.mean()) ** 2)
+    assert np.isclose(data.get_error_summary()["r2"], r2)
+
+    labels = np.where(np.arange(20) % 2 == 0, "even", "odd")
+    groups = data.get_group_error_summary(labels)
+    rows = np.isin(data.group_array.now_data, np.flatnonzero(labels == "odd"))
+    diff = data.now_data[rows, :3] - data.now_data[rows, 3:]
+    assert np.isclose(groups["odd"]["rmse"], np.sqrt(np.mean(diff ** 2)))
+
+def test_selection_mask():
+    """选择掩码与set的行为一致"""
+    from NepTrainKit.core.io.base import SelectionMask
+    selection = SelectionMask(6)
+    assert not selection
+    selection.update(np.array([1, 3, 3]))
+    selection.add(5)
+    assert selection == {1, 3, 5}
+    assert np.int64(3) in selection and 0 not in selection and 100 not in selection
+    assert 1.7 not in selection and "3" not in selection and None not in selection
+    selection.difference_update([5, 9])
+    assert len(selection) == 2
+    selection.invert(np.array([True, True, True, False, True, True]))
+    assert sorted(selection) == [0, 2, 4, 5]
+    selection.clear()
+    assert len(selection) == 0 and list(selection) == []
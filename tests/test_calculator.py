@@ -6,7 +6,7 @@ import numpy as np
 from pathlib import Path
 
 from NepTrainKit.core import Structure
-from NepTrainKit.core.calculator import Nep3Calculator
+from NepTrainKit.core.calculator import Nep3Calculator, postprocess_calculate_result
 
 class TestNep(unittest.TestCase):
     def setUp(self):
@@ -81,5 +81,24 @@ class TestPolarizability(unittest.TestCase):
         np.testing.assert_array_equal(local_pol, pol)
 
 
+class TestPostprocess(unittest.TestCase):
+    def test_mixed_atom_counts(self):
+        rng = np.random.default_rng(0)
+        group_size = [3, 1, 5, 2]
+        # 与C++输出的嵌套列表相同的格式
+        potentials = [rng.random(n).tolist() for n in group_size]
+        forces = [rng.random(3 * n).tolist() for n in group_size]
+        virials = [rng.random(9 * n).tolist() for n in group_size]
+        energy, force, virial = postprocess_calculate_result(potentials, forces, virials, group_size)
+
+        # 原来逐个结构处理的写法
+        np.testing.assert_allclose(energy, [np.sum(p) for p in potentials], rtol=1e-6)
+        np.testing.assert_allclose(force, np.vstack([np.array(f).reshape(3, -1).T for f in forces]), rtol=1e-6)
+        np.testing.assert_allclose(virial, np.vstack([np.array(v).reshape(9, -1).mean(axis=1) for v in virials]),
+                                   rtol=1e-6)
+        self.assertEqual(force.shape, (sum(group_size), 3))
+        self.assertEqual(virial.shape, (len(group_size), 9))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
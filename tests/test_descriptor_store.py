@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from NepTrainKit.core import Structure
+from NepTrainKit.core.io.descriptor_store import DescriptorStore, get_structure_hash
+
+
+@pytest.fixture
+def structures():
+    return Structure.read_multiple(Path(__file__).parent / "data/nep/train.xyz")[:12]
+
+
+@pytest.fixture
+def nep_txt(tmp_path):
+    path = tmp_path / "nep.txt"
+    path.write_text("nep4 1 H\n")
+    return path
+
+
+class Counter:
+    """用坐标代替真正的描述符 记录被计算的结构数"""
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+
+    def __call__(self, structures):
+        self.count += len(structures)
+        blocks = [structure.positions.astype(np.float32) for structure in structures]
+        if self.kind == "structure":
+            return np.array([block.mean(axis=0) for block in blocks])
+        return np.concatenate(blocks)
+
+
+def test_structure_descriptor_reuse(tmp_path, structures, nep_txt):
+    store = DescriptorStore(tmp_path / "cache")
+    compute = Counter("structure")
+    first = store.get(nep_txt, "structure", structures[:8], compute)
+    assert compute.count == 8
+    second = store.get(nep_txt, "structure", structures[4:], compute)
+    assert compute.count == 12
+    np.testing.assert_array_equal(first[4:], second[:4])
+    third = store.get(nep_txt, "structure", structures[::-1], compute)
+    assert compute.count == 12
+    np.testing.assert_array_equal(third, compute(structures)[::-1])
+
+    # 势函数改变后缓存失效
+    nep_txt.write_text("nep4 1 He\n")
+    compute.count = 0
+    store.get(nep_txt, "structure", structures, compute)
+    assert compute.count == 12
+
+
+def test_atomic_descriptor_memmap(tmp_path, structures, nep_txt):
+    store = DescriptorStore(tmp_path / "cache")
+    compute = Counter("atomic")
+    expected = compute(structures)
+    compute.count = 0
+    result = store.get(nep_txt, "atomic", structures[:5], compute, batch_rows=300)
+    assert compute.count == 5
+    result = store.get(nep_txt, "atomic", structures, compute, path=tmp_path / "atomic.npy", batch_rows=300)
+    assert isinstance(result, np.memmap) and compute.count == 12
+    np.testing.assert_array_equal(result, expected)
+    del result
+    np.testing.assert_array_equal(np.load(tmp_path / "atomic.npy"), expected)
+
+
+def test_evict(tmp_path, structures, nep_txt):
+    store = DescriptorStore(tmp_path / "cache")
+    compute = Counter("structure")
+    for structure in structures[:4]:
+        store.get(nep_txt, "structure", [structure], compute)
+    segment_size = store.size() / 4
+    store.evict(segment_size * 2.5)
+    assert store.size() <= segment_size * 2.5
+    compute.count = 0
+    store.get(nep_txt, "structure", structures[:4], compute)
+    assert compute.count == 2
+    store.clear()
+    assert store.size() == 0
+    assert get_structure_hash(structures[0]) != get_structure_hash(structures[1])
+
+
+def test_evict_novelty_index(tmp_path, structures, nep_txt):
+    from NepTrainKit.core.io.novelty import get_novelty_index
+    store = DescriptorStore(tmp_path / "cache")
+    reference = store.get(nep_txt, "structure", structures, Counter("structure"))
+    get_novelty_index(reference, store.index_dir)
+    index_files = list(store.index_dir.glob("*.kdtree"))
+    assert len(index_files) == 1
+    assert store.size() > index_files[0].stat().st_size
+    store.evict(0)
+    assert store.size() == 0 and not index_files[0].exists()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from NepTrainKit.core.structure import Structure
+from NepTrainKit.core.geometry import find_non_physical_structures, iter_worst_bonds, GeometryStatistics
+
+
+def test_find_non_physical_structures():
+    structures = Structure.read_multiple(os.path.join(os.path.dirname(__file__), "data/nep/train.xyz"))
+    for coefficient in (0.7, 1.0, 1.3):
+        expected = [i for i, structure in enumerate(structures) if not structure.adjust_reasonable(coefficient)]
+        indices, pairs, distances = find_non_physical_structures(structures, coefficient, n_jobs=1, chunk_size=4)
+        assert indices.tolist() == expected
+        for index, (i, j), distance in zip(indices, pairs, distances):
+            assert i <= j
+            assert distance > 0
+
+
+def test_iter_worst_bonds_chunks():
+    structures = Structure.read_multiple(os.path.join(os.path.dirname(__file__), "data/nep/train.xyz"))
+    chunks = list(iter_worst_bonds(structures, 0.7, n_jobs=1, chunk_size=10))
+    assert [(rows.start, rows.stop) for rows, *_ in chunks] == [(0, 10), (10, 20), (20, 25)]
+
+
+def test_geometry_statistics(tmp_path):
+    structures = Structure.read_multiple(os.path.join(os.path.dirname(__file__), "data/nep/train.xyz"))
+    statistics = GeometryStatistics.compute(structures, n_jobs=1, chunk_size=10)
+    assert len(statistics) == len(structures)
+    structure = structures[0]
+    assert abs(statistics.min_distance[0] - min(structure.get_mini_distance_info().values())) < 1e-4
+    assert abs(statistics.volume_per_atom[0] - structure.volume / len(structure)) < 1e-3
+    assert statistics.coordination_histogram.sum(axis=1).tolist() == [len(s) for s in structures]
+    # 元素对按原子序数排列 两种写法都可以
+    assert statistics.pair_names == ["Te-Te", "Te-Pb", "Pb-Pb"]
+    np.testing.assert_array_equal(statistics.get_values("Pb-Te"), statistics.get_values("Te-Pb"))
+
+    threshold = float(np.median(statistics.min_distance))
+    indices = statistics.select("min_distance", maximum=threshold)
+    assert indices.tolist() == np.flatnonzero(statistics.min_distance <= threshold).tolist()
+
+    path = tmp_path / "geometry.npz"
+    statistics.save(path, num=len(structures))
+    loaded, metadata = GeometryStatistics.load(path)
+    assert metadata == {"num": len(structures)}
+    assert loaded.pair_names == statistics.pair_names
+    np.testing.assert_array_equal(loaded.pair_min, statistics.pair_min)
+    np.testing.assert_array_equal(loaded.density, statistics.density)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from functools import partial
+
+import numpy as np
+import pytest
+
+from NepTrainKit.core.io.utils import (segment_reduce, parse_array_by_atomnum, get_segment_offsets, read_descriptor_file,
+                                       read_descriptor_binary, write_descriptor_binary)
+
+
+def _reference(array, atoms_num_list, func):
+    split_arrays = np.split(array, np.cumsum(atoms_num_list)[:-1])
+    return np.array(list(map(partial(func, axis=0), split_arrays)))
+
+
+@pytest.fixture
+def atom_data():
+    rng = np.random.default_rng(0)
+    atoms_num_list = rng.integers(1, 20, size=50)
+    array = rng.normal(size=(atoms_num_list.sum(), 6)).astype(np.float32)
+    return array, atoms_num_list
+
+
+@pytest.mark.parametrize("reduce,func", [("mean", np.mean), ("sum", np.sum), ("norm", np.linalg.norm), ("max", np.max)])
+def test_segment_reduce_matches_split(atom_data, reduce, func):
+    array, atoms_num_list = atom_data
+    result = segment_reduce(array, atoms_num_list, reduce)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, _reference(array, atoms_num_list, func), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(parse_array_by_atomnum(array, atoms_num_list, map_func=func),
+                               result, rtol=1e-6)
+
+
+def test_segment_reduce_chunked(atom_data, tmp_path):
+    array, atoms_num_list = atom_data
+    expected = segment_reduce(array, atoms_num_list, "mean")
+    # 块大小小于单个结构的原子数时也要正确处理
+    np.testing.assert_allclose(segment_reduce(array, atoms_num_list, "mean", chunk_size=7), expected, rtol=1e-6)
+
+    path = tmp_path / "descriptor.bin"
+    memmap = np.memmap(path, dtype=np.float32, mode="w+", shape=array.shape)
+    memmap[:] = array
+    memmap.flush()
+    memmap = np.memmap(path, dtype=np.float32, mode="r", shape=array.shape)
+    np.testing.assert_allclose(segment_reduce(memmap, atoms_num_list, "mean", chunk_size=100), expected, rtol=1e-6)
+
+
+def test_segment_reduce_empty_structure():
+    array = np.arange(12, dtype=np.float32).reshape(4, 3)
+    atoms_num_list = [2, 0, 2]
+    np.testing.assert_array_equal(get_segment_offsets(atoms_num_list), [0, 2, 2])
+    result = segment_reduce(array, atoms_num_list, "sum")
+    np.testing.assert_array_equal(result, [[3, 5, 7], [0, 0, 0], [15, 17, 19]])
+    with pytest.raises(ValueError):
+        segment_reduce(array, [1, 1], "sum")
+
+
+def test_read_descriptor_file(tmp_path):
+    rng = np.random.default_rng(3)
+    counts = np.array([3, 0, 7, 1, 12, 5])
+    atomic = rng.random((counts.sum(), 4)).astype(np.float32)
+    path = tmp_path / "descriptor.out"
+    np.savetxt(path, atomic, fmt="%.6g")
+    expected = segment_reduce(np.loadtxt(path, dtype=np.float32), counts, "mean")
+    # 块的边界落在结构中间
+    result = read_descriptor_file(path, counts, chunk_rows=4)
+    np.testing.assert_allclose(result, expected, rtol=1e-6)
+    assert result.dtype == np.float32
+
+    np.savetxt(path, atomic[:6], fmt="%.6g")
+    np.testing.assert_allclose(read_descriptor_file(path, counts, chunk_rows=4), np.loadtxt(path), rtol=1e-6)
+    assert read_descriptor_file(path, counts[:-1]) is None
+
+    # 末尾的空行和注释行与np.loadtxt一样跳过
+    with open(path, "a") as f:
+        f.write("\n# comment\n  \n")
+    np.testing.assert_allclose(read_descriptor_file(path, counts, chunk_rows=4), np.loadtxt(path), rtol=1e-6)
+
+
+def test_descriptor_binary(tmp_path):
+    array = np.arange(30, dtype=np.float32).reshape(10, 3)
+    path = tmp_path / "descriptor.bin"
+    write_descriptor_binary(path, array, model_hash="abc")
+    for mmap in (True, False):
+        result, metadata = read_descriptor_binary(path, mmap=mmap)
+        np.testing.assert_array_equal(result, array)
+        assert metadata == {"model_hash": "abc"}
+    path.write_bytes(b"0.1 0.2\n")
+    assert read_descriptor_binary(path) == (None, {})
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+
+from NepTrainKit.core.neighbor import get_neighbor_pairs, get_pair_min_distances
+
+
+def brute_force_pairs(lattice, positions, cutoff, n_images=4, pbc=(True, True, True)):
+    result = set()
+    ranges = [range(-n_images, n_images + 1) if periodic else [0] for periodic in pbc]
+    for shift in itertools.product(*ranges):
+        vectors = positions[np.newaxis, :, :] + np.dot(shift, lattice) - positions[:, np.newaxis, :]
+        distances = np.linalg.norm(vectors, axis=-1)
+        for i, j in zip(*np.nonzero(distances <= cutoff)):
+            if i == j and not any(shift):
+                continue
+            # (i, j, s) 与 (j, i, -s) 是同一对
+            key = min((i, j, shift), (j, i, tuple(-np.array(shift))))
+            result.add((int(key[0]), int(key[1]), tuple(int(x) for x in key[2])))
+    return result
+
+
+def as_pair_set(i, j, shifts):
+    result = set()
+    for a, b, shift in zip(i.tolist(), j.tolist(), shifts.tolist()):
+        key = min((a, b, tuple(shift)), (b, a, tuple(-x for x in shift)))
+        result.add(key)
+    return result
+
+
+def test_neighbor_pairs_skewed_tiny_cell():
+    rng = np.random.default_rng(0)
+    # 严重倾斜且比截断半径小的晶胞 27个周期像不够
+    lattice = np.array([[2.0, 0, 0], [1.7, 1.2, 0], [0.6, 0.4, 1.5]])
+    positions = rng.random((5, 3)) @ lattice + np.array([2.5, -1.0, 0.3])
+    cutoff = 3.0
+    i, j, distances, shifts = get_neighbor_pairs(lattice, positions, cutoff)
+    vectors = positions[j] + shifts @ lattice - positions[i]
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), distances, atol=1e-8)
+    assert as_pair_set(i, j, shifts) == brute_force_pairs(lattice, positions, cutoff)
+    assert len(as_pair_set(i, j, shifts)) == len(i)
+
+
+def test_neighbor_pairs_non_periodic():
+    positions = np.array([[0, 0, 0], [1.0, 0, 0], [5.0, 0, 0]])
+    i, j, distances, shifts = get_neighbor_pairs(np.zeros((3, 3)), positions, 2.0)
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1)]
+    np.testing.assert_allclose(distances, [1.0])
+    assert not shifts.any()
+
+
+def test_neighbor_pairs_mixed_pbc_slab():
+    lattice = np.diag([10.0, 10.0, 10.0])
+    # 非周期方向伸出晶胞的原子
+    positions = np.array([[0.2, 0.2, 10.5], [0.2, 0.2, 11.3], [9.9, 0.2, 11.3], [5.0, 5.0, -2.0]])
+    pbc = [True, True, False]
+    i, j, distances, shifts = get_neighbor_pairs(lattice, positions, 3.0, pbc)
+    assert not shifts[:, 2].any()
+    assert as_pair_set(i, j, shifts) == brute_force_pairs(lattice, positions, 3.0, 1, pbc)
+    assert (0, 1, (0, 0, 0)) in as_pair_set(i, j, shifts)
+
+
+def test_pair_min_distances():
+    species = np.array([0, 1, 1, 2])
+    i = np.array([0, 1, 2, 3, 1])
+    j = np.array([1, 0, 1, 3, 2])
+    distances = np.array([1.5, 1.2, 2.0, 3.0, 2.5])
+    minimum = get_pair_min_distances(species, i, j, distances)
+    assert minimum[0, 1] == minimum[1, 0] == 1.2
+    assert minimum[1, 1] == 2.0
+    assert minimum[2, 2] == 3.0
+    assert np.isinf(minimum[0, 2])
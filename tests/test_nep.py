@@ -4,8 +4,11 @@ import unittest
 import numpy as np
 from pathlib import Path
 import os
+import shutil
+import tempfile
 from NepTrainKit.core.io.nep import NepTrainResultData,NepPolarizabilityResultData,NepDipoleResultData
 from NepTrainKit.core import Structure,Config
+from NepTrainKit.core.io.utils import get_file_hash
 from PySide6.QtWidgets import QApplication
 
 app = QApplication()
@@ -21,7 +24,8 @@ class TestNepTrainResultData( unittest.TestCase):
 
         self.train_path=os.path.join(self.data_dir,"train.xyz")
     def tearDown(self):
-        pass
+        # load()总会在数据旁边写几何统计的缓存
+        Path(self.data_dir, "geometry.npz").unlink(missing_ok=True)
     def test_load_train(self):
         """测试结构加载功能"""
         result = NepTrainResultData.from_path(self.train_path)
@@ -30,6 +34,8 @@ class TestNepTrainResultData( unittest.TestCase):
         self.assertEqual(result.force.num, 6250)
         self.assertEqual(result.stress.num, 25)
         self.assertEqual(result.virial.num, 25)
+        # 几何统计在加载时就算好 与geometry_panes无关
+        self.assertEqual(result.geometry_statistics.min_distance.shape[0], 25)
         result.select([0,1,3])
         self.assertEqual(len(result.select_index),3)
         result.uncheck(0)
@@ -64,7 +70,8 @@ class TestNepTrainResultData( unittest.TestCase):
         os.remove(os.path.join(self.data_dir,"force_train.out"))
         os.remove(os.path.join(self.data_dir,"stress_train.out"))
         os.remove(os.path.join(self.data_dir,"virial_train.out"))
-        os.remove(os.path.join(self.data_dir,"descriptor.out"))
+        os.remove(os.path.join(self.data_dir,"descriptor.bin"))
+        os.remove(os.path.join(self.data_dir,"nep_pca_projection.npz"))
 
     def test_inverse_select(self):
         result = NepTrainResultData.from_path(self.train_path)
@@ -76,6 +83,45 @@ class TestNepTrainResultData( unittest.TestCase):
         self.assertNotIn(1, result.select_index)
         self.assertNotIn(3, result.select_index)
 
+    def test_error_statistics(self):
+        """删除结构后 缓存的误差统计与直接用numpy计算的一致"""
+        result = NepTrainResultData.from_path(self.train_path)
+        result.load()
+        result.select([0, 2, 7])
+        result.delete_selected()
+        statistics = result.get_error_statistics()
+        for dataset in (result.energy, result.force):
+            nep, ref = dataset.now_data[:, :dataset.cols], dataset.now_data[:, dataset.cols:]
+            diff = nep.astype(np.float64) - ref
+            summary = statistics[dataset.title]
+            self.assertEqual(summary["count"], diff.size)
+            self.assertAlmostEqual(summary["rmse"], np.sqrt(np.mean(diff ** 2)), places=5)
+            self.assertAlmostEqual(summary["mae"], np.mean(np.abs(diff)), places=5)
+            r2 = 1 - np.sum(diff ** 2) / np.sum((ref - ref.astype(np.float64).mean()) ** 2)
+            self.assertAlmostEqual(summary["r2"], r2, places=5)
+
+        groups = result.get_error_statistics(by_config_type=True)["energy"]
+        tags = np.array([structure.tag for structure in result.structure.now_data])
+        for tag, summary in groups.items():
+            diff = (result.energy.now_data[:, 0] - result.energy.now_data[:, 1])[tags == tag]
+            self.assertEqual(summary["count"], diff.size)
+            self.assertAlmostEqual(summary["rmse"], np.sqrt(np.mean(diff.astype(np.float64) ** 2)), places=5)
+
+
+    def test_descriptor_cache_data_file(self):
+        """train.xyz重新生成后 结构数相同也不沿用旧的descriptor.bin"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ("train.xyz", "nep.txt"):
+                shutil.copy(os.path.join(self.data_dir, name), tmp_dir)
+            train_path = os.path.join(tmp_dir, "train.xyz")
+            result = NepTrainResultData.from_path(train_path)
+            result.load()
+            model_hash = get_file_hash(result.nep_txt_path)
+            self.assertIsNotNone(result._read_descriptor_cache(model_hash))
+            stat = os.stat(train_path)
+            os.utime(train_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertIsNone(result._read_descriptor_cache(model_hash))
+
 
 class TestNepPolarizabilityResultData( unittest.TestCase):
     def setUp(self):
@@ -86,7 +132,8 @@ class TestNepPolarizabilityResultData( unittest.TestCase):
         self.train_path=os.path.join(self.data_dir,"train.xyz")
 
     def tearDown(self):
-        pass
+        # load()总会在数据旁边写几何统计的缓存
+        Path(self.data_dir, "geometry.npz").unlink(missing_ok=True)
     def test_load_train(self):
         """测试结构加载功能"""
         result = NepPolarizabilityResultData.from_path(self.train_path)
@@ -118,7 +165,7 @@ class TestNepPolarizabilityResultData( unittest.TestCase):
         result = NepPolarizabilityResultData.from_path(self.train_path)
         result.load()
         os.remove(os.path.join(self.data_dir,"polarizability_train.out"))
-        os.remove(os.path.join(self.data_dir,"descriptor.out"))
+        os.remove(os.path.join(self.data_dir,"descriptor.bin"))
 
     def test_inverse_select(self):
         result = NepPolarizabilityResultData.from_path(self.train_path)
@@ -139,7 +186,8 @@ class TestNepDipoleResultData(unittest.TestCase):
         self.train_path=os.path.join(self.data_dir,"train.xyz")
 
     def tearDown(self):
-        pass
+        # load()总会在数据旁边写几何统计的缓存
+        Path(self.data_dir, "geometry.npz").unlink(missing_ok=True)
     def test_load_train(self):
         """测试结构加载功能"""
         result = NepDipoleResultData.from_path(self.train_path)
@@ -170,7 +218,7 @@ class TestNepDipoleResultData(unittest.TestCase):
         result = NepDipoleResultData.from_path(self.train_path)
         result.load()
         os.remove(os.path.join(self.data_dir,"dipole_train.out"))
-        os.remove(os.path.join(self.data_dir,"descriptor.out"))
+        os.remove(os.path.join(self.data_dir,"descriptor.bin"))
 
     def test_inverse_select(self):
         result = NepDipoleResultData.from_path(self.train_path)
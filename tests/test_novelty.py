@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from NepTrainKit.core.io.novelty import NoveltyIndex, get_novelty_index, novelty_scores
+
+
+def test_novelty_scores(tmp_path):
+    rng = np.random.default_rng(4)
+    reference = rng.normal(size=(2000, 10)).astype(np.float32)
+    points = rng.normal(size=(500, 10)).astype(np.float32) * 1.5
+    expected = np.sqrt(((points[:, None] - reference[None]) ** 2).sum(axis=2)).min(axis=1)
+    distances, indices = NoveltyIndex(reference).query(points, batch_size=64, return_index=True)
+    np.testing.assert_allclose(distances, expected, rtol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(points - reference[indices], axis=1), expected, rtol=1e-5)
+    np.testing.assert_allclose(novelty_scores(reference, reference[:10]), 0, atol=1e-6)
+
+    # 第二次从缓存读取索引
+    scores = novelty_scores(reference, points, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("*.kdtree"))) == 1
+    np.testing.assert_allclose(novelty_scores(reference, points, cache_dir=tmp_path), scores)
+    assert get_novelty_index(reference, tmp_path).n_reference == 2000
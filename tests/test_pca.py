@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NepTrainKit.core.io.pca import IncrementalPCA, randomized_svd
+
+
+def _reference_pca(X, n_components):
+    X_centered = X - X.mean(axis=0)
+    eigenvalues, eigenvectors = np.linalg.eigh(np.cov(X_centered.T))
+    idx = np.argsort(eigenvalues)[::-1][:n_components]
+    return X_centered @ eigenvectors[:, idx]
+
+
+def _assert_same_up_to_sign(a, b, rtol=1e-4, atol=1e-4):
+    signs = np.sign(np.sum(a * b, axis=0))
+    np.testing.assert_allclose(a, b * signs, rtol=rtol, atol=atol)
+
+
+@pytest.fixture
+def descriptor():
+    rng = np.random.default_rng(0)
+    # 方差逐渐减小 保证主成分明确
+    return (rng.normal(size=(2000, 30)) * 10 * 0.6 ** np.arange(30)).astype(np.float32)
+
+
+@pytest.mark.parametrize("solver", ["full", "randomized"])
+def test_pca_matches_reference(descriptor, solver):
+    result = IncrementalPCA(2, solver=solver, chunk_size=300).fit_transform(descriptor)
+    assert result.dtype == np.float32
+    _assert_same_up_to_sign(result, _reference_pca(descriptor.astype(np.float64), 2), rtol=1e-3, atol=1e-3)
+
+
+def test_randomized_svd(descriptor):
+    X = descriptor.astype(np.float64)
+    _, S, _ = randomized_svd(X, 3, chunk_size=500)
+    np.testing.assert_allclose(S, np.linalg.svd(X, compute_uv=False)[:3], rtol=1e-6)
+
+
+def test_partial_fit_and_memmap(descriptor, tmp_path):
+    path = tmp_path / "descriptor.bin"
+    memmap = np.memmap(path, dtype=np.float32, mode="w+", shape=descriptor.shape)
+    memmap[:] = descriptor
+    full = IncrementalPCA(2, solver="full", chunk_size=128).fit(memmap)
+
+    model = IncrementalPCA(2, solver="full")
+    model.partial_fit(descriptor[:700])
+    model.partial_fit(descriptor[700:])
+    np.testing.assert_allclose(model.transform(descriptor), full.transform(memmap), rtol=1e-4, atol=1e-4)
+
+
+def test_save_and_load(descriptor, tmp_path):
+    model = IncrementalPCA(2).fit(descriptor[:1500])
+    path = tmp_path / "descriptor_pca.npz"
+    model.save(path, model_hash="abc")
+    loaded, metadata = IncrementalPCA.load(path)
+    assert metadata == {"model_hash": "abc"}
+    # 新加入的数据直接投影 结果与原模型一致
+    np.testing.assert_array_equal(loaded.transform(descriptor[1500:]), model.transform(descriptor[1500:]))
+    with pytest.raises(ValueError):
+        loaded.transform(descriptor[:, :5])
+
+
+def test_projection_registry_shared(descriptor, tmp_path):
+    """同一个势函数下 不同数据集使用同一个投影 不重新拟合"""
+    from NepTrainKit.core.io.projection import ProjectionRegistry
+    nep_txt = tmp_path / "nep.txt"
+    nep_txt.write_text("nep4 1 H\n")
+    train, test = descriptor[:1500], descriptor[1500:]
+    train_projection = ProjectionRegistry(nep_txt).project(train)
+    assert ProjectionRegistry(nep_txt).get_path().exists()
+    test_projection = ProjectionRegistry(nep_txt).project(test)
+    expected = IncrementalPCA(2).fit(train).transform(test)
+    np.testing.assert_allclose(test_projection, expected, rtol=1e-5, atol=1e-5)
+    assert train_projection.shape == (1500, 2)
+
+    # 势函数改变后重新拟合
+    nep_txt.write_text("nep4 1 O\n")
+    refit = ProjectionRegistry(nep_txt).project(test)
+    np.testing.assert_allclose(np.abs(refit), np.abs(IncrementalPCA(2).fit_transform(test)), rtol=1e-5, atol=1e-5)
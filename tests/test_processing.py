@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from ase.io import read
+
+from NepTrainKit.core.processing import (ProcessorManager, iter_processed_structures, process_structures,
+                                         CardPipeline)
+
+STRAIN_CONFIG = {"class": "CellStrainCard", "check_state": True, "organic": False, "engine_type": "uniaxial",
+                 "x_range": [-1.0, 1.0, 1.0], "y_range": [-1.0, 1.0, 1.0], "z_range": [-1.0, 1.0, 1.0]}
+PERTURB_CONFIG = {"class": "PerturbCard", "check_state": True, "engine_type": 1, "organic": False,
+                  "scaling_condition": [0.3], "num_condition": [5]}
+SUPERCELL_CONFIG = {"class": "SuperCellCard", "check_state": True, "super_cell_type": 0, "super_scale_radio_button": True,
+                    "super_scale_condition": [2, 1, 1], "super_cell_radio_button": False,
+                    "super_cell_condition": [20, 20, 20], "max_atoms_radio_button": False,
+                    "max_atoms_condition": [100]}
+
+
+@pytest.fixture(scope="module")
+def structures():
+    return read(os.path.join(os.path.dirname(__file__), "data/nep/train.xyz"), ":6")
+
+
+def test_unknown_card():
+    assert not ProcessorManager.has_processor("MyCustomCard")
+    with pytest.raises(NotImplementedError):
+        ProcessorManager.create({"class": "MyCustomCard"})
+
+
+def test_card_class_from_mro():
+    PerturbCard = type("PerturbCard", (), {})
+    MyPerturbCard = type("MyPerturbCard", (PerturbCard,), {})
+    assert ProcessorManager.get_card_class(MyPerturbCard) == "PerturbCard"
+    assert ProcessorManager.get_card_class(type("MyCustomCard", (), {})) is None
+
+
+def test_pool_matches_serial(structures):
+    serial = process_structures(structures, STRAIN_CONFIG, n_jobs=1)
+    chunks = list(iter_processed_structures(structures, STRAIN_CONFIG, n_jobs=2, chunk_size=4,
+                                            parallel_threshold=0))
+    assert [(rows.start, rows.stop) for rows, _ in chunks] == [(0, 4), (4, 6)]
+    pool = [structure for _, processed in chunks for structure in processed]
+    assert len(serial) == len(pool) == len(structures) * 9
+    for a, b in zip(serial, pool):
+        np.testing.assert_allclose(a.positions, b.positions)
+        assert a.info["Config_type"] == b.info["Config_type"]
+
+
+def test_pool_perturbations_differ(structures):
+    result = process_structures([structures[0]] * 4, PERTURB_CONFIG, n_jobs=2, chunk_size=1,
+                                parallel_threshold=0)
+    assert len(result) == 20
+    # 每块重新取随机数种子 不同块的扰动不能相同
+    displacements = [structure.positions - structures[0].positions for structure in result[::5]]
+    assert not np.allclose(displacements[0], displacements[1])
+
+
+def test_pipeline_matches_cards(structures):
+    expected = process_structures(process_structures(structures, SUPERCELL_CONFIG), STRAIN_CONFIG)
+    pipeline = CardPipeline([SUPERCELL_CONFIG, dict(PERTURB_CONFIG, check_state=False), STRAIN_CONFIG],
+                            n_jobs=2, chunk_size=4, parallel_threshold=0)
+    # 相邻的两张卡片合并成一段 未勾选的卡片被跳过
+    assert [(kind, index, len(cards)) for kind, index, cards in pipeline.stages] == [("chain", 0, 2)]
+    result = [structure for _, batch in pipeline.run(structures) for structure in batch]
+    assert len(result) == len(expected)
+    for a, b in zip(expected, result):
+        np.testing.assert_allclose(a.positions, b.positions)
+        assert a.info["Config_type"] == b.info["Config_type"]
+
+
+def test_pipeline_from_file(structures, tmp_path):
+    config_path = tmp_path / "card_config.json"
+    config_path.write_text(json.dumps({"software_version": "", "cards": [SUPERCELL_CONFIG, STRAIN_CONFIG]}))
+    pipeline = CardPipeline.from_file(config_path)
+    output = tmp_path / "make_dataset.xyz"
+    reported = {}
+    progress = lambda index, percent: reported.setdefault(index, []).append(percent)
+    assert pipeline.run_to_file(structures, output, keep_all=True, progress=progress) == len(structures) * 10
+    # 两张卡片合并成一段 各自汇报进度
+    assert sorted(reported) == [0, 1] and reported[0][-1] == reported[1][-1] == 100
+    # 与界面导出一致 先写出第一张卡片的全部结果
+    written = read(output, ":")
+    assert all("Strain" not in atoms.info["Config_type"] for atoms in written[:len(structures)])
+    assert all("Strain" in atoms.info["Config_type"] for atoms in written[len(structures):])
+
+    with pytest.raises(NotImplementedError):
+        CardPipeline([STRAIN_CONFIG, {"class": "MyCustomCard", "check_state": True}])
+
+
+def test_headless_imports_without_gui():
+    """命令行和进程池只导入计算相关的模块 不导入Qt界面"""
+    code = ("import sys, NepTrainKit.cli; "
+            "print([m for m in sys.modules if m.startswith(('PySide6.QtWidgets', 'PySide6.QtGui', 'qfluentwidgets'))])")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NepTrainKit.core.io.reducer import (get_reducer, get_available_reducers, run_reducer,
+                                         EmbeddingCache, LandmarkReducer, DescriptorReducer)
+
+
+@pytest.fixture
+def descriptor():
+    rng = np.random.default_rng(0)
+    return (rng.normal(size=(600, 12)) * 0.5 ** np.arange(12)).astype(np.float32)
+
+
+def test_available_reducers():
+    assert "pca" in get_available_reducers()
+    assert "landmark" in get_available_reducers()
+    with pytest.raises(ValueError):
+        get_reducer("not-a-reducer")
+    with pytest.raises(ValueError):
+        get_reducer("pca", perplexity=3)
+
+
+def test_landmark_interpolation(descriptor):
+    class FirstColumns(DescriptorReducer):
+        name = "first"
+        default_params = {}
+
+        def fit_transform(self, X):
+            return np.asarray(X[:, :2], dtype=np.float32)
+
+    from NepTrainKit.core.io import reducer as reducer_module
+    reducer_module.REDUCERS["first"] = FirstColumns
+    try:
+        embedding = LandmarkReducer(base="first", n_landmarks=200, n_neighbors=1).fit_transform(descriptor)
+    finally:
+        reducer_module.REDUCERS.pop("first")
+    assert embedding.shape == (600, 2)
+    # 只用一个最近邻时 每个点的坐标等于最近采样点的坐标
+    landmarks = np.sort(np.random.default_rng(0).choice(600, 200, replace=False))
+    assert np.all(np.isin(embedding[:, 0], descriptor[landmarks, 0]))
+    np.testing.assert_array_equal(embedding[landmarks], descriptor[landmarks, :2])
+
+
+def test_run_reducer_cache(descriptor, tmp_path):
+    status, embedding = run_reducer(descriptor, "landmark", {"base": "pca", "n_landmarks": 100}, cache_dir=tmp_path)
+    assert status == "result" and embedding.shape == (600, 2)
+    key = EmbeddingCache.get_key(descriptor, "landmark",
+                                 {**LandmarkReducer.default_params, "base": "pca", "n_landmarks": 100})
+    cached = EmbeddingCache(tmp_path).get(key)
+    np.testing.assert_array_equal(cached, embedding)
+    assert run_reducer(descriptor, "landmark", {"unknown": 1})[0] == "error"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from NepTrainKit.core.io.select import farthest_point_sampling
+
+
+def _legacy_fps(points, n_samples, min_dist, selected_data=None):
+    if selected_data is None:
+        sampled = [0]
+        min_distances = np.linalg.norm(points - points[0], axis=1)
+    else:
+        sampled = []
+        min_distances = np.min(np.linalg.norm(points[:, None] - selected_data[None], axis=2), axis=1)
+    while len(sampled) < n_samples:
+        index = int(np.argmax(min_distances))
+        if min_distances[index] < min_dist:
+            break
+        sampled.append(index)
+        min_distances = np.minimum(min_distances, np.linalg.norm(points - points[index], axis=1))
+    return sampled
+
+
+@pytest.fixture
+def points():
+    return np.random.default_rng(0).random((3000, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("n_jobs,block_size", [(1, None), (3, 500)])
+def test_fps_matches_legacy(points, n_jobs, block_size):
+    expected = _legacy_fps(points, 150, 0.1)
+    assert farthest_point_sampling(points, 150, 0.1, n_jobs=n_jobs, block_size=block_size) == expected
+
+
+def test_fps_min_dist_and_selected(points):
+    sampled = farthest_point_sampling(points, 3000, min_dist=1.0)
+    assert sampled == _legacy_fps(points, 3000, 1.0)
+    assert len(sampled) < 3000
+    selected = points[:50]
+    assert farthest_point_sampling(points, 40, 0.1, selected_data=selected) == \
+        _legacy_fps(points, 40, 0.1, selected_data=selected)
+
+
+def test_nearest_squared_distances_budget(points):
+    from NepTrainKit.core.io.select import nearest_squared_distances, numpy_cdist
+    references = points[::7] + 0.01
+    expected = np.min(numpy_cdist(points, references), axis=1) ** 2
+    # 很小的预算会分成很多块
+    result = nearest_squared_distances(points, references, memory_budget=4096)
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(nearest_squared_distances(points, references), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_approximate_fps():
+    from NepTrainKit.core.io.select import select_grid_candidates
+    rng = np.random.default_rng(1)
+    points = rng.normal(size=(5000, 8)).astype(np.float32)
+    candidates = select_grid_candidates(points, 300)
+    assert 0 < len(candidates) <= 300 and np.all(np.diff(candidates) > 0)
+    sampled = farthest_point_sampling(points, 50, 0.5, approximate=True, n_candidates=300)
+    assert len(sampled) == 50 and set(sampled) <= set(candidates.tolist())
+    selected = points[sampled]
+    distance = np.linalg.norm(selected[:, None] - selected[None], axis=2) + np.eye(50) * 10
+    assert distance.min() >= 0.5
+    # 点数不超过候选数时与精确采样一致
+    assert farthest_point_sampling(points, 20, 0.1, approximate=True) == farthest_point_sampling(points, 20, 0.1)
+
+
+def test_structure_farthest_point_sampling(tmp_path):
+    from NepTrainKit.core.io.select import (FarthestPointSampler, StreamingFarthestPointSampler,
+                                            structure_farthest_point_sampling)
+    rng = np.random.default_rng(2)
+    atom_counts = rng.integers(1, 40, size=300)
+    atom_counts[5] = 0
+    points = rng.normal(size=(atom_counts.sum(), 6)).astype(np.float32)
+    # 一个结构里有少见的原子环境
+    points[atom_counts[:100].sum()] += 20
+    stored = np.lib.format.open_memmap(tmp_path / "descriptor.npy", mode="w+", dtype=np.float32, shape=points.shape)
+    stored[:] = points
+
+    with StreamingFarthestPointSampler(stored, block_size=64) as sampler:
+        assert sampler.sample(30, 0.0) == FarthestPointSampler(points).sample(30, 0.0)
+
+    offsets = np.concatenate(([0], np.cumsum(atom_counts)))
+    expected = FarthestPointSampler(points).sample_groups(20, offsets, 0.0)
+    sampled = structure_farthest_point_sampling(stored, atom_counts, 20, 0.0, block_size=64)
+    assert sampled == expected
+    assert len(set(sampled)) == 20 and 5 not in sampled
+    assert sampled[1] == 100
+
+
+def test_fps_min_dist_zero_no_duplicates():
+    from NepTrainKit.core.io.select import structure_farthest_point_sampling
+    rng = np.random.default_rng(3)
+    points = rng.random((300, 4)).astype(np.float32)
+    sampled = farthest_point_sampling(points, 500, min_dist=0)
+    assert sorted(sampled) == list(range(300))
+
+    atom_counts = rng.integers(1, 5, size=300)
+    atom_counts[7] = 0
+    atom_points = rng.random((atom_counts.sum(), 4)).astype(np.float32)
+    sampled = structure_farthest_point_sampling(atom_points, atom_counts, 500, 0.0)
+    assert sorted(sampled) == [i for i in range(300) if i != 7]
@@ -29,6 +29,71 @@ class TestStructure(unittest.TestCase):
         self.assertEqual(self.structure.html_formula, "H<sub>1</sub>O<sub>1</sub>")
         self.assertListEqual(self.structure.numbers, [1, 8])
 
+    def test_species_lookup(self):
+        symbols, codes = self.structure.species_codes
+        self.assertListEqual(symbols, ["H", "O"])
+        np.testing.assert_array_equal(codes, [0, 1])
+        np.testing.assert_allclose(self.structure.covalent_radii, [0.31, 0.66])
+        # 替换元素后重新编号
+        self.structure.structure_info["species"] = np.array(["O", "O"])
+        self.assertListEqual(self.structure.numbers, [8, 8])
+
+    def test_bonds_across_boundary(self):
+        # 两个H原子隔着晶胞边界相距0.6Å
+        structure = Structure(np.eye(3) * 10, {"species": np.array(["H", "H"]),
+                                               "pos": np.array([[0.3, 5, 5], [9.7, 5, 5]])},
+                              self.properties[:2], {})
+        self.assertListEqual(structure.get_bond_pairs(), [])
+        i, j, shifts = structure.get_bonds()
+        self.assertEqual(len(i), 1)
+        vector = structure.positions[j[0]] + shifts[0] @ structure.cell - structure.positions[i[0]]
+        self.assertAlmostEqual(np.linalg.norm(vector), 0.6, places=5)
+
+    def test_get_clusters(self):
+        from ase import Atoms
+        from ase.build import molecule
+        from NepTrainKit.core.structure import get_clusters
+        # 甲醇跨越晶胞边界 加上一个孤立的Pb原子
+        atoms = Atoms(cell=np.eye(3) * 8, pbc=True)
+        atoms += molecule("CH3OH")
+        atoms.append("Pb")
+        atoms.positions[-1] = [4, 4, 4]
+        atoms.wrap()
+        clusters, is_organic_list = get_clusters(atoms)
+        self.assertEqual(clusters, [[0, 1, 2, 3, 4, 5], [6]])
+        self.assertEqual(is_organic_list, [True, False])
+        # 第二次调用使用缓存 返回的列表可以修改
+        clusters[0].append(100)
+        self.assertEqual(get_clusters(atoms)[0], [[0, 1, 2, 3, 4, 5], [6]])
+
+    def test_get_clusters_slab(self):
+        from ase import Atoms
+        from ase.build import molecule
+        from NepTrainKit.core.structure import get_clusters
+        # 吸附在表面上的甲醇 伸出非周期方向的晶胞 并跨越x方向的边界
+        atoms = Atoms(cell=np.eye(3) * 8, pbc=[True, True, False])
+        atoms += molecule("CH3OH")
+        atoms.positions += [0, 4, 9]
+        atoms.wrap()
+        clusters, is_organic_list = get_clusters(atoms)
+        self.assertEqual(clusters, [[0, 1, 2, 3, 4, 5]])
+        self.assertEqual(is_organic_list, [True])
+
+    def test_process_organic_clusters(self):
+        from ase import Atoms
+        from ase.build import molecule
+        from NepTrainKit.core.structure import get_clusters, process_organic_clusters
+        # 倾斜晶胞中跨越边界的苯环 应变后分子内的距离不变
+        atoms = Atoms(cell=[[9, 0, 0], [4, 8, 0], [1, 2, 7]], pbc=True)
+        atoms += molecule("C6H6")
+        atoms.wrap()
+        clusters, is_organic_list = get_clusters(atoms)
+        new_atoms = atoms.copy()
+        new_atoms.set_cell(atoms.cell * 1.2, scale_atoms=True)
+        process_organic_clusters(atoms, new_atoms, clusters, is_organic_list)
+        np.testing.assert_allclose(new_atoms.get_all_distances(mic=True), atoms.get_all_distances(mic=True),
+                                   atol=1e-8)
+
     def test_energy_calculations(self):
         # 测试能量相关计算
         self.assertEqual(self.structure.per_atom_energy, 0.5)
@@ -46,6 +111,15 @@ class TestStructure(unittest.TestCase):
         expected_virial = np.zeros(6, dtype=np.float32)
         np.testing.assert_array_equal(self.structure.nep_virial, expected_virial)
 
+    def test_mini_distance_info(self):
+        # 1Å的立方晶胞 最近的H-H是自己的周期像
+        distance_info = self.structure.get_mini_distance_info()
+        self.assertAlmostEqual(distance_info[("H", "O")], np.sqrt(3) / 2, places=5)
+        self.assertAlmostEqual(distance_info[("H", "H")], 1.0, places=5)
+        self.assertAlmostEqual(distance_info[("O", "O")], 1.0, places=5)
+        self.assertTrue(self.structure.adjust_reasonable(0.7))
+        self.assertFalse(self.structure.adjust_reasonable(1.0))
+
     def test_xyz_io(self):
         # 测试xyz文件读写
         test_file = "test.xyz"
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+对比NepCalculator结果后处理的旧实现(逐结构split/reshape)与向量化实现的耗时
+不需要nep_cpu 用随机数模拟C++返回的嵌套列表
+python tools/benchmark_calculator.py --structures 100000 --max-atoms 8
+"""
+import argparse
+import time
+
+import numpy as np
+
+from NepTrainKit.core.calculator import postprocess_calculate_result
+
+
+def legacy_postprocess(potentials, forces, virials, group_size):
+    """旧版本calculate中的处理方式"""
+    split_indices = np.cumsum(group_size)[:-1]
+    potentials = np.hstack(potentials)
+    potentials_array = np.array(list(map(np.sum, np.split(potentials, split_indices))), dtype=np.float32)
+    reshaped_forces = [np.array(force).reshape(3, -1).T for force in forces]
+    forces_array = np.vstack(reshaped_forces, dtype=np.float32)
+    reshaped_virials = np.vstack([np.array(virial).reshape(9, -1).mean(axis=1) for virial in virials], dtype=np.float32)
+    return potentials_array, forces_array, reshaped_virials
+
+
+def make_fake_output(structures, max_atoms, seed=0):
+    """生成与nep_cpu.calculate返回格式一致的数据"""
+    rng = np.random.default_rng(seed)
+    group_size = rng.integers(1, max_atoms + 1, size=structures).tolist()
+    potentials = [rng.normal(size=n).tolist() for n in group_size]
+    forces = [rng.normal(size=3 * n).tolist() for n in group_size]
+    virials = [rng.normal(size=9 * n).tolist() for n in group_size]
+    return potentials, forces, virials, group_size
+
+
+def bench(func, args, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NepCalculator post-processing")
+    parser.add_argument("--structures", type=int, default=100000, help="number of structures")
+    parser.add_argument("--max-atoms", type=int, default=8, help="max atoms per structure")
+    parser.add_argument("--repeat", type=int, default=3, help="repeat times, best is reported")
+    args = parser.parse_args()
+
+    data = make_fake_output(args.structures, args.max_atoms)
+    legacy_time, legacy = bench(legacy_postprocess, data, args.repeat)
+    new_time, new = bench(postprocess_calculate_result, data, args.repeat)
+
+    for old_array, new_array in zip(legacy, new):
+        np.testing.assert_allclose(old_array, new_array, rtol=1e-5, atol=1e-6)
+    print(f"structures={args.structures} atoms={sum(data[3])}")
+    print(f"legacy     : {legacy_time:.3f} s")
+    print(f"vectorized : {new_time:.3f} s")
+    print(f"speedup    : {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+对比最远点采样旧实现(每次np.linalg.norm整个数组)与FarthestPointSampler的耗时
+python tools/benchmark_fps.py --points 200000 --dim 30 --samples 1000 --jobs 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from NepTrainKit.core.io.select import farthest_point_sampling
+
+
+def legacy_farthest_point_sampling(points, n_samples, min_dist=0.1):
+    """旧版本的实现 没有已有样本的情况"""
+    sampled_indices = [0]
+    min_distances = np.linalg.norm(points - points[0], axis=1)
+    while len(sampled_indices) < n_samples:
+        current_index = np.argmax(min_distances)
+        if min_distances[current_index] < min_dist:
+            break
+        sampled_indices.append(int(current_index))
+        new_distances = np.linalg.norm(points - points[current_index], axis=1)
+        min_distances = np.minimum(min_distances, new_distances)
+    return sampled_indices
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark farthest point sampling")
+    parser.add_argument("--points", type=int, default=200000, help="number of points")
+    parser.add_argument("--dim", type=int, default=30, help="descriptor dimension")
+    parser.add_argument("--samples", type=int, default=1000, help="number of points to select")
+    parser.add_argument("--min-dist", type=float, default=0.0, help="minimum distance")
+    parser.add_argument("--jobs", type=int, default=4, help="threads for the blocked kernel")
+    parser.add_argument("--skip-legacy", action="store_true", help="only run the new implementation")
+    args = parser.parse_args()
+
+    points = np.random.default_rng(0).normal(size=(args.points, args.dim)).astype(np.float32)
+    print(f"points={args.points} dim={args.dim} samples={args.samples}")
+    if not args.skip_legacy:
+        legacy_time, legacy = timed(legacy_farthest_point_sampling, points, args.samples, args.min_dist)
+        print(f"legacy          : {legacy_time:.2f} s")
+    for jobs in sorted({1, args.jobs}):
+        new_time, new = timed(farthest_point_sampling, points, args.samples, args.min_dist, n_jobs=jobs)
+        line = f"blocked n_jobs={jobs}: {new_time:.2f} s"
+        if not args.skip_legacy:
+            overlap = len(set(new) & set(legacy)) / max(len(legacy), 1)
+            line += f"  speedup {legacy_time / new_time:.1f}x  same selection {overlap:.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()